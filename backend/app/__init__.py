@@ -2,24 +2,27 @@ import logging
 from flask import Flask
 from flask_cors import CORS
 from .config import Config
-from .extensions import db, jwt, migrate
-from .routes.auth import auth_bp
-from .routes.post import post_bp
-from .routes.vote import vote_bp
-from .routes.comment import comment_bp
-from .routes.admin import admin_bp
+from .database import configure_engines, tune_connections
+from .extensions import db, jwt, cache, hasher, events, instrumentation, vote_buffer, replicas, purge_jobs
+from .serving import defer_blueprints, register_blueprints
 
 
-def create_app():
+def create_app(profile=None):
     """
        Creates and configures the Flask app.
-       Sets up: App config from the Config class, CORS, Logging, Database, JWT, Migrations,
-       All blueprints (auth, posts, votes, comments, admin)
+       Sets up: App config from the Config class, CORS, Logging, Database (engine profile, read replicas), JWT, Migrations, Cache,
+       Password hashing, Live events, Request instrumentation,
+       Vote write-behind buffer, Account purge jobs, All blueprints (auth, posts, votes, comments, admin), CLI commands
+       profile: "full" or "serving" (defaults to APP_PROFILE). "serving" skips migrations and the CLI and
+       registers the blueprints on the first request, see app/serving.py.
        Returns: The configured Flask app.
     """
     app = Flask(__name__)
     app.url_map.strict_slashes = False
     app.config.from_object(Config)
+    profile = profile or app.config.get("APP_PROFILE", "full")
+    if profile not in ("full", "serving"):
+        raise ValueError(f"Unknown app profile: {profile}")
     CORS(
         app,
         resources={r"/api/*": {"origins": "http://localhost:5173"}},
@@ -32,14 +35,34 @@ def create_app():
     logger = logging.getLogger(__name__)
     logger.info("Starting Flask app")
 
+    configure_engines(app)
     db.init_app(app)
+    tune_connections(app)
     jwt.init_app(app)
-    migrate.init_app(app, db)
+    cache.init_app(app)
+    hasher.init_app(app)
+    events.init_app(app)
+    instrumentation.init_app(app)
+    vote_buffer.init_app(app)
+    replicas.init_app(app)
+    purge_jobs.init_app(app)
 
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(post_bp)
-    app.register_blueprint(vote_bp)
-    app.register_blueprint(comment_bp)
-    app.register_blueprint(admin_bp)
+    if profile == "serving":
+        defer_blueprints(app)
+        return app
+
+    from flask_migrate import Migrate
+    from .cli import votes_cli, search_cli, ranking_cli, stats_cli, seed_cli, comments_cli, users_cli
+
+    Migrate(app, db)
+    register_blueprints(app)
+
+    app.cli.add_command(votes_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(ranking_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(seed_cli)
+    app.cli.add_command(comments_cli)
+    app.cli.add_command(users_cli)
 
     return app
@@ -0,0 +1,266 @@
+import asyncio
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import g, has_request_context
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import HTTPException
+
+from .serving import load_blueprints
+
+logger = logging.getLogger(__name__)
+
+# ASGI serving (asgi.py at the backend root: uvicorn asgi:app).
+#
+# The read paths clients fan out on, feed, single post, comments and the
+# live event stream, run on the event loop: each request's view (the same
+# Flask view the WSGI deployment runs, with its hooks, cache and ETags)
+# executes inside AsyncSession.run_sync, so its db.session is the sync face
+# of an AsyncSession and every query is awaited on the async driver
+# (aiosqlite / asyncpg) instead of blocking a thread. Waiting on the
+# database, or on live events, costs a coroutine rather than a worker.
+# Everything else, all writes included, runs the WSGI app on a pool of
+# ASGI_THREADS threads, unchanged.
+#
+# The async engines only read (see database.create_async_engines) and honour
+# the replica routing of app/replicas.py. Blocking calls inside those views
+# still block the loop: keep CACHE_BACKEND "memory" or a Redis close by.
+
+ASYNC_ENDPOINTS = {
+    "posts.get_posts",
+    "posts.get_single_post",
+    "posts.post_events",
+    "comment_bp.list_comments",
+}
+
+
+class AsyncReadSession(Session):
+    """Sync face of the async read session; sends the request's queries to its replica, if any."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engines = self.info["engines"]
+        replica = g.get("db_replica") if has_request_context() else None
+        return engines.get(replica, engines[None]).sync_engine
+
+
+class AsgiApp:
+    """
+       ASGI application around a Flask app from create_app().
+       Configured from:
+         ASGI_DATABASE_URL        database of the async read paths, defaults to SQLALCHEMY_DATABASE_URI
+         ASGI_THREADS             threads running the requests that go through WSGI
+         ASGI_EVENTS_MAX_STREAMS  open event streams, replaces EVENTS_MAX_STREAMS
+    """
+
+    def __init__(self, flask_app):
+        from .extensions import events
+
+        self.flask_app = flask_app
+        self.engines = None
+        # streams cost a coroutine here, not one of a few server threads
+        events.max_streams = flask_app.config.get("ASGI_EVENTS_MAX_STREAMS", 10000)
+        self.executor = ThreadPoolExecutor(
+            max_workers=flask_app.config.get("ASGI_THREADS", 32),
+            thread_name_prefix="wsgi"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            body = await _read_body(receive)
+            if body is None:
+                return  # the client left before sending its request
+            environ = _environ(scope, body)
+            if self._is_async(environ):
+                await self._serve_async(environ, receive, send)
+            else:
+                await self._serve_wsgi(environ, send)
+
+    def _ensure_engines(self):
+        if self.engines is None:
+            from .database import create_async_engines
+
+            self.engines = create_async_engines(self.flask_app)
+            if not self.engines:
+                logger.warning("In-memory database: every request runs through WSGI threads")
+        return self.engines
+
+    def _is_async(self, environ):
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD") or not self._ensure_engines():
+            return False
+        load_blueprints(self.flask_app)  # routes of the serving profile come in with the first request
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        return endpoint in ASYNC_ENDPOINTS
+
+    async def aclose(self):
+        for engine in (self.engines or {}).values():
+            await engine.dispose()
+        self.executor.shutdown(wait=False)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self._ensure_engines()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ------------------------
+    # Async read paths
+    # ------------------------
+    async def _serve_async(self, environ, receive, send):
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        disconnected = asyncio.Event()
+
+        async def watch():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch())
+        session = AsyncSession(sync_session_class=AsyncReadSession, info={"engines": self.engines})
+        try:
+            await session.run_sync(self._dispatch, environ, send, disconnected)
+        finally:
+            watcher.cancel()
+            await session.close()
+
+    def _dispatch(self, sync_session, environ, send, disconnected):
+        """Runs in the greenlet of run_sync: database calls in here are awaited, not blocking."""
+        from sqlalchemy.util import await_only
+
+        from .extensions import db
+
+        app = self.flask_app
+        with app.request_context(environ):
+            db.session.registry.set(sync_session)
+            try:
+                response = app.full_dispatch_request()
+            except Exception as e:
+                response = app.handle_exception(e)
+            try:
+                app_iter, status, headers = response.get_wsgi_response(environ)
+                await_only(send(_start_message(status, headers)))
+                if hasattr(response.response, "__aiter__") and environ["REQUEST_METHOD"] != "HEAD":
+                    # event streams wait on the loop, not on a thread
+                    chunks = response.response.__aiter__()
+                    while not disconnected.is_set():
+                        try:
+                            chunk = await_only(chunks.__anext__())
+                        except StopAsyncIteration:
+                            break
+                        await_only(send(_body_message(chunk.encode() if isinstance(chunk, str) else chunk)))
+                    await_only(chunks.aclose())
+                else:
+                    for chunk in app_iter:
+                        if chunk:
+                            await_only(send(_body_message(chunk)))
+                await_only(send(_body_message(b"", more=False)))
+            finally:
+                response.close()
+
+    # ------------------------
+    # Everything else: WSGI on a thread
+    # ------------------------
+    async def _serve_wsgi(self, environ, send):
+        loop = asyncio.get_running_loop()
+
+        def blocking_send(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            started = {}
+
+            def start_response(status, headers, exc_info=None):
+                started["message"] = _start_message(status, headers)
+                return lambda data: blocking_send(_body_message(data))
+
+            app_iter = self.flask_app(environ, start_response)
+            try:
+                blocking_send(started["message"])
+                for chunk in app_iter:
+                    if chunk:
+                        blocking_send(_body_message(chunk))
+                blocking_send(_body_message(b"", more=False))
+            finally:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+
+        await loop.run_in_executor(self.executor, run)
+
+
+def create_asgi_app(flask_app=None):
+    """The ASGI app serving `flask_app` (create_app("serving") when not given)."""
+    if flask_app is None:
+        from . import create_app
+
+        flask_app = create_app("serving")
+    return AsgiApp(flask_app)
+
+
+# ------------------------
+# ASGI <-> WSGI plumbing
+# ------------------------
+async def _read_body(receive):
+    body = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(body)
+
+
+def _environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client")
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin1"),
+        "PATH_INFO": scope["path"].encode().decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0] if client else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _start_message(status, headers):
+    return {
+        "type": "http.response.start",
+        "status": int(status.split(" ", 1)[0]),
+        "headers": [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers],
+    }
+
+
+def _body_message(chunk, more=True):
+    return {"type": "http.response.body", "body": chunk, "more_body": more}
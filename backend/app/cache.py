@@ -0,0 +1,292 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+FEED_SORTS = ("recent", "top", "hot")
+# keyword searches can also be sorted by relevance
+SEARCH_SORTS = FEED_SORTS + ("relevance",)
+# the orders a vote can move a post in (hot once app/ranking.py rescores it)
+VOTE_SORTS = ("top", "hot")
+# Response entries (feed_key, post_key, analytics_key) built by a request
+# that read from a replica (app/replicas.py) are kept apart under this
+# suffix, so requests reading the primary (users inside their
+# read-your-writes window) never get them. They also live at most
+# DB_REPLICA_MAX_LAG_SECONDS, since the replica may have been behind.
+# Other keys (identity flags, sticky markers, purge job status) are the
+# same whoever reads or writes them.
+REPLICA_KEY_SUFFIX = "@replica"
+
+
+# ------------------------
+# Backends
+# ------------------------
+class MemoryBackend:
+    """In-process LRU cache with per-entry TTL. Safe to share between threads."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        # generation counters live outside the LRU so they can never be evicted
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def size(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    """
+       Talks to anything speaking the redis-py client API (get/set/delete/incr),
+       so a real Redis, a compatible server, or a local fake in tests.
+       Values are stored as JSON.
+    """
+
+    def __init__(self, client, prefix="cp:"):
+        self.client = client
+        self.prefix = prefix
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + k for k in keys))
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def size(self):
+        return None
+
+
+class NullBackend:
+    evictions = 0
+    expirations = 0
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def counter(self, key):
+        return 0
+
+    def size(self):
+        return 0
+
+
+ANALYTICS_KEY = "analytics"
+
+
+def _feed_namespace(sort, author_id=None, keyword=None):
+    if keyword:
+        return f"feed:search:{sort}"
+    return f"feed:{sort}:author:{author_id}" if author_id else f"feed:{sort}:all"
+
+
+# ------------------------
+# Flask extension
+# ------------------------
+class Cache:
+    """
+       Response cache configured from:
+         CACHE_BACKEND      "memory" (default), "redis" or "null"
+         CACHE_DEFAULT_TTL  seconds, default 30
+         CACHE_MAX_ENTRIES  memory backend capacity, default 1024
+         CACHE_REDIS_URL    used when CACHE_BACKEND is "redis"
+    """
+
+    def __init__(self):
+        self.backend = NullBackend()
+        self.default_ttl = 30
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, backend=None):
+        self.default_ttl = app.config.get("CACHE_DEFAULT_TTL", 30)
+        self.backend = backend or self._make_backend(app.config)
+        self.hits = self.misses = 0
+        app.extensions["cache"] = self
+
+    def _make_backend(self, config):
+        kind = config.get("CACHE_BACKEND", "memory")
+        if kind == "memory":
+            return MemoryBackend(config.get("CACHE_MAX_ENTRIES", 1024))
+        if kind == "redis":
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+            return RedisBackend(redis.Redis.from_url(config["CACHE_REDIS_URL"]))
+        if kind == "null":
+            return NullBackend()
+        raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+
+    @staticmethod
+    def _response_key(key):
+        if has_request_context() and g.get("db_replica") is not None:
+            return key + REPLICA_KEY_SUFFIX
+        return key
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Cache get failed for {key}: {e}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.default_ttl
+        if key.endswith(REPLICA_KEY_SUFFIX) and has_request_context() and g.get("cache_max_ttl"):
+            ttl = min(ttl, g.cache_max_ttl)
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            logger.error(f"Cache set failed for {key}: {e}")
+
+    def delete(self, *keys):
+        keys = {key.removesuffix(REPLICA_KEY_SUFFIX) for key in keys}
+        keys = tuple(keys) + tuple(key + REPLICA_KEY_SUFFIX for key in keys)
+        try:
+            self.backend.delete(*keys)
+        except Exception as e:
+            logger.error(f"Cache delete failed for {keys}: {e}")
+
+    def generation(self, namespace):
+        try:
+            return self.backend.counter(f"gen:{namespace}")
+        except Exception as e:
+            logger.error(f"Cache generation lookup failed for {namespace}: {e}")
+            return 0
+
+    def bump(self, namespace):
+        """Invalidates every key built on `namespace` by moving it to a new generation."""
+        try:
+            self.backend.incr(f"gen:{namespace}")
+        except Exception as e:
+            logger.error(f"Cache bump failed for {namespace}: {e}")
+
+    # keys and invalidation
+    def feed_key(self, sort, author_id, keyword, cursor, limit, view=""):
+        namespace = _feed_namespace(sort, author_id, keyword)
+        gen = self.generation(namespace)
+        return self._response_key(f"{namespace}:v{gen}:{sort}:{view}:{keyword or ''}:{cursor or ''}:{limit}")
+
+    def post_key(self, post_id, version):
+        # keyed by Post.version, which every write to the post moves: a reader
+        # that loaded the row before a write can only fill a key nobody asks for
+        return self._response_key(f"post:v{self.generation('posts')}:{post_id}:{version}")
+
+    def invalidate_post(self, author_id, sorts=SEARCH_SORTS, search_sorts=None):
+        """
+           For a change to one of `author_id`'s posts: drops the pages of the
+           global feed and of the author's feed in `sorts`, and the search
+           results in `search_sorts` (defaults to `sorts`). Pass the orders the
+           change can add the post to, remove it from or move it in (all of
+           them for a post added or deleted, VOTE_SORTS for a vote). Cached
+           pages of the other orders still show the post in the same place;
+           get_posts() checks them against the post versions they were built
+           from, and every visible change moves the post's version.
+        """
+        for sort in sorts:
+            if sort in FEED_SORTS:
+                self.bump(_feed_namespace(sort))
+                self.bump(_feed_namespace(sort, author_id=author_id))
+        for sort in sorts if search_sorts is None else search_sorts:
+            self.bump(_feed_namespace(sort, keyword=True))
+        self.invalidate_analytics()
+
+    def invalidate_author(self, author_id):
+        """A renamed user shows up in posts and comments anywhere, so drop them all."""
+        self.bump("posts")
+        self.invalidate_post(author_id)
+
+    def invalidate_feed(self, sort, author_ids=()):
+        """For changes that only reorder one sort of the feed (e.g. a hot score refresh)."""
+        if sort in FEED_SORTS:
+            self.bump(_feed_namespace(sort))
+            for author_id in author_ids:
+                self.bump(_feed_namespace(sort, author_id=author_id))
+        self.bump(_feed_namespace(sort, keyword=True))
+
+    def analytics_key(self, days):
+        return self._response_key(f"{ANALYTICS_KEY}:v{self.generation(ANALYTICS_KEY)}:{days}")
+
+    def invalidate_analytics(self):
+        self.bump(ANALYTICS_KEY)
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "expirations": self.backend.expirations,
+            "size": self.backend.size(),
+        }
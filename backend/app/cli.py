@@ -0,0 +1,126 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .extensions import db
+from .profiles import rebuild_user_counters
+from .purge import purge_user
+from .ranking import refresh_hot_scores
+from .search import rebuild_search_index
+from .seed import SEED_PASSWORD, seed_dataset
+from .stats import rebuild_site_stats
+from .threads import rebuild_comment_threads
+from .votes import find_drifted_posts, reconcile_vote_counts
+
+votes_cli = AppGroup("votes", help="Maintenance for the denormalized vote counters.")
+
+
+@votes_cli.command("reconcile")
+@click.option("--check", is_flag=True, help="Only report posts whose counters drifted.")
+def reconcile_votes(check):
+    """Rebuild Post.upvote_count/downvote_count/score from the Vote table.
+
+    Also used as the backfill after adding the counter columns.
+    """
+    drifted = find_drifted_posts()
+    click.echo(f"{len(drifted)} post(s) with drifted vote counters")
+    if check or not drifted:
+        return
+    updated = reconcile_vote_counts(drifted)
+    click.echo(f"Reconciled {updated} post(s)")
+
+
+search_cli = AppGroup("search", help="Maintenance for the post full-text index.")
+
+
+@search_cli.command("rebuild")
+def rebuild_search():
+    """Create the full-text index if missing and repopulate it from existing posts."""
+    dialect = rebuild_search_index()
+    click.echo(f"Search index rebuilt ({dialect})")
+
+
+ranking_cli = AppGroup("ranking", help="Maintenance for the sort=hot rank scores.")
+
+
+@ranking_cli.command("refresh")
+@click.option("--loop", "interval", type=int, default=0, help="Keep refreshing every N seconds.")
+def refresh_ranking(interval):
+    """Recompute hot scores for posts with new votes or a rolled-over age bucket."""
+    while True:
+        updated = refresh_hot_scores()
+        click.echo(f"Refreshed {updated} post(s)")
+        if interval <= 0:
+            return
+        time.sleep(interval)
+
+
+
+stats_cli = AppGroup("stats", help="Maintenance for the admin analytics rollups.")
+
+
+@stats_cli.command("rebuild")
+def rebuild_stats():
+    """Recompute site_stats and the daily series from the base tables (also the backfill)."""
+    totals = rebuild_site_stats()
+    click.echo(", ".join(f"{name}={value}" for name, value in totals.items()))
+
+comments_cli = AppGroup("comments", help="Maintenance for the comment reply threads.")
+
+
+@comments_cli.command("rebuild")
+def rebuild_comments():
+    """Fill missing comment paths and recount replies (also the backfill)."""
+    filled = rebuild_comment_threads()
+    click.echo(f"Filled {filled} comment path(s), reply counts rebuilt")
+
+
+users_cli = AppGroup("users", help="Maintenance for the per-user profile counters.")
+
+
+@users_cli.command("rebuild")
+def rebuild_users():
+    """Recompute post_count, comment_count and karma from the base tables (also the backfill)."""
+    updated = rebuild_user_counters()
+    db.session.commit()
+    click.echo(f"Rebuilt the counters of {updated} user(s)")
+
+
+@users_cli.command("purge")
+@click.argument("user_id", type=int)
+@click.option("--chunk-size", type=int, default=None, help="Rows per transaction (USER_PURGE_CHUNK_SIZE).")
+def purge_user_command(user_id, chunk_size):
+    """Delete a user and everything they wrote, in chunks."""
+    removed = purge_user(
+        user_id,
+        chunk_size=chunk_size or current_app.config["USER_PURGE_CHUNK_SIZE"],
+        progress=lambda removed: click.echo(f"  {removed}")
+    )
+    if removed is None:
+        raise click.ClickException(f"No user {user_id}")
+    click.echo(f"Purged user {user_id}: {removed}")
+
+
+seed_cli = AppGroup("seed", help="Synthetic data for load tests and benchmarks.")
+
+
+@seed_cli.command("generate")
+@click.option("--users", type=int, default=100)
+@click.option("--posts", type=int, default=1000)
+@click.option("--votes", type=int, default=20000)
+@click.option("--comments", type=int, default=5000)
+@click.option("--skew", type=float, default=1.1, help="Power-law exponent of post popularity.")
+@click.option("--hot-fraction", type=float, default=0.01, help="Share of posts that are busy fresh threads.")
+@click.option("--days", type=int, default=30, help="Spread post creation times over this many days.")
+@click.option("--reply-fraction", type=float, default=0.4, help="Share of comments that are replies.")
+@click.option("--seed", type=int, default=42)
+def generate_seed(users, posts, votes, comments, skew, hot_fraction, days, reply_fraction, seed):
+    """Insert a skewed synthetic dataset (every user's password is "password")."""
+    counts = seed_dataset(
+        users=users, posts=posts, votes=votes, comments=comments,
+        skew=skew, hot_fraction=hot_fraction, days=days, seed=seed,
+        reply_fraction=reply_fraction
+    )
+    click.echo(", ".join(f"{n} {model}" for model, n in counts.items()) + f" (password: {SEED_PASSWORD})")
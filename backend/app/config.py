@@ -5,3 +5,121 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///db.sqlite3")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-secret")
+
+    # create_app() profile, see app/serving.py: "full" has everything, CLI and
+    # migrations included; "serving" is the lean one the server workers use
+    APP_PROFILE = os.getenv("APP_PROFILE", "full")
+
+    # database engine profile, see app/database.py. "tuned" gives file SQLite
+    # WAL and separate reader/writer connections, and Postgres a sized,
+    # pre-pinged pool with server-side timeouts; "default" leaves it all to SQLAlchemy
+    DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "tuned")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", "60000"))
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_READER_POOL_SIZE = int(os.getenv("SQLITE_READER_POOL_SIZE", "8"))
+    # seconds a write waits for the single SQLite writer connection; a burst
+    # of writes queues behind it, so keep this above the slowest write transaction
+    SQLITE_WRITER_POOL_TIMEOUT = int(os.getenv("SQLITE_WRITER_POOL_TIMEOUT", "30"))
+
+    # read replicas, see app/replicas.py: GET requests read from a replica
+    # within the lag bound, except for users who wrote in the sticky window
+    DB_REPLICA_URLS = os.getenv("DB_REPLICA_URLS", "")
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "2"))
+    DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+    DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "1"))
+
+    # response cache, see app/cache.py. The memory backend is per process, so
+    # multi-worker deployments should point every worker at the same Redis.
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "30"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # seconds between sort=hot rank refreshes in the serving processes; only
+    # the one holding the refresh lease runs them (app/leases.py). 0 disables
+    # the thread; `flask ranking refresh` can run it from cron instead
+    HOT_REFRESH_INTERVAL = int(os.getenv("HOT_REFRESH_INTERVAL", "60"))
+
+    # seconds a user's ban/admin flags and token version may be served from
+    # the cache; bans, role and password changes and deletions invalidate
+    # them immediately
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "10"))
+
+    # password hashing, see app/hashing.py. Changing the algorithm or cost
+    # rehashes each user transparently on their next login.
+    PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "bcrypt")
+    PASSWORD_HASH_COST = int(os.getenv("PASSWORD_HASH_COST", "0")) or None
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+
+    # live post events (SSE), see app/events.py. "local" only reaches clients
+    # of the same process; use "redis" when running several workers.
+    EVENTS_BROKER = os.getenv("EVENTS_BROKER", "local")
+    EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", "redis://localhost:6379/0")
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+    EVENTS_HEARTBEAT_SECONDS = int(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    EVENTS_MAX_STREAM_SECONDS = int(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
+    # open streams per process, past which /events answers 503 + Retry-After.
+    # Under gunicorn's gthread workers each stream holds one of the
+    # GUNICORN_THREADS threads, so keep this well below it
+    EVENTS_MAX_STREAMS = int(os.getenv("EVENTS_MAX_STREAMS", "4"))
+
+    # opt-in per-request instrumentation, see app/instrumentation.py: adds
+    # Server-Timing headers and /metrics (see METRICS_* below), logs the slowest statements of slow
+    # requests and, with PROFILE_THRESHOLD_MS > 0, dumps their sampled stacks
+    INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "0") == "1"
+    INSTRUMENTATION_SLOW_QUERIES = int(os.getenv("INSTRUMENTATION_SLOW_QUERIES", "5"))
+    INSTRUMENTATION_SLOW_MS = int(os.getenv("INSTRUMENTATION_SLOW_MS", "500"))
+    PROFILE_THRESHOLD_MS = int(os.getenv("PROFILE_THRESHOLD_MS", "0"))
+    PROFILE_INTERVAL_MS = int(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    # /metrics needs METRICS_ENABLED; it then answers a Bearer METRICS_TOKEN
+    # and/or the METRICS_ALLOWED_IPS (comma-separated, loopback by default)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS", "")
+
+    # write-behind votes, see app/vote_buffer.py: votes are acknowledged once
+    # appended to a local log and written to the database in batches.
+    # Pending votes are per worker: route each user to one worker, or a
+    # toggle split across two workers within a flush interval can be lost
+    VOTE_BUFFER_ENABLED = os.getenv("VOTE_BUFFER_ENABLED", "0") == "1"
+    VOTE_BUFFER_DIR = os.getenv("VOTE_BUFFER_DIR", "vote-buffer")
+    VOTE_BUFFER_FLUSH_INTERVAL = float(os.getenv("VOTE_BUFFER_FLUSH_INTERVAL", "1.0"))
+    VOTE_BUFFER_MAX_PENDING = int(os.getenv("VOTE_BUFFER_MAX_PENDING", "10000"))
+    VOTE_BUFFER_MAX_FLUSH_ROWS = int(os.getenv("VOTE_BUFFER_MAX_FLUSH_ROWS", "5000"))
+    VOTE_BUFFER_FSYNC = os.getenv("VOTE_BUFFER_FSYNC", "1") == "1"
+
+    # reply threads, see app/threads.py. Paths are 11 characters per level
+    # and Comment.path holds 400, so keep this under 36
+    COMMENT_MAX_DEPTH = int(os.getenv("COMMENT_MAX_DEPTH", "32"))
+
+    # account deletes, see app/purge.py and app/jobs.py: rows per
+    # transaction, and the size up to which DELETE /api/admin/users/<id>
+    # runs inline instead of as a background job
+    USER_PURGE_CHUNK_SIZE = int(os.getenv("USER_PURGE_CHUNK_SIZE", "500"))
+    USER_PURGE_PAUSE_SECONDS = float(os.getenv("USER_PURGE_PAUSE_SECONDS", "0"))
+    USER_PURGE_SYNC_MAX_ROWS = int(os.getenv("USER_PURGE_SYNC_MAX_ROWS", "2000"))
+
+    # streamed list responses (Accept: application/x-ndjson or stream=1),
+    # see app/streaming.py: rows fetched and written per chunk, and the most
+    # one response sends before handing out a next_cursor
+    STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+    STREAM_MAX_ROWS = int(os.getenv("STREAM_MAX_ROWS", "100000"))
+
+    # ASGI serving (asgi.py), see app/asgi.py: the feed, post, comment and
+    # live event reads run on an async engine, the rest on ASGI_THREADS
+    # threads. ASGI_DATABASE_URL overrides the database the async reads use
+    ASGI_DATABASE_URL = os.getenv("ASGI_DATABASE_URL", "")
+    ASGI_THREADS = int(os.getenv("ASGI_THREADS", "32"))
+    # open event streams per ASGI process: they wait on the loop, not on a
+    # thread, so the limit is about memory and file descriptors
+    ASGI_EVENTS_MAX_STREAMS = int(os.getenv("ASGI_EVENTS_MAX_STREAMS", "10000"))
@@ -0,0 +1,246 @@
+import logging
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import CompoundSelect, Select, TextClause, event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+# Engine profiles, picked from the database URL (DB_ENGINE_PROFILE="tuned";
+# "default" leaves every engine to SQLAlchemy's defaults, for comparison).
+#
+# SQLite (file databases):
+#   - WAL journal with synchronous=NORMAL: readers never block the writer
+#     and commits skip the fsync of the main file
+#   - busy_timeout, mmap_size and a per-connection page cache, set on connect
+#   - two engines on the same file: the default one is the writer, a single
+#     pooled connection that starts every transaction with BEGIN IMMEDIATE,
+#     so in-process writers queue on the pool (up to SQLITE_WRITER_POOL_TIMEOUT)
+#     and writers from other processes wait out busy_timeout instead of
+#     failing on a lock upgrade;
+#     the "reader" bind is a larger pool of query_only connections
+#   - RoutingSession sends plain SELECTs to the reader until the session
+#     writes, then keeps the rest of that transaction on the writer so it
+#     reads its own uncommitted rows (the same rule sends GET requests to a
+#     read replica, see app/replicas.py)
+#
+# Whatever the profile, every SQLite connection enforces foreign keys
+# (PRAGMA foreign_keys is off by default), so the ON DELETE CASCADE rules
+# of app/models.py delete a post's votes and comments, a comment's replies
+# and a user's rows in the database, as they do on Postgres.
+#
+# Postgres: a sized, pre-pinged, LIFO pool (idle extras age out) and
+# server-side statement / idle-in-transaction timeouts so one runaway
+# request cannot hold a connection or its locks indefinitely.
+
+READER_BIND = "reader"
+REPLICA_BIND_PREFIX = "replica_"
+
+
+class RoutingSession(Session):
+    """
+       Flask-SQLAlchemy session that sends reads to the request's replica
+       (app.replicas) or else the reader bind, when there is one.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get("wrote") and not self._flushing and _is_read(clause):
+            engines = self._db.engines
+            replica = g.get("db_replica") if has_request_context() else None
+            if replica is not None:
+                return engines[replica]
+            if READER_BIND in engines:
+                return engines[READER_BIND]
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if self._flushing or (clause is not None and not _is_read(clause)):
+            self.info["wrote"] = True
+            if has_request_context():
+                g.db_wrote = True
+        return engine
+
+
+def _is_read(clause):
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() == "SELECT"
+    return isinstance(clause, (Select, CompoundSelect)) and clause._for_update_arg is None
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
+
+
+def configure_engines(app):
+    """Fills SQLALCHEMY_ENGINE_OPTIONS / SQLALCHEMY_BINDS; call before db.init_app."""
+    config = app.config
+    replicas = [u.strip() for u in config.get("DB_REPLICA_URLS", "").split(",") if u.strip()]
+    for i, replica_url in enumerate(replicas):
+        config.setdefault("SQLALCHEMY_BINDS", {})[f"{REPLICA_BIND_PREFIX}{i}"] = {"url": replica_url}
+    if config.get("DB_ENGINE_PROFILE", "tuned") != "tuned":
+        return
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    options = config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+
+    if url.get_backend_name() == "postgresql":
+        options.setdefault("pool_size", config.get("DB_POOL_SIZE", 10))
+        options.setdefault("max_overflow", config.get("DB_MAX_OVERFLOW", 20))
+        options.setdefault("pool_timeout", config.get("DB_POOL_TIMEOUT", 10))
+        options.setdefault("pool_recycle", config.get("DB_POOL_RECYCLE", 1800))
+        options.setdefault("pool_pre_ping", True)
+        options.setdefault("pool_use_lifo", True)
+        timeouts = (
+            f"-c statement_timeout={config.get('DB_STATEMENT_TIMEOUT_MS', 15000)} "
+            f"-c idle_in_transaction_session_timeout={config.get('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000)}"
+        )
+        options.setdefault("connect_args", {}).setdefault("options", timeouts)
+
+    elif _is_sqlite_file(url):
+        busy_seconds = config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000
+        # in-process writers queue for the one writer connection up to
+        # SQLITE_WRITER_POOL_TIMEOUT, then the request fails with a 500
+        options.update(pool_size=1, max_overflow=0, pool_timeout=config.get("SQLITE_WRITER_POOL_TIMEOUT", 30))
+        readers = config.get("SQLITE_READER_POOL_SIZE", 8)
+        reader_pool = {"pool_size": readers, "max_overflow": readers, "pool_timeout": busy_seconds}
+        binds = config.setdefault("SQLALCHEMY_BINDS", {})
+        binds[READER_BIND] = {"url": config["SQLALCHEMY_DATABASE_URI"], **reader_pool}
+        # SQLite replicas are read the same way (the writer options are the defaults)
+        for name in replica_binds(config):
+            if _is_sqlite_file(make_url(binds[name]["url"])):
+                binds[name].update(reader_pool)
+
+
+def replica_binds(config):
+    return sorted(
+        (name for name in config.get("SQLALCHEMY_BINDS", {}) if name.startswith(REPLICA_BIND_PREFIX)),
+        key=lambda name: int(name[len(REPLICA_BIND_PREFIX):])
+    )
+
+
+def tune_connections(app):
+    """Installs the per-connection SQLite settings; call after db.init_app."""
+    from .extensions import db
+
+    with app.app_context():
+        engines = db.engines
+    for engine in engines.values():
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", _enforce_foreign_keys)
+
+    if app.config.get("DB_ENGINE_PROFILE", "tuned") != "tuned":
+        return
+    writer, reader = engines[None], engines.get(READER_BIND)
+    if reader is None:
+        return
+    readers = [reader] + [
+        engines[name] for name in replica_binds(app.config)
+        if engines[name].dialect.name == "sqlite"
+    ]
+
+    # Everything happens as connections open: creating the app never opens
+    # (or creates) the database file. Whichever connection comes first
+    # switches the file to WAL; for the others the pragma is a no-op.
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(writer, "connect")
+    def _connect_writer(dbapi_connection, connection_record):
+        # let the begin hook below issue BEGIN instead of the driver
+        dbapi_connection.isolation_level = None
+        _execute(dbapi_connection, pragmas + ["PRAGMA journal_mode = WAL"])
+
+    @event.listens_for(writer, "begin")
+    def _begin_writer(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def _connect_reader(dbapi_connection, connection_record):
+        _execute(dbapi_connection, pragmas + ["PRAGMA journal_mode = WAL", "PRAGMA query_only = 1"])
+
+    for engine in readers:
+        event.listen(engine, "connect", _connect_reader)
+    logger.info(f"SQLite tuned: WAL, 1 writer + {reader.pool.size()} reader connections")
+
+
+def _enforce_foreign_keys(dbapi_connection, connection_record):
+    # outside any transaction, where the pragma would be a no-op
+    _execute(dbapi_connection, ["PRAGMA foreign_keys = ON"])
+
+
+def sqlite_pragmas(config):
+    return [
+        f"PRAGMA busy_timeout = {int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA synchronous = {config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        # negative cache_size is in KiB
+        f"PRAGMA cache_size = -{int(config.get('SQLITE_CACHE_SIZE_KB', 65536))}",
+        f"PRAGMA mmap_size = {int(config.get('SQLITE_MMAP_SIZE', 268435456))}",
+    ]
+
+
+# ------------------------
+# Async engines (app/asgi.py)
+# ------------------------
+ASYNC_DRIVERS = {"sqlite": ("sqlite+aiosqlite", "aiosqlite"), "postgresql": ("postgresql+asyncpg", "asyncpg")}
+
+
+def create_async_engines(app):
+    """
+       Read-only async engines for the ASGI read paths: {None: primary, "replica_<n>": replica}.
+       Returns {} when the database cannot be shared with another engine
+       (in-memory SQLite).
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    config = app.config
+    urls = {None: config.get("ASGI_DATABASE_URL") or config["SQLALCHEMY_DATABASE_URI"]}
+    for name in replica_binds(config):
+        urls[name] = config["SQLALCHEMY_BINDS"][name]["url"]
+
+    tuned = config.get("DB_ENGINE_PROFILE", "tuned") == "tuned"
+    pragmas = sqlite_pragmas(config) + ["PRAGMA query_only = 1"]
+    engines = {}
+    for name, url in urls.items():
+        url = make_url(url)
+        backend = url.get_backend_name()
+        if backend == "sqlite" and not _is_sqlite_file(url):
+            return {}
+        if backend not in ASYNC_DRIVERS:
+            raise ValueError(f"No async driver for {backend} databases")
+        driver, package = ASYNC_DRIVERS[backend]
+        options = {}
+        if tuned and backend == "postgresql":
+            options = {
+                "pool_size": config.get("DB_POOL_SIZE", 10),
+                "max_overflow": config.get("DB_MAX_OVERFLOW", 20),
+                "pool_timeout": config.get("DB_POOL_TIMEOUT", 10),
+                "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+                "pool_pre_ping": True,
+                "pool_use_lifo": True,
+                "connect_args": {"server_settings": {
+                    "statement_timeout": str(config.get("DB_STATEMENT_TIMEOUT_MS", 15000)),
+                    "idle_in_transaction_session_timeout": str(config.get("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", 60000)),
+                }},
+            }
+        elif tuned:
+            readers = config.get("SQLITE_READER_POOL_SIZE", 8)
+            options = {"pool_size": readers, "max_overflow": readers}
+        try:
+            engine = create_async_engine(url.set(drivername=driver), **options)
+        except ImportError as e:
+            raise RuntimeError(f"ASGI serving of {backend} databases requires the '{package}' package") from e
+        if tuned and backend == "sqlite":
+            event.listen(engine.sync_engine, "connect", lambda dbapi_connection, record: _execute(dbapi_connection, pragmas))
+        engines[name] = engine
+    return engines
+
+
+def _is_sqlite_file(url):
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _execute(dbapi_connection, statements):
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in statements:
+            cursor.execute(statement)
+    finally:
+        cursor.close()
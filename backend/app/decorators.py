@@ -1,13 +1,14 @@
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
-from app.models import User
+from app.identity import current_identity
 
 def prevent_banned(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user = User.query.get(get_jwt_identity())
-        if user.is_banned:
+        identity = current_identity()
+        if not identity:
+            return jsonify({"msg": "User not found"}), 404
+        if identity.is_banned:
             return jsonify({"msg":"Your account is banned"}), 403
         return fn(*args, **kwargs)
     return wrapper
@@ -15,9 +16,8 @@ def prevent_banned(fn):
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user or not user.is_admin:
+        identity = current_identity()
+        if not identity or not identity.is_admin:
             return jsonify({"error": "Admin access required"}), 403
         return fn(*args, **kwargs)
     return wrapper
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+# backoff of RedisBroker's listener between reconnect attempts
+RECONNECT_MIN_SECONDS = 1
+RECONNECT_MAX_SECONDS = 30
+# Retry-After of a stream refused because the process has max_streams open
+STREAMS_FULL_RETRY_SECONDS = 30
+
+
+class StreamsFull(Exception):
+    """Raised by EventBus.stream() when the process already has max_streams open streams."""
+
+
+class Subscription:
+    """
+       One connected client. Holds at most `maxlen` undelivered events; when a
+       slow client falls further behind, the oldest events are dropped and the
+       client is told to resync instead of the publisher ever waiting on it.
+    """
+
+    def __init__(self, channel, maxlen):
+        self.channel = channel
+        self._events = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._waiters = []  # (loop, asyncio.Event) of pop_all_async callers
+        self.dropped = False
+
+    def push(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped = True
+            self._events.append(event)
+            self._wake()
+
+    def mark_dropped(self):
+        """Events may have been missed, e.g. while the broker reconnected: the client resyncs."""
+        with self._cond:
+            self.dropped = True
+            self._wake()
+
+    def _wake(self):
+        # caller holds _cond
+        self._cond.notify()
+        waiters, self._waiters = self._waiters, []
+        for loop, ready in waiters:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # that loop has shut down
+
+    def _take(self):
+        events = list(self._events)
+        self._events.clear()
+        dropped, self.dropped = self.dropped, False
+        return events, dropped
+
+    def pop_all(self, timeout):
+        """Waits up to `timeout` seconds; returns (events, dropped_since_last_call)."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            return self._take()
+
+    async def pop_all_async(self, timeout):
+        """pop_all for event loops: waits without holding a thread."""
+        with self._cond:
+            if self._events:
+                return self._take()
+            waiter = (asyncio.get_running_loop(), asyncio.Event())
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            return self._take()
+
+
+class EventStream:
+    """
+       SSE response body for one subscription. WSGI servers iterate it (a
+       thread per open stream); app.asgi iterates it asynchronously, so an
+       open stream costs no thread there. Unsubscribes when closed.
+    """
+
+    def __init__(self, bus, sub, heartbeat, max_age):
+        self.bus = bus
+        self.sub = sub
+        self.heartbeat = heartbeat
+        self.deadline = time.monotonic() + max_age
+
+    @staticmethod
+    def _frames(batch, dropped):
+        if dropped:
+            # the client fell behind and missed events; it should refetch
+            yield "event: resync\ndata: {}\n\n"
+        for event in batch:
+            yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        if not batch and not dropped:
+            yield ": keep-alive\n\n"
+
+    def __iter__(self):
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < self.deadline:
+                yield from self._frames(*self.sub.pop_all(timeout=self.heartbeat))
+        finally:
+            self.close()
+
+    async def __aiter__(self):
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < self.deadline:
+                for frame in self._frames(*await self.sub.pop_all_async(timeout=self.heartbeat)):
+                    yield frame
+        finally:
+            self.close()
+
+    def close(self):
+        self.bus.unsubscribe(self.sub)
+
+
+# ------------------------
+# Brokers
+# ------------------------
+class LocalBroker:
+    """Delivers only to subscribers in this process."""
+
+    def __init__(self, bus):
+        self.bus = bus
+
+    def publish(self, channel, event):
+        self.bus.deliver(channel, event)
+
+    def start(self):
+        pass
+
+
+class RedisBroker:
+    """
+       Publishes through Redis pub/sub so clients connected to any worker
+       process get the event. A listener thread per process feeds the local
+       subscribers; `client` is anything with the redis-py publish/pubsub API.
+    """
+
+    def __init__(self, bus, client, prefix="cp:events:"):
+        self.bus = bus
+        self.client = client
+        self.prefix = prefix
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        self.client.publish(self.prefix + channel, json.dumps(event))
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name="events-listener", daemon=True)
+                self._thread.start()
+
+    def _listen(self):
+        # runs for the life of the process: a lost connection is retried,
+        # since every SSE stream of this worker depends on it
+        delay, reconnecting = RECONNECT_MIN_SECONDS, False
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(self.prefix + "*")
+                if reconnecting:
+                    logger.info("Event listener reconnected to Redis")
+                    self.bus.resync_all()
+                delay = RECONNECT_MIN_SECONDS
+                for message in pubsub.listen():
+                    self._deliver(message)
+            except Exception as e:
+                logger.error(f"Event listener lost Redis, reconnecting in {delay}s: {e}")
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            reconnecting = True
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def _deliver(self, message):
+        try:
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            self.bus.deliver(channel[len(self.prefix):], json.loads(message["data"]))
+        except Exception as e:
+            logger.error(f"Dropping malformed event message: {e}")
+
+
+# ------------------------
+# Flask extension
+# ------------------------
+class EventBus:
+    """
+       Fan-out of live post events (votes, comments) to SSE streams.
+       Configured from:
+         EVENTS_BROKER       "local" (default) or "redis"
+         EVENTS_REDIS_URL    used when EVENTS_BROKER is "redis"
+         EVENTS_QUEUE_SIZE   undelivered events kept per connection
+         EVENTS_MAX_STREAMS  open streams per process, 0 for no limit (app.asgi
+                             sets ASGI_EVENTS_MAX_STREAMS instead)
+    """
+
+    def __init__(self):
+        self.queue_size = 100
+        self.max_streams = 0
+        self.broker = LocalBroker(self)
+        self._subscribers = defaultdict(set)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, broker=None):
+        self.queue_size = app.config.get("EVENTS_QUEUE_SIZE", 100)
+        self.max_streams = app.config.get("EVENTS_MAX_STREAMS", 0)
+        self.broker = broker or self._make_broker(app.config)
+        app.extensions["events"] = self
+
+    def _make_broker(self, config):
+        kind = config.get("EVENTS_BROKER", "local")
+        if kind == "local":
+            return LocalBroker(self)
+        if kind == "redis":
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("EVENTS_BROKER=redis requires the 'redis' package") from e
+            return RedisBroker(self, redis.Redis.from_url(config["EVENTS_REDIS_URL"]))
+        raise ValueError(f"Unknown EVENTS_BROKER: {kind}")
+
+    def subscribe(self, channel):
+        """Raises StreamsFull when max_streams subscriptions are already open."""
+        self.broker.start()
+        sub = Subscription(channel, self.queue_size)
+        with self._lock:
+            if self.max_streams and self._count >= self.max_streams:
+                raise StreamsFull(f"{self._count} event streams open")
+            self._subscribers[channel].add(sub)
+            self._count += 1
+        return sub
+
+    def stream(self, channel, heartbeat, max_age):
+        """Subscribes to `channel` and returns the SSE body (EventStream) for it."""
+        return EventStream(self, self.subscribe(channel), heartbeat, max_age)
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.channel)
+            if subs is not None and sub in subs:
+                subs.discard(sub)
+                self._count -= 1
+                if not subs:
+                    del self._subscribers[sub.channel]
+
+    def publish(self, channel, event_type, data):
+        try:
+            self.broker.publish(channel, {"type": event_type, "data": data})
+        except Exception as e:
+            # live updates are best effort; never fail the write that triggered them
+            logger.error(f"Failed to publish {event_type} on {channel}: {e}")
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subs = list(self._subscribers.get(channel, ()))
+        for sub in subs:
+            sub.push(event)
+
+    def resync_all(self):
+        with self._lock:
+            subs = [sub for channel_subs in self._subscribers.values() for sub in channel_subs]
+        for sub in subs:
+            sub.mark_dropped()
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+def post_channel(post_id):
+    return f"post:{post_id}"
@@ -1,7 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
+from .cache import Cache
+from .database import RoutingSession
+from .hashing import PasswordHasher
+from .events import EventBus
+from .instrumentation import Instrumentation
+from .vote_buffer import VoteBuffer
+from .replicas import ReplicaRouter
+from .jobs import PurgeJobs
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 jwt = JWTManager()
-migrate = Migrate()
\ No newline at end of file
+cache = Cache()
+hasher = PasswordHasher()
+events = EventBus()
+instrumentation = Instrumentation()
+vote_buffer = VoteBuffer()
+replicas = ReplicaRouter()
+purge_jobs = PurgeJobs()
@@ -0,0 +1,144 @@
+import atexit
+import base64
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from multiprocessing.context import SpawnContext, SpawnProcess
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_COSTS = {
+    "bcrypt": 12,         # log2 rounds
+    "pbkdf2": 600_000,    # iterations
+    "scrypt": 32768,      # N
+}
+
+
+# Pool processes are named with this prefix. Spawn re-imports the parent's
+# __main__ (run.py creates the app there) before an initializer could run,
+# but after the child takes its name, so the name is what tells app code it
+# is inside the pool. Other spawned processes, e.g. uvicorn workers, are
+# serving processes like any other.
+POOL_PROCESS_PREFIX = "password-hasher"
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full; routes turn it into a 429."""
+
+
+def in_hashing_pool():
+    """True inside a PasswordHasher pool process, where background threads must not start."""
+    return multiprocessing.current_process().name.startswith(POOL_PROCESS_PREFIX)
+
+
+class _PoolProcess(SpawnProcess):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = f"{POOL_PROCESS_PREFIX}-{self.name.rsplit('-', 1)[-1]}"
+
+
+class _PoolContext(SpawnContext):
+    Process = _PoolProcess
+
+
+# ------------------------
+# Pool workers (module level so they can be pickled)
+# ------------------------
+def _bcrypt_input(password):
+    # bcrypt only reads 72 bytes, so feed it a fixed-size digest of the password
+    return base64.b64encode(hashlib.sha256(password.encode()).digest())
+
+
+def _hash(algorithm, cost, password):
+    if algorithm == "bcrypt":
+        return bcrypt.hashpw(_bcrypt_input(password), bcrypt.gensalt(cost)).decode()
+    if algorithm == "pbkdf2":
+        return generate_password_hash(password, method=f"pbkdf2:sha256:{cost}")
+    if algorithm == "scrypt":
+        return generate_password_hash(password, method=f"scrypt:{cost}:8:1")
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def _verify(stored, password):
+    if stored.startswith("$2"):
+        return bcrypt.checkpw(_bcrypt_input(password), stored.encode())
+    return check_password_hash(stored, password)
+
+
+# ------------------------
+# Flask extension
+# ------------------------
+class PasswordHasher:
+    """
+       Hashes and verifies passwords in a bounded process pool so key
+       stretching never holds the GIL of a serving worker. Configured from:
+         PASSWORD_HASH_ALGORITHM  "bcrypt" (default), "pbkdf2" or "scrypt"
+         PASSWORD_HASH_COST       work factor, defaults per algorithm above
+         PASSWORD_HASH_WORKERS    pool processes, 0 hashes inline
+         PASSWORD_HASH_QUEUE      requests allowed to wait for a free process
+    """
+
+    def __init__(self):
+        self.algorithm = "bcrypt"
+        self.cost = DEFAULT_COSTS["bcrypt"]
+        self.workers = 0
+        self._pool = None
+        self._slots = None
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def init_app(self, app):
+        self.algorithm = app.config.get("PASSWORD_HASH_ALGORITHM", "bcrypt")
+        if self.algorithm not in DEFAULT_COSTS:
+            raise ValueError(f"Unknown PASSWORD_HASH_ALGORITHM: {self.algorithm}")
+        self.cost = app.config.get("PASSWORD_HASH_COST") or DEFAULT_COSTS[self.algorithm]
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))
+        queue = app.config.get("PASSWORD_HASH_QUEUE", self.workers * 8)
+        self._slots = threading.BoundedSemaphore(max(1, self.workers + queue))
+        self.shutdown()
+        app.extensions["password_hasher"] = self
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a threaded server that holds DB connections is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_PoolContext())
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, self.algorithm, self.cost, password)
+
+    def verify(self, stored, password):
+        if not stored:
+            return False
+        return self._run(_verify, stored, password)
+
+    def needs_rehash(self, stored):
+        """True when `stored` was made with another algorithm or work factor."""
+        if stored.startswith("$2"):
+            return self.algorithm != "bcrypt" or int(stored.split("$")[2]) != self.cost
+        method = stored.split("$", 1)[0]
+        if self.algorithm == "pbkdf2":
+            return method != f"pbkdf2:sha256:{self.cost}"
+        if self.algorithm == "scrypt":
+            return method != f"scrypt:{self.cost}:8:1"
+        return True
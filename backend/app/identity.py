@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+from flask import current_app, g
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_header, get_jwt_identity
+from flask_jwt_extended.exceptions import RevokedTokenError
+
+from .extensions import db, cache
+from .models import User
+
+# Who is making the request, resolved at most once per request.
+#
+# current_identity() only carries what the decorators and ownership checks
+# need (ban and admin flags) and is served from a short-TTL entry in the
+# shared cache, so most requests never query the user table for it.
+# current_user() loads the full row, also once per request.
+#
+# Access tokens carry the user's token_version, which a password change
+# bumps. current_identity() compares the two from the same cached entry and
+# answers a token issued before the change, or one whose user was deleted,
+# with a 401. So every write, admin request and /me checks it, at no extra
+# query; reads that only use the token's user id do not.
+
+Identity = namedtuple("Identity", ["id", "is_banned", "is_admin"])
+
+
+def _identity_key(user_id):
+    return f"identity:{user_id}"
+
+
+def current_user():
+    if "current_user" not in g:
+        user_id = get_jwt_identity()
+        g.current_user = db.session.get(User, int(user_id)) if user_id is not None else None
+    return g.current_user
+
+
+def current_identity():
+    if "identity" in g:
+        return g.identity
+
+    identity = None
+    user_id = get_jwt_identity()
+    if user_id is not None:
+        user_id = int(user_id)
+        flags = cache.get(_identity_key(user_id))
+        if flags is None:
+            user = current_user()
+            if user is not None:
+                flags = {
+                    "is_banned": bool(user.is_banned),
+                    "is_admin": bool(user.is_admin),
+                    "token_version": user.token_version,
+                }
+                cache.set(_identity_key(user_id), flags, current_app.config.get("IDENTITY_CACHE_TTL", 10))
+        if flags is None or get_jwt().get("tv", 0) != flags.get("token_version", 0):
+            raise RevokedTokenError(get_jwt_header(), get_jwt())
+        identity = Identity(user_id, flags["is_banned"], flags["is_admin"])
+
+    g.identity = identity
+    return identity
+
+
+def issue_token(user):
+    return create_access_token(identity=str(user.id), additional_claims={"tv": user.token_version})
+
+
+def invalidate_identity(user_id):
+    """Call after changing a user's ban or admin flag or token_version, or deleting them."""
+    cache.delete(_identity_key(user_id))
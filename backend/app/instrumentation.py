@@ -0,0 +1,353 @@
+import functools
+import heapq
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from flask import Response, abort, g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Opt-in per-request instrumentation (INSTRUMENTATION_ENABLED). For every
+# request it records wall time, SQL statement count, DB time, the slowest
+# statements and serialization time, and then:
+#   - adds a Server-Timing header (visible in the browser dev tools),
+#   - aggregates Prometheus metrics (per process), served at /metrics only
+#     with METRICS_ENABLED and only to a scraper holding METRICS_TOKEN or
+#     on METRICS_ALLOWED_IPS (loopback when neither is set),
+#   - logs the slowest statements of requests over INSTRUMENTATION_SLOW_MS,
+#   - with PROFILE_THRESHOLD_MS set, samples the request thread's stack and
+#     writes collapsed stacks ("frame;frame;frame count", the input of
+#     flamegraph.pl and speedscope) to PROFILE_DIR for requests over it.
+
+LOOPBACK_ADDRESSES = {"127.0.0.1", "::1"}
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    def __init__(self, slow_queries):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self._slow_queries = slow_queries
+        self._slowest = []  # min-heap of (seconds, seq, statement, shape)
+
+    def record_statement(self, statement, parameters, executemany, seconds):
+        self.statements += 1
+        self.db_time += seconds
+        entry = (seconds, self.statements, statement, _param_shape(parameters, executemany))
+        if len(self._slowest) < self._slow_queries:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self):
+        return [
+            {"ms": round(s * 1000, 3), "statement": stmt, "params": shape}
+            for s, _, stmt, shape in sorted(self._slowest, reverse=True)
+        ]
+
+
+def _param_shape(parameters, executemany):
+    """Types of the bound parameters, never their values."""
+    if executemany and parameters:
+        return f"{len(parameters)} x {_param_shape(parameters[0], False)}"
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(v).__name__ for v in parameters]
+    return type(parameters).__name__
+
+
+def current_stats():
+    return g.get("request_stats") if has_app_context() else None
+
+
+def timed_serialization(fn):
+    """
+       Adds the time spent in `fn` to the request's serialization time, minus
+       any SQL it runs (that is already counted as DB time).
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        stats = current_stats()
+        if stats is None:
+            return fn(*args, **kwargs)
+        started, db_before = time.perf_counter(), stats.db_time
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats.serialize_time += (time.perf_counter() - started) - (stats.db_time - db_before)
+    return wrapper
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Counts jsonify's encoding time as serialization time."""
+
+    @timed_serialization
+    def dumps(self, obj, **kwargs):
+        return super().dumps(obj, **kwargs)
+
+
+# ------------------------
+# SQL listeners (every engine, only active inside an instrumented request)
+# ------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None:
+        conn.info.setdefault("instrumentation_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    starts = conn.info.get("instrumentation_start")
+    if stats is None or not starts:
+        return
+    stats.record_statement(statement, parameters, executemany, time.perf_counter() - starts.pop())
+
+
+_listening = False
+_listen_lock = threading.Lock()
+
+
+def _listen_to_engines():
+    global _listening
+    with _listen_lock:
+        if not _listening:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            _listening = True
+
+
+# ------------------------
+# Metrics
+# ------------------------
+class Metrics:
+    """Per-process request metrics in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._duration_sum = defaultdict(float)
+        self._duration_buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self._statements = Counter()
+        self._db_seconds = defaultdict(float)
+        self._serialize_seconds = defaultdict(float)
+
+    def observe(self, endpoint, method, status, stats, seconds):
+        labels = (endpoint, method, str(status))
+        with self._lock:
+            self._requests[labels] += 1
+            self._duration_sum[labels] += seconds
+            buckets = self._duration_buckets[labels]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            self._statements[endpoint] += stats.statements
+            self._db_seconds[endpoint] += stats.db_time
+            self._serialize_seconds[endpoint] += stats.serialize_time
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Requests handled.",
+                "# TYPE http_requests_total counter",
+            ]
+            lines += [
+                f'http_requests_total{{endpoint="{e}",method="{m}",status="{s}"}} {n}'
+                for (e, m, s), n in sorted(self._requests.items())
+            ]
+            lines += [
+                "# HELP http_request_duration_seconds Wall time per request.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (e, m, s), buckets in sorted(self._duration_buckets.items()):
+                labels = f'endpoint="{e}",method="{m}",status="{s}"'
+                for bound, n in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {n}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {self._requests[(e, m, s)]}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {self._duration_sum[(e, m, s)]:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {self._requests[(e, m, s)]}")
+            for name, kind, help_text, values, fmt in (
+                ("db_statements_total", "counter", "SQL statements executed.", self._statements, "{}"),
+                ("db_seconds_total", "counter", "Time spent in SQL.", self._db_seconds, "{:.6f}"),
+                ("serialize_seconds_total", "counter", "Time spent serializing responses.",
+                 self._serialize_seconds, "{:.6f}"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f'{name}{{endpoint="{e}"}} {fmt.format(v)}' for e, v in sorted(values.items())]
+        return "\n".join(lines) + "\n"
+
+
+# ------------------------
+# Sampling profiler
+# ------------------------
+class StackSampler:
+    """
+       One daemon thread that snapshots the stacks of the threads currently
+       serving a request every `interval` seconds.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        samples = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def stop(self, thread_id):
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                targets = dict(self._targets)
+            if not targets:
+                continue
+            frames = sys._current_frames()
+            for thread_id, samples in targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+# ------------------------
+# Flask extension
+# ------------------------
+class Instrumentation:
+    """
+       Configured from:
+         INSTRUMENTATION_ENABLED       turn the whole layer on (off by default)
+         INSTRUMENTATION_SLOW_QUERIES  slowest statements kept per request
+         INSTRUMENTATION_SLOW_MS       log those statements for requests over this
+         METRICS_ENABLED               serve /metrics (off by default)
+         METRICS_TOKEN                 require "Authorization: Bearer <token>" on /metrics
+         METRICS_ALLOWED_IPS           comma-separated client addresses allowed on /metrics
+         PROFILE_THRESHOLD_MS          dump sampled stacks for requests over this, 0 disables
+         PROFILE_INTERVAL_MS           sampling interval
+         PROFILE_DIR                   where the .folded stack files go
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.metrics = Metrics()
+        self.sampler = None
+
+    def init_app(self, app):
+        self.enabled = app.config.get("INSTRUMENTATION_ENABLED", False)
+        app.extensions["instrumentation"] = self
+        if not self.enabled:
+            return
+
+        self.slow_queries = app.config.get("INSTRUMENTATION_SLOW_QUERIES", 5)
+        self.slow_ms = app.config.get("INSTRUMENTATION_SLOW_MS", 500)
+        self.profile_ms = app.config.get("PROFILE_THRESHOLD_MS", 0)
+        self.profile_dir = app.config.get("PROFILE_DIR", "profiles")
+        if self.profile_ms:
+            self.sampler = StackSampler(app.config.get("PROFILE_INTERVAL_MS", 5) / 1000)
+
+        _listen_to_engines()
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if app.config.get("METRICS_ENABLED", False):
+            self.metrics_token = app.config.get("METRICS_TOKEN", "")
+            self.metrics_ips = {
+                ip.strip() for ip in app.config.get("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()
+            }
+            if not self.metrics_token and not self.metrics_ips:
+                self.metrics_ips = LOOPBACK_ADDRESSES
+            app.add_url_rule("/metrics", "metrics", self._metrics_view)
+
+    def _before_request(self):
+        g.request_stats = RequestStats(self.slow_queries)
+        if self.sampler:
+            g.profile_samples = self.sampler.start(threading.get_ident())
+
+    def _after_request(self, response):
+        stats = g.pop("request_stats", None)
+        if stats is None:
+            return response
+        samples = g.pop("profile_samples", None)
+        if samples is not None:
+            self.sampler.stop(threading.get_ident())
+
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or "unmatched"
+        response.headers["Server-Timing"] = ", ".join([
+            f"app;dur={elapsed * 1000:.2f}",
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.statements} queries"',
+            f"serialize;dur={stats.serialize_time * 1000:.2f}",
+        ])
+        self.metrics.observe(endpoint, request.method, response.status_code, stats, elapsed)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= self.slow_ms:
+            logger.warning(
+                f"Slow request {request.method} {request.path}: {elapsed_ms:.1f}ms, "
+                f"{stats.statements} queries in {stats.db_time * 1000:.1f}ms, "
+                f"slowest: {stats.slowest()}"
+            )
+        if samples and elapsed_ms >= self.profile_ms:
+            self._dump_profile(endpoint, samples)
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when the view raised
+        if g.pop("profile_samples", None) is not None:
+            self.sampler.stop(threading.get_ident())
+
+    def _dump_profile(self, endpoint, samples):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            path = os.path.join(self.profile_dir, f"{stamp}-{endpoint}.folded")
+            with open(path, "w") as f:
+                for stack, count in samples.items():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"Wrote request profile to {path}")
+        except OSError as e:
+            logger.error(f"Could not write request profile: {e}")
+
+    def _metrics_allowed(self):
+        if self.metrics_ips and request.remote_addr not in self.metrics_ips:
+            return False
+        if self.metrics_token:
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            return hmac.compare_digest(supplied.encode(), self.metrics_token.encode())
+        return True
+
+    def _metrics_view(self):
+        # per-endpoint traffic is nobody else's business: look like any unknown path
+        if not self._metrics_allowed():
+            abort(404)
+        return Response(self.metrics.render(), mimetype="text/plain; version=0.0.4")
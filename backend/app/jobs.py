@@ -0,0 +1,103 @@
+import logging
+import threading
+from datetime import datetime, UTC
+
+logger = logging.getLogger(__name__)
+
+# Account purges too big to run inside an admin's request
+# (app.purge.purge_user) run here, one daemon thread per user, each with its
+# own app context and session. Status is kept in memory and mirrored to the
+# shared cache under purge:<user_id>, so any worker can answer
+# GET /api/admin/users/<id>/purge. A job lost with its process leaves the
+# user banned and partly deleted; starting the purge again finishes it.
+
+JOB_STATUS_TTL = 24 * 3600
+
+
+def _utcnow():
+    return datetime.now(UTC).isoformat()
+
+
+class PurgeJobs:
+    """
+       Configured from:
+         USER_PURGE_CHUNK_SIZE       rows deleted per transaction
+         USER_PURGE_PAUSE_SECONDS    sleep between chunks, lets other writers in
+         USER_PURGE_SYNC_MAX_ROWS    DELETE /api/admin/users/<id> purges inline up to this many rows
+    """
+
+    def __init__(self):
+        self.app = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.chunk_size = app.config.get("USER_PURGE_CHUNK_SIZE", 500)
+        self.pause = app.config.get("USER_PURGE_PAUSE_SECONDS", 0.0)
+        self.sync_max_rows = app.config.get("USER_PURGE_SYNC_MAX_ROWS", 2000)
+        app.extensions["purge_jobs"] = self
+
+    def start(self, user_id, requested_by=None):
+        """Starts purging `user_id` unless this process already is. Returns the job status."""
+        with self._lock:
+            job = self._jobs.get(user_id)
+            if job and job["state"] == "running":
+                return dict(job)
+            job = {
+                "user_id": user_id,
+                "state": "running",
+                "requested_by": requested_by,
+                "removed": {},
+                "started_at": _utcnow(),
+                "finished_at": None,
+                "error": None,
+            }
+            self._jobs[user_id] = job
+            self._save(job)
+        threading.Thread(target=self._run, args=(user_id,), name=f"purge-user-{user_id}", daemon=True).start()
+        logger.info(f"Purge of user {user_id} started by {requested_by}")
+        return dict(job)
+
+    def status(self, user_id):
+        from .extensions import cache
+
+        with self._lock:
+            job = self._jobs.get(user_id)
+            if job:
+                return dict(job)
+        return cache.get(self._key(user_id))
+
+    def _run(self, user_id):
+        from .extensions import db
+        from .purge import purge_user
+
+        with self.app.app_context():
+            try:
+                removed = purge_user(
+                    user_id, chunk_size=self.chunk_size, pause=self.pause,
+                    progress=lambda removed: self._update(user_id, removed=dict(removed))
+                )
+                self._update(user_id, state="done" if removed is not None else "not_found",
+                             removed=removed or {}, finished_at=_utcnow())
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Purge of user {user_id} failed: {e}")
+                self._update(user_id, state="failed", error=str(e), finished_at=_utcnow())
+            finally:
+                db.session.remove()
+
+    def _update(self, user_id, **fields):
+        with self._lock:
+            job = self._jobs[user_id]
+            job.update(fields)
+            self._save(job)
+
+    def _save(self, job):
+        from .extensions import cache
+
+        cache.set(self._key(job["user_id"]), dict(job), ttl=JOB_STATUS_TTL)
+
+    @staticmethod
+    def _key(user_id):
+        return f"purge:{user_id}"
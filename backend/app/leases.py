@@ -0,0 +1,58 @@
+import os
+import socket
+import time
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import JobLease
+
+# Leases for background jobs that should run in one process at a time,
+# across the workers of a host and across hosts, e.g. the hot rank refresher
+# every serving process starts (app/ranking.py). A lease is a JobLease row:
+# its holder renews it on each run, and once it expires (the holder died or
+# hung) the next process to ask takes it over. Expiry is wall-clock time, so
+# the hosts' clocks must agree to well within the lease's ttl.
+
+
+def lease_holder():
+    """This process's name in JobLease.holder."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(name, holder, ttl):
+    """
+       Takes lease `name` for `holder`, or renews it, for `ttl` seconds.
+       Returns True when `holder` has it. Commits.
+    """
+    now = time.time()
+    try:
+        taken = db.session.execute(
+            update(JobLease)
+            .where(JobLease.name == name, or_(JobLease.holder == holder, JobLease.expires_at <= now))
+            .values(holder=holder, expires_at=now + ttl)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not taken:
+            if db.session.scalar(select(JobLease.name).where(JobLease.name == name)) is not None:
+                db.session.rollback()
+                return False  # someone else holds it
+            db.session.add(JobLease(name=name, holder=holder, expires_at=now + ttl))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # another process created it first
+        db.session.rollback()
+        return False
+
+
+def release_lease(name, holder):
+    """Gives lease `name` up if `holder` has it, so another process can take it at once. Commits."""
+    db.session.execute(
+        update(JobLease)
+        .where(JobLease.name == name, JobLease.holder == holder)
+        .values(expires_at=0)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
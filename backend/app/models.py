@@ -1,6 +1,5 @@
-from .extensions import db
+from .extensions import db, hasher
 from datetime import datetime, UTC
-from werkzeug.security import generate_password_hash, check_password_hash
 
 # ------------------------
 # User Model
@@ -28,11 +27,35 @@ class User(db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     is_banned = db.Column(db.Boolean, default=False)
 
+    # bumped with every change to what /api/auth/me returns, backs its
+    # ETag / Last-Modified (see app/versions.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+    # carried in every access token (see app/identity.py) and bumped by a
+    # password change, so the tokens issued before it stop working
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # profile summary shown by /api/auth/me, kept up to date by the post,
+    # comment and vote write paths (see app/profiles.py)
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    karma = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # back the admin user listing (see routes/admin.py); email prefix
+    # searches use the unique index on email
+    __table_args__ = (
+        db.Index("ix_user_created_at_id", "created_at", "id"),
+        db.Index("ix_user_is_banned_created_at_id", "is_banned", "created_at", "id"),
+        db.Index("ix_user_is_admin_created_at_id", "is_admin", "created_at", "id"),
+        db.Index("ix_user_name", "name"),
+    )
+
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return hasher.verify(self.password, password)
 
 
 # ------------------------
@@ -45,6 +68,22 @@ class Post(db.Model):
     link = db.Column(db.String(300), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
 
+    # denormalized from Vote, maintained by app.votes.apply_vote_delta
+    upvote_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    downvote_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    score = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # time-decayed rank for sort=hot, maintained by app.ranking.refresh_hot_scores
+    hot_score = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+    hot_expires_at = db.Column(db.DateTime, nullable=True)
+    hot_dirty = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+
+    # bumped with every change to the post's serialized form, comments and
+    # author / commenter names included; backs the ETag / Last-Modified of
+    # the post, feed and comment endpoints (see app/versions.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime, nullable=True)
+
     author_id = db.Column(
         db.Integer,
         db.ForeignKey("user.id", name="fk_post_author_id", ondelete="CASCADE"),
@@ -60,6 +99,16 @@ class Post(db.Model):
         cascade="all, delete-orphan", passive_deletes=True
     )
 
+    # back the keyset feed orderings (see routes/post.py)
+    __table_args__ = (
+        db.Index("ix_post_created_at_id", "created_at", "id"),
+        db.Index("ix_post_author_id_created_at_id", "author_id", "created_at", "id"),
+        db.Index("ix_post_score_created_at_id", "score", "created_at", "id"),
+        db.Index("ix_post_hot_score_id", "hot_score", "id"),
+        db.Index("ix_post_hot_dirty", "hot_dirty"),
+        db.Index("ix_post_hot_expires_at", "hot_expires_at"),
+    )
+
 
 # ------------------------
 # Vote Model
@@ -83,6 +132,7 @@ class Vote(db.Model):
     # one vote per user per post
     __table_args__ = (
         db.UniqueConstraint('user_id', 'post_id', name='unique_user_vote'),
+        db.Index("ix_vote_post_id_value", "post_id", "value"),
     )
 
 
@@ -104,3 +154,66 @@ class Comment(db.Model):
         db.ForeignKey("post.id", name="fk_comment_post_id", ondelete="CASCADE"),
         nullable=False
     )
+
+    # reply threads, maintained by app.threads: `path` is the ancestors' ids
+    # plus the comment's own, each zero-padded, so a thread in path order is
+    # depth-first and a subtree is one contiguous range of the index below
+    parent_id = db.Column(
+        db.Integer,
+        db.ForeignKey("comment.id", name="fk_comment_parent_id", ondelete="CASCADE"),
+        nullable=True
+    )
+    path = db.Column(db.String(400), nullable=True)
+    depth = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    reply_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    descendant_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # back list_comments paging (whole thread / subtree, direct replies),
+    # the per-post comment counts and a user's comments in thread order
+    # (app/purge.py)
+    __table_args__ = (
+        db.Index("ix_comment_post_id_path", "post_id", "path"),
+        db.Index("ix_comment_post_id_parent_id_path", "post_id", "parent_id", "path"),
+        db.Index("ix_comment_parent_id", "parent_id"),
+        db.Index("ix_comment_author_id_post_id_path", "author_id", "post_id", "path"),
+    )
+
+
+# ------------------------
+# Site statistics rollups
+# ------------------------
+class SiteStats(db.Model):
+    """Single row (id=1) of site-wide totals, maintained by app.stats.bump_stats."""
+    id = db.Column(db.Integer, primary_key=True)
+    total_users = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    banned_users = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    active_admins = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    total_posts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    total_comments = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    total_votes = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+
+class DailyStat(db.Model):
+    """Per-day creation counts for the dashboard series (signups, posts, votes, comments)."""
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+
+# ------------------------
+# Replication heartbeat
+# ------------------------
+class ReplicaHeartbeat(db.Model):
+    """Single row (id=1) stamped on the primary; its age on a replica is that replica's lag (app.replicas)."""
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.Float, nullable=False)
+
+
+# ------------------------
+# Background job leases
+# ------------------------
+class JobLease(db.Model):
+    """Which process runs a singleton background job until expires_at (app.leases)."""
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.Float, nullable=False)
@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values, kind=None):
+    """
+       Packs the sort key of the last row of a page into an opaque, url-safe token.
+       Datetimes are stored as ISO strings and restored by decode_cursor.
+       `kind` names the order the key belongs to, for lists that have several.
+    """
+    payload = [
+        {"dt": v.isoformat()} if isinstance(v, datetime) else v
+        for v in values
+    ]
+    if kind is not None:
+        payload.insert(0, kind)
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, size, kind=None):
+    """
+       Reverses encode_cursor. Raises ValueError on anything that was not
+       produced by encode_cursor with `size` key parts and the same `kind`,
+       e.g. a cursor of another sort order that happens to have as many parts.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if kind is not None:
+        if not isinstance(payload, list) or not payload or payload[0] != kind:
+            raise ValueError("Invalid cursor")
+        payload = payload[1:]
+    if not isinstance(payload, list) or len(payload) != size:
+        raise ValueError("Invalid cursor")
+
+    values = []
+    for v in payload:
+        if isinstance(v, dict):
+            try:
+                v = datetime.fromisoformat(v.get("dt", ""))
+            except TypeError as e:
+                raise ValueError("Invalid cursor") from e
+        values.append(v)
+    return values
+
+
+def get_page_size():
+    limit = request.args.get("limit", default=DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def seek_filter(columns, values, descending=True):
+    """
+       Keyset predicate for a sort on `columns`: matches the rows that come
+       strictly after the cursor row, so the database can seek straight to
+       them through the matching index instead of skipping OFFSET rows.
+    """
+    clauses = []
+    for i, (col, val) in enumerate(zip(columns, values)):
+        prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*prefix, col < val if descending else col > val))
+    return or_(*clauses)
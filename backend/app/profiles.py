@@ -0,0 +1,117 @@
+from datetime import datetime, UTC
+
+from sqlalchemy import bindparam, func, select, update
+
+from .extensions import db
+from .models import Comment, Post, User
+
+# Profile summary behind /api/auth/me, so a page view never counts rows:
+#   User.post_count     posts the user wrote
+#   User.comment_count  comments the user wrote, replies included
+#   User.karma          summed score of the user's posts
+# The post, comment and vote write paths move them with
+# UPDATE x = x + n inside their own transaction, like site_stats
+# (app/stats.py). Every bump also moves User.version, since /me returns
+# them (app/versions.py). rebuild_user_counters() recomputes them from the
+# base tables, for the backfill and after bulk loads.
+
+COUNTERS = ("post_count", "comment_count", "karma")
+
+
+def _utcnow():
+    return datetime.now(UTC)
+
+
+def bump_user_counters(deltas):
+    """
+       `deltas` maps a user id to {counter: n} (counters from COUNTERS); all
+       of them are written with one executemany UPDATE. Runs inside the
+       caller's transaction; the caller commits.
+    """
+    params = [
+        {"uid": user_id, **{f"d_{c}": changes.get(c, 0) for c in COUNTERS}}
+        for user_id, changes in deltas.items()
+        if any(changes.values())
+    ]
+    if not params:
+        return
+    # Core table statement so the params list runs as a plain executemany
+    user = User.__table__
+    db.session.execute(
+        update(user)
+        .where(user.c.id == bindparam("uid"))
+        .values(
+            **{c: user.c[c] + bindparam(f"d_{c}") for c in COUNTERS},
+            version=user.c.version + 1,
+            updated_at=_utcnow()
+        ),
+        params
+    )
+
+
+def bump_karma(score_deltas):
+    """
+       Moves the karma of the authors of the posts in `score_deltas`
+       ({post_id: score delta}) without loading the posts.
+    """
+    params = [{"pid": post_id, "d_karma": delta} for post_id, delta in score_deltas.items() if delta]
+    if not params:
+        return
+    user, post = User.__table__, Post.__table__
+    author = select(post.c.author_id).where(post.c.id == bindparam("pid")).scalar_subquery()
+    db.session.execute(
+        update(user)
+        .where(user.c.id == author)
+        .values(karma=user.c.karma + bindparam("d_karma"), version=user.c.version + 1, updated_at=_utcnow()),
+        params
+    )
+
+
+def count_by_author(author_ids):
+    """{author_id: rows} of a select of author ids, e.g. the comments about to be deleted."""
+    rows = author_ids.subquery()
+    return dict(db.session.execute(
+        select(rows.c.author_id, func.count()).group_by(rows.c.author_id)
+    ).all())
+
+
+def rebuild_user_counters(user_ids=None, chunk_size=5000):
+    """
+       Recomputes post_count, comment_count and karma from the base tables
+       and writes the users whose counters drifted. Limited to `user_ids`
+       (ids or a select of ids) when given. Returns the number of users
+       updated; the caller commits.
+    """
+    def scoped(stmt, column):
+        return stmt if user_ids is None else stmt.where(column.in_(user_ids))
+
+    posts = {
+        author_id: (n, karma) for author_id, n, karma in db.session.execute(scoped(
+            select(Post.author_id, func.count(), func.coalesce(func.sum(Post.score), 0))
+            .group_by(Post.author_id), Post.author_id
+        ))
+    }
+    comments = dict(db.session.execute(scoped(
+        select(Comment.author_id, func.count()).group_by(Comment.author_id), Comment.author_id
+    )).all())
+
+    drifted = []
+    for user_id, post_count, comment_count, karma in db.session.execute(scoped(
+        select(User.id, User.post_count, User.comment_count, User.karma), User.id
+    )):
+        actual = (*posts.get(user_id, (0, 0)), comments.get(user_id, 0))
+        if (post_count, karma, comment_count) != actual:
+            drifted.append({"uid": user_id, "p": actual[0], "k": actual[1], "c": actual[2]})
+
+    user = User.__table__
+    stmt = (
+        update(user)
+        .where(user.c.id == bindparam("uid"))
+        .values(
+            post_count=bindparam("p"), comment_count=bindparam("c"), karma=bindparam("k"),
+            version=user.c.version + 1, updated_at=_utcnow()
+        )
+    )
+    for start in range(0, len(drifted), chunk_size):
+        db.session.execute(stmt, drifted[start:start + chunk_size])
+    return len(drifted)
@@ -0,0 +1,254 @@
+import logging
+import time
+
+from sqlalchemy import delete, func, select
+
+from .cache import SEARCH_SORTS, VOTE_SORTS
+from .events import post_channel
+from .extensions import db, cache, events
+from .identity import invalidate_identity
+from .models import Comment, Post, User, Vote
+from .profiles import bump_user_counters, count_by_author
+from .stats import bump_stats
+from .threads import delete_subtree, subtree_authors
+from .versions import touch_posts, touch_users
+from .votes import apply_vote_deltas, publish_vote_totals, vote_delta
+
+logger = logging.getLogger(__name__)
+
+# Deletes of posts, comment threads and whole accounts.
+#
+# Rows go with set-based DELETEs and the ON DELETE CASCADE rules of
+# app/models.py do the rest in the database (foreign keys are enforced on
+# SQLite too, see app/database.py): a post takes its votes and comments, a
+# comment subtree is one range DELETE (app/threads.py), a user takes
+# whatever is left of theirs. Nothing is loaded into the session to be
+# deleted row by row. What the database cannot do is keep the
+# denormalized counters right, so each delete first counts what it is about
+# to remove and moves site_stats, the profile counters (app/profiles.py),
+# the post vote counters and the versions in the same transaction.
+#
+# purge_user() deletes an account in chunks of USER_PURGE_CHUNK_SIZE rows,
+# one transaction each, so a user with years of activity never holds the
+# write lock for long: votes, then comments (each with its replies), then
+# posts, then the user row. The user is banned first, so nothing new comes
+# in meanwhile. The admin API runs large purges on a background thread
+# (app/jobs.py).
+
+
+def delete_posts(post_ids):
+    """
+       Deletes the posts in `post_ids` with their votes and comments.
+       Runs inside the caller's transaction; the caller commits and then
+       calls invalidate_posts() with the returned {post_id: author_id}.
+    """
+    posts = db.session.execute(
+        select(Post.id, Post.author_id, Post.score, Post.upvote_count + Post.downvote_count)
+        .where(Post.id.in_(post_ids))
+    ).all()
+    if not posts:
+        return {}
+    ids = [post_id for post_id, *_ in posts]
+
+    commenters = count_by_author(select(Comment.author_id).where(Comment.post_id.in_(ids)))
+    deltas = {uid: {"comment_count": -n} for uid, n in commenters.items()}
+    for _, author_id, score, _ in posts:
+        changes = deltas.setdefault(author_id, {})
+        changes["post_count"] = changes.get("post_count", 0) - 1
+        changes["karma"] = changes.get("karma", 0) - score
+    bump_user_counters(deltas)
+    bump_stats(
+        total_posts=-len(posts),
+        total_comments=-sum(commenters.values()),
+        total_votes=-sum(votes for *_, votes in posts)
+    )
+
+    db.session.execute(
+        delete(Post).where(Post.id.in_(ids)).execution_options(synchronize_session=False)
+    )
+    return {post_id: author_id for post_id, author_id, *_ in posts}
+
+
+def delete_comment(comment):
+    """
+       Deletes `comment` and its replies. Runs inside the caller's
+       transaction; the caller commits. Returns the number of comments
+       removed.
+    """
+    authors = count_by_author(subtree_authors(comment))
+    bump_user_counters({uid: {"comment_count": -n} for uid, n in authors.items()})
+    touch_posts([comment.post_id])
+    removed = delete_subtree(comment)
+    bump_stats(total_comments=-removed)
+    return removed
+
+
+def invalidate_posts(authors, sorts=SEARCH_SORTS):
+    """Drops the cached feed pages in `sorts` of the posts in `authors` ({post_id: author_id})."""
+    for author_id in set(authors.values()):
+        cache.invalidate_post(author_id, sorts)
+
+
+# ------------------------
+# Account purge
+# ------------------------
+def purge_size(user_id):
+    """Rough number of rows purge_user(user_id) deletes, to choose between inline and background."""
+    user = db.session.get(User, user_id)
+    if user is None:
+        return 0
+    votes = db.session.scalar(select(func.count()).select_from(Vote).where(Vote.user_id == user_id))
+    on_posts = db.session.execute(
+        select(
+            func.coalesce(func.sum(Post.upvote_count + Post.downvote_count), 0),
+            select(func.count()).select_from(Comment)
+            .join(Post, Comment.post_id == Post.id)
+            .where(Post.author_id == user_id)
+            .scalar_subquery()
+        ).where(Post.author_id == user_id)
+    ).one()
+    return 1 + votes + user.comment_count + user.post_count + on_posts[0] + on_posts[1]
+
+
+def _purge_votes(user_id, chunk_size):
+    rows = db.session.execute(
+        select(Vote.id, Vote.post_id, Vote.value).where(Vote.user_id == user_id).limit(chunk_size)
+    ).all()
+    if not rows:
+        return 0, None
+
+    deltas = {}
+    for _, post_id, value in rows:
+        up, down, score = vote_delta(value, None)
+        d_up, d_down, d_score = deltas.get(post_id, (0, 0, 0))
+        deltas[post_id] = (d_up + up, d_down + down, d_score + score)
+    db.session.execute(
+        delete(Vote)
+        .where(Vote.id.in_([vote_id for vote_id, *_ in rows]))
+        .execution_options(synchronize_session=False)
+    )
+    apply_vote_deltas(deltas)
+    bump_stats(total_votes=-len(rows))
+    authors = dict(db.session.execute(select(Post.id, Post.author_id).where(Post.id.in_(deltas))).all())
+
+    def after_commit():
+        invalidate_posts(authors, VOTE_SORTS)
+        publish_vote_totals(deltas)
+    return len(rows), after_commit
+
+
+def _purge_comments(user_id, chunk_size):
+    # thread order (ix_comment_author_id_post_id_path): a comment inside a
+    # subtree deleted earlier in the chunk comes right after its root
+    comments = (
+        Comment.query
+        .filter(Comment.author_id == user_id)
+        .order_by(Comment.post_id, Comment.path)
+        .limit(chunk_size)
+        .all()
+    )
+    if not comments:
+        return 0, None
+
+    removed, deleted, root = 0, [], None
+    for comment in comments:
+        if root is not None and comment.post_id == root[1] and comment.path.startswith(root[2]):
+            continue
+        root = (comment.id, comment.post_id, comment.path)
+        n = delete_comment(comment)
+        deleted.append((*root[:2], n))
+        removed += n
+
+    def after_commit():
+        # the posts' versions moved, and no feed order depends on comments
+        cache.invalidate_analytics()
+        for comment_id, post_id, n in deleted:
+            events.publish(post_channel(post_id), "comment_deleted",
+                           {"id": comment_id, "post_id": post_id, "removed": n})
+    return removed, after_commit
+
+
+def _purge_posts(user_id, chunk_size):
+    # as many posts as fit in the chunk with their votes and comments, at least one
+    candidates = db.session.execute(
+        select(Post.id, Post.upvote_count + Post.downvote_count)
+        .where(Post.author_id == user_id)
+        .limit(chunk_size)
+    ).all()
+    if not candidates:
+        return 0, None
+    comments = dict(db.session.execute(
+        select(Comment.post_id, func.count())
+        .where(Comment.post_id.in_([post_id for post_id, _ in candidates]))
+        .group_by(Comment.post_id)
+    ).all())
+
+    post_ids, rows = [], 0
+    for post_id, votes in candidates:
+        size = 1 + votes + comments.get(post_id, 0)
+        if post_ids and rows + size > chunk_size:
+            break
+        post_ids.append(post_id)
+        rows += size
+    authors = delete_posts(post_ids)
+    return rows, lambda: invalidate_posts(authors)
+
+
+PURGE_STEPS = (("votes", _purge_votes), ("comments", _purge_comments), ("posts", _purge_posts))
+
+
+def purge_user(user_id, chunk_size=500, pause=0.0, progress=None):
+    """
+       Deletes user `user_id` and everything they wrote, about `chunk_size`
+       rows per transaction. Calls progress(removed) after each chunk with
+       the running {"votes", "comments", "posts"} row counts (replies and
+       the votes and comments on the user's posts included) and sleeps
+       `pause` seconds between chunks. Commits as it goes; returns the
+       counts, or None if there is no such user.
+    """
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    if not user.is_banned:
+        user.is_banned = True
+        bump_stats(banned_users=1)
+        touch_users([user_id])
+        db.session.commit()
+        invalidate_identity(user_id)
+
+    removed = {stage: 0 for stage, _ in PURGE_STEPS}
+    for stage, step in PURGE_STEPS:
+        while True:
+            n, after_commit = step(user_id, chunk_size)
+            if not n:
+                break
+            db.session.commit()
+            after_commit()
+            removed[stage] += n
+            if progress:
+                progress(removed)
+            if pause:
+                time.sleep(pause)
+
+    # the user row, with whatever came in while the chunks ran (e.g. a
+    # buffered vote flushed meanwhile) in the same transaction
+    callbacks = []
+    for stage, step in PURGE_STEPS:
+        n, after_commit = step(user_id, chunk_size)
+        removed[stage] += n
+        if after_commit:
+            callbacks.append(after_commit)
+    is_admin = db.session.scalar(select(User.is_admin).where(User.id == user_id))
+    bump_stats(total_users=-1, banned_users=-1, active_admins=-1 if is_admin else 0)
+    db.session.execute(
+        delete(User).where(User.id == user_id).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    db.session.expire_all()
+
+    for after_commit in callbacks:
+        after_commit()
+    invalidate_identity(user_id)
+    cache.invalidate_analytics()
+    logger.info(f"Purged user {user_id}: {removed}")
+    return removed
@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from .extensions import db
+
+
+class QueryCounter:
+    """Collects every SQL statement sent to the engine while it is listening."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(*engines):
+    """
+       Counts on the given engines, or on every bind of `db` (reader included).
+       Usage (inside an app context):
+           with count_queries() as counter:
+               client.get("/api/posts/")
+           print(counter.count)
+    """
+    engines = engines or tuple(db.engines.values())
+    counter = QueryCounter()
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(limit, *engines):
+    """Fails with the offending statements if the block runs more than `limit` queries."""
+    with count_queries(*engines) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(counter.statements)
+        raise AssertionError(
+            f"Expected at most {limit} queries, got {counter.count}:\n{listing}"
+        )
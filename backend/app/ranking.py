@@ -0,0 +1,166 @@
+import logging
+import math
+import threading
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import bindparam, select, update
+
+from .extensions import db, cache
+from .hashing import in_hashing_pool
+from .leases import acquire_lease, lease_holder, release_lease
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# HN-style hot score: score / (age_hours + 2) ** GRAVITY.
+#
+# Age is quantized into geometric buckets (BUCKETS_PER_DOUBLING per doubling
+# of age) so a post only needs recomputing when its votes change or its age
+# crosses into the next bucket: hourly-ish while it is young, then rarer and
+# rarer. Each row stores when its current bucket ends in hot_expires_at, so
+# the refresher finds due rows with an index range scan.
+#
+# Every serving process starts a HotRankRefresher, but only the one holding
+# the "hot-rank-refresh" lease (app/leases.py) refreshes; the others check
+# back every interval and take over if the holder stops renewing it.
+
+GRAVITY = 1.8
+BUCKETS_PER_DOUBLING = 4
+REFRESH_LEASE = "hot-rank-refresh"
+# intervals a refresher may miss before another process takes over
+LEASE_INTERVALS = 3
+
+
+def _utcnow():
+    # created_at is stored as naive UTC
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def age_bucket(age_hours):
+    return int(math.log2(max(age_hours, 0) + 1) * BUCKETS_PER_DOUBLING)
+
+
+def bucket_start_hours(bucket):
+    return 2 ** (bucket / BUCKETS_PER_DOUBLING) - 1
+
+
+def hot_rank(score, created_at, now=None):
+    """Returns (hot_score, expires_at) for a post as of `now`."""
+    now = now or _utcnow()
+    age_hours = (now - created_at).total_seconds() / 3600
+    bucket = age_bucket(age_hours)
+    hot = score / (bucket_start_hours(bucket) + 2) ** GRAVITY
+    expires_at = created_at + timedelta(hours=bucket_start_hours(bucket + 1))
+    return hot, expires_at
+
+
+def refresh_hot_scores(now=None, batch_size=500):
+    """
+       Recomputes hot_score for posts whose votes changed (hot_dirty) or whose
+       age bucket rolled over. A row is only written back if its score did not
+       move in the meantime; otherwise it stays dirty for the next pass.
+       Returns the number of posts updated.
+    """
+    now = now or _utcnow()
+    # Core table statement so the params list runs as a plain executemany
+    post = Post.__table__
+    stmt = (
+        update(post)
+        .where(post.c.id == bindparam("pid"), post.c.score == bindparam("seen_score"))
+        .values(
+            hot_score=bindparam("hot_score"),
+            hot_expires_at=bindparam("hot_expires_at"),
+            hot_dirty=False
+        )
+    )
+
+    updated = 0
+    authors = set()
+    # two passes so each one is a plain scan of its own index
+    for due in (Post.hot_dirty.is_(True), Post.hot_expires_at <= now):
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(Post.id, Post.score, Post.created_at, Post.author_id)
+                .where(due, Post.id > last_id)
+                .order_by(Post.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            params = []
+            for pid, score, created_at, author_id in rows:
+                hot, expires_at = hot_rank(score, created_at, now)
+                params.append({
+                    "pid": pid,
+                    "seen_score": score,
+                    "hot_score": hot,
+                    "hot_expires_at": expires_at,
+                })
+                authors.add(author_id)
+            db.session.execute(stmt, params)
+            db.session.commit()
+            updated += len(params)
+            last_id = rows[-1][0]
+
+    if updated:
+        cache.invalidate_feed("hot", authors)
+    return updated
+
+
+class HotRankRefresher:
+    """
+       Daemon thread running refresh_hot_scores every `interval` seconds
+       while this process holds the refresh lease.
+    """
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self.holder = lease_holder()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hot-rank-refresher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        with self.app.app_context():
+            try:
+                release_lease(REFRESH_LEASE, self.holder)
+            except Exception as e:
+                logger.error(f"Releasing the hot score refresh lease failed: {e}")
+            finally:
+                db.session.remove()
+
+    def run_once(self):
+        """Refreshes if this process holds (or can take) the lease. Returns the posts updated, None if not the holder."""
+        if not acquire_lease(REFRESH_LEASE, self.holder, self.interval * LEASE_INTERVALS):
+            return None
+        return refresh_hot_scores()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    updated = self.run_once()
+                    if updated:
+                        logger.info(f"Refreshed hot score of {updated} posts")
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Hot score refresh failed: {e}")
+                finally:
+                    db.session.remove()
+            self._stop.wait(self.interval)
+
+
+def start_hot_refresher(app):
+    interval = app.config.get("HOT_REFRESH_INTERVAL", 0)
+    # the password hashing pool re-imports run.py
+    if interval <= 0 or in_hashing_pool():
+        return None
+    return HotRankRefresher(app, interval).start()
@@ -0,0 +1,188 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+from sqlalchemy import select, update
+
+from .hashing import in_hashing_pool
+
+logger = logging.getLogger(__name__)
+
+# Read-replica routing (DB_REPLICA_URLS).
+#
+# Each replica is a bind named replica_<n> (see app/database.py). A GET or
+# HEAD request picks one healthy replica up front, and RoutingSession sends
+# that request's plain SELECTs to it; anything that writes, and the rest of
+# its transaction, still goes to the primary. The request stays on the
+# primary when:
+#   - the user wrote something in the last DB_REPLICA_STICKY_SECONDS
+#     (read-your-writes; the marker lives in the shared cache, so
+#     multi-worker deployments need CACHE_BACKEND=redis for it to hold
+#     across workers)
+#   - no replica is within DB_REPLICA_MAX_LAG_SECONDS, or none was checked
+#     recently
+# Lag is measured with a heartbeat: every DB_REPLICA_CHECK_INTERVAL the
+# monitor stamps replica_heartbeat on the primary and reads the stamp back
+# from each replica; a replica's lag is the age of the oldest stamp it has
+# not received yet. Whatever replicates the database (streaming
+# replication, a file copy for SQLite) carries the row across.
+# Cache entries built from a replica are kept apart from the primary's and
+# expire within the lag bound (see app/cache.py).
+
+HEARTBEAT_ID = 1
+
+
+def _sticky_key(user_id):
+    return f"sticky:{user_id}"
+
+
+class ReplicaRouter:
+    """
+       Configured from:
+         DB_REPLICA_URLS              comma-separated replica database URLs, empty disables
+         DB_REPLICA_MAX_LAG_SECONDS   replicas further behind than this are skipped
+         DB_REPLICA_STICKY_SECONDS    how long a user's reads stay on the primary after a write
+         DB_REPLICA_CHECK_INTERVAL    seconds between heartbeat / lag checks
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.binds = []
+        self.lags = {}
+        self.checked_at = None
+        self.app = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._beats = deque(maxlen=256)  # stamps this process wrote, oldest first
+
+    def init_app(self, app):
+        from .database import replica_binds
+
+        self.binds = replica_binds(app.config)
+        self.enabled = bool(self.binds)
+        app.extensions["replicas"] = self
+        if not self.enabled:
+            return
+        self.app = app
+        self.max_lag = app.config.get("DB_REPLICA_MAX_LAG_SECONDS", 2.0)
+        self.sticky_seconds = app.config.get("DB_REPLICA_STICKY_SECONDS", 5)
+        self.interval = app.config.get("DB_REPLICA_CHECK_INTERVAL", 1.0)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    # ------------------------
+    # Routing
+    # ------------------------
+    def healthy(self):
+        """Replica binds currently within the lag bound."""
+        if self.checked_at is None or time.monotonic() - self.checked_at > 3 * self.interval:
+            return []
+        lags = self.lags
+        return [bind for bind in self.binds if lags.get(bind) is not None and lags[bind] <= self.max_lag]
+
+    def _before_request(self):
+        self._ensure_monitor()
+        if request.method not in ("GET", "HEAD"):
+            return
+        from .extensions import cache
+
+        user_id = _request_user_id()
+        if user_id is not None and cache.get(_sticky_key(user_id)):
+            return
+        healthy = self.healthy()
+        if healthy:
+            g.db_replica = random.choice(healthy)
+            g.cache_max_ttl = max(1, int(self.max_lag))
+
+    def _after_request(self, response):
+        if g.pop("db_wrote", False):
+            from .extensions import cache
+
+            user_id = _request_user_id()
+            if user_id is not None:
+                cache.set(_sticky_key(user_id), True, ttl=self.sticky_seconds)
+        return response
+
+    # ------------------------
+    # Lag monitor
+    # ------------------------
+    def _ensure_monitor(self):
+        # started lazily so it runs in every serving process, even forked ones
+        if self._thread is not None or in_hashing_pool():
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Replica check failed: {e}")
+            time.sleep(self.interval)
+
+    def check(self):
+        """Measures every replica's lag against the last heartbeat, then stamps a new one."""
+        from .extensions import db
+        from .models import ReplicaHeartbeat
+
+        with self.app.app_context():
+            lags = {}
+            for bind in self.binds:
+                try:
+                    with db.engines[bind].connect() as conn:
+                        seen = conn.execute(
+                            select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == HEARTBEAT_ID)
+                        ).scalar()
+                except Exception as e:
+                    if self.lags.get(bind) is not None:
+                        logger.warning(f"Replica {bind} unavailable: {e}")
+                    lags[bind] = None
+                    continue
+                if seen is None or not self._beats:
+                    lags[bind] = None  # not known until a stamp of ours could have arrived
+                    continue
+                missing = next((beat for beat in self._beats if beat > seen), None)
+                lags[bind] = 0.0 if missing is None else time.time() - missing
+                was_healthy = (self.lags.get(bind) or 0.0) <= self.max_lag
+                if lags[bind] > self.max_lag and was_healthy:
+                    logger.warning(f"Replica {bind} is {lags[bind]:.1f}s behind, reading from the primary")
+
+            beat = time.time()
+            try:
+                stamped = db.session.execute(
+                    update(ReplicaHeartbeat)
+                    .where(ReplicaHeartbeat.id == HEARTBEAT_ID)
+                    .values(beat_at=beat)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not stamped:
+                    db.session.add(ReplicaHeartbeat(id=HEARTBEAT_ID, beat_at=beat))
+                db.session.commit()
+                self._beats.append(beat)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+            self.lags = lags
+            self.checked_at = time.monotonic()
+        return lags
+
+
+def _request_user_id():
+    """The caller's user id from a valid access token, else None (never fails the request)."""
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return None
+    return get_jwt_identity()
@@ -2,20 +2,63 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app.decorators import prevent_banned, admin_required
-from app.models import db, User, Post, Comment, Vote
+from app.identity import current_identity, invalidate_identity
+from app.models import db, User
+from app.extensions import cache, purge_jobs
+from app.stats import bump_stats, site_analytics
+from app.serializers import serialize_user
+from app.versions import touch_users
+from app.purge import purge_size, purge_user
+from app.pagination import decode_cursor, encode_cursor, get_page_size, seek_filter
+from app.streaming import get_stream_limit, stream_list, streaming_requested
+from datetime import datetime, UTC
 import logging
-from sqlalchemy import func
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/api/admin")
+MAX_SERIES_DAYS = 365
 logger = logging.getLogger(__name__)
 
 def error_response(message, code=403):
     logger.warning(f"{code} - {message}")
     return jsonify({"msg": message}), code
 
-def is_admin_user(user_id):
-    user = User.query.get(user_id)
-    return user and user.is_admin
+def is_admin_user():
+    identity = current_identity()
+    return identity and identity.is_admin
+
+
+def _bool_arg(name):
+    value = request.args.get(name, type=str)
+    if value is None or value == "":
+        return None
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(f"Invalid {name}: expected true or false")
+
+
+def _datetime_arg(name):
+    value = request.args.get(name, type=str)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: expected an ISO 8601 date") from None
+    # created_at is stored as naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(UTC).replace(tzinfo=None)
+    return parsed
+
+
+def _prefix_filter(column, prefix):
+    """
+       Case-sensitive prefix match written as a range, so it can use a plain
+       B-tree index on `column` (LIKE 'x%' cannot on SQLite, nor on Postgres
+       outside the C locale).
+    """
+    return (column >= prefix) & (column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
 
 
 # -------------------------------
@@ -26,7 +69,7 @@ def is_admin_user(user_id):
 @prevent_banned
 def toggle_ban_user(user_id):
     admin_id = int(get_jwt_identity())
-    if not is_admin_user(admin_id):
+    if not is_admin_user():
         return error_response("Admin access required")
 
     user = User.query.get(user_id)
@@ -34,11 +77,15 @@ def toggle_ban_user(user_id):
         return error_response("User not found", 404)
 
     user.is_banned = not user.is_banned
+    bump_stats(banned_users=1 if user.is_banned else -1)
+    touch_users([user_id])
     db.session.commit()
+    invalidate_identity(user_id)
+    cache.invalidate_analytics()
     status = "banned" if user.is_banned else "unbanned"
 
     logger.info(f"Admin {admin_id} {status} user {user_id}")
-    return jsonify({"msg": f"User {status}"}), 200
+    return jsonify({"msg": f"User {status}", "user": serialize_user(user)}), 200
 
 
 # -------------------------------
@@ -49,23 +96,54 @@ def toggle_ban_user(user_id):
 @prevent_banned
 def view_users():
     admin_id = int(get_jwt_identity())
-    if not is_admin_user(admin_id):
+    if not is_admin_user():
         return error_response("Admin access required")
 
-    users = User.query.all()
-    data = [
-        {
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "created_at": u.created_at.isoformat(),
-            "is_admin": u.is_admin,
-            "is_banned": u.is_banned
-        } for u in users
-    ]
-
-    logger.info(f"Admin {admin_id} viewed all users")
-    return jsonify(data), 200
+    q = User.query
+    try:
+        for arg, column in (("banned", User.is_banned), ("admin", User.is_admin)):
+            flag = _bool_arg(arg)
+            if flag is not None:
+                q = q.filter(column == flag)
+        created_after = _datetime_arg("created_after")
+        if created_after:
+            q = q.filter(User.created_at >= created_after)
+        created_before = _datetime_arg("created_before")
+        if created_before:
+            q = q.filter(User.created_at < created_before)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    for arg, column in (("email", User.email), ("name", User.name)):
+        prefix = request.args.get(arg, type=str)
+        if prefix:
+            q = q.filter(_prefix_filter(column, prefix))
+
+    # newest first; the keyset cursor seeks on (created_at, id)
+    sort_key = [User.created_at, User.id]
+    cursor = request.args.get("cursor", type=str)
+    if cursor:
+        try:
+            q = q.filter(seek_filter(sort_key, decode_cursor(cursor, 2)))
+        except ValueError:
+            return error_response("Invalid cursor", 400)
+
+    q = q.order_by(*(col.desc() for col in sort_key))
+    logger.info(f"Admin {admin_id} viewed users")
+    if streaming_requested():
+        return stream_list(
+            "users", q, lambda users: [serialize_user(u) for u in users],
+            lambda u: encode_cursor(u.created_at, u.id), get_stream_limit()
+        )
+
+    limit = get_page_size()
+    users = q.limit(limit + 1).all()
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+
+    return jsonify({"users": [serialize_user(u) for u in users], "next_cursor": next_cursor}), 200
+
 
 
 # -------------------------------
@@ -76,41 +154,18 @@ def view_users():
 @prevent_banned
 def get_analytics():
     admin_id = int(get_jwt_identity())
-    if not is_admin_user(admin_id):
+    if not is_admin_user():
         return error_response("Admin access required")
 
-    total_users = User.query.count()
-    banned_users = User.query.filter_by(is_banned=True).count()
-    active_admins = User.query.filter_by(is_admin=True).count()
-
-    total_posts = Post.query.count()
-    total_comments = Comment.query.count()
-
-    top_post = (
-        db.session.query(Post)
-        .outerjoin(Vote)
-        .group_by(Post.id)
-        .order_by(func.sum(Vote.value).desc())
-        .first()
-    )
-
-    top_post_data = {
-        "id": top_post.id,
-        "title": top_post.title,
-        "upvotes": sum(v.value for v in top_post.votes if v.value == 1),
-        "comments": len(top_post.comments)
-    } if top_post else None
+    days = max(1, min(request.args.get("days", default=30, type=int), MAX_SERIES_DAYS))
+    key = cache.analytics_key(days)
+    data = cache.get(key)
+    if data is None:
+        data = site_analytics(days)
+        cache.set(key, data)
 
     logger.info(f"Admin {admin_id} fetched analytics")
-
-    return jsonify({
-        "total_users": total_users,
-        "banned_users": banned_users,
-        "active_admins": active_admins,
-        "total_posts": total_posts,
-        "total_comments": total_comments,
-        "top_post": top_post_data
-    }), 200
+    return jsonify(data), 200
 
 
 @admin_bp.route("/users/<int:user_id>/set-admin", methods=["PATCH"])
@@ -131,8 +186,75 @@ def set_admin_role(user_id):
     if not user:
         return error_response("User not found", 404)
 
+    if bool(user.is_admin) != bool(make_admin):
+        bump_stats(active_admins=1 if make_admin else -1)
     user.is_admin = bool(make_admin)
+    touch_users([user_id])
     db.session.commit()
+    invalidate_identity(user_id)
+    cache.invalidate_analytics()
+
+    return jsonify({
+        "msg": f"User {'promoted to' if make_admin else 'demoted from'} admin",
+        "user": serialize_user(user)
+    }), 200
+
+
+# -------------------------------
+# Delete a User and everything they wrote
+# -------------------------------
+@admin_bp.route("/users/<int:user_id>", methods=["DELETE"])
+@jwt_required()
+@admin_required
+def delete_user(user_id):
+    admin_id = int(get_jwt_identity())
+    if admin_id == user_id:
+        return error_response("You cannot delete your own account", 403)
+    if not db.session.get(User, user_id):
+        return error_response("User not found", 404)
+
+    # small accounts go inline, big ones to a background job (app/jobs.py)
+    size = purge_size(user_id)
+    if size > purge_jobs.sync_max_rows:
+        job = purge_jobs.start(user_id, requested_by=admin_id)
+        logger.info(f"Admin {admin_id} queued the purge of user {user_id} (~{size} rows)")
+        return jsonify({"msg": "User purge started", "job": job}), 202
+
+    removed = purge_user(user_id, chunk_size=purge_jobs.chunk_size)
+    logger.info(f"Admin {admin_id} deleted user {user_id}")
+    return jsonify({"msg": "User deleted", "removed": removed}), 200
+
+
+@admin_bp.route("/users/<int:user_id>/purge", methods=["POST"])
+@jwt_required()
+@admin_required
+def start_user_purge(user_id):
+    admin_id = int(get_jwt_identity())
+    if admin_id == user_id:
+        return error_response("You cannot delete your own account", 403)
+    if not db.session.get(User, user_id):
+        return error_response("User not found", 404)
+
+    job = purge_jobs.start(user_id, requested_by=admin_id)
+    logger.info(f"Admin {admin_id} queued the purge of user {user_id}")
+    return jsonify({"msg": "User purge started", "job": job}), 202
+
+
+@admin_bp.route("/users/<int:user_id>/purge", methods=["GET"])
+@jwt_required()
+@admin_required
+def get_user_purge(user_id):
+    job = purge_jobs.status(user_id)
+    if not job:
+        return error_response("No purge job for this user", 404)
+    return jsonify(job), 200
 
-    return jsonify({"msg": f"User {'promoted to' if make_admin else 'demoted from'} admin"}), 200
 
+# -------------------------------
+# Cache counters
+# -------------------------------
+@admin_bp.route("/cache-stats", methods=["GET"])
+@jwt_required()
+@admin_required
+def get_cache_stats():
+    return jsonify(cache.stats()), 200
@@ -1,16 +1,31 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from app.decorators import prevent_banned
-from app.models import User
-from app.extensions import db
+from app.identity import current_user, invalidate_identity, issue_token
+from app.models import User, Post
+from app.serializers import serialize_posts
+from app.extensions import db, cache, hasher
+from app.hashing import HasherBusy
+from app.stats import bump_stats
+from app.pagination import decode_cursor, encode_cursor, get_page_size, seek_filter
+from app.versions import (
+    digest_tag, last_modified_of, make_tag, not_modified, touch_renamed_user, touch_users, with_validators
+)
 import logging
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 logger = logging.getLogger(__name__)
 
 
+@auth_bp.errorhandler(HasherBusy)
+def hasher_busy(e):
+    logger.warning("429 - Password hashing queue is full")
+    response = jsonify({"msg": "Too many requests, please retry shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 429
+
+
 @auth_bp.route("/register", methods=["POST"])
 def register():
     data = request.get_json()
@@ -26,10 +41,12 @@ def register():
         logger.info(f"Registration attempt with existing email: {email}")
         return jsonify({"msg": "Email already registered"}), 409
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = hasher.hash(password)
     new_user = User(name=name, email=email, password=hashed_password)
     db.session.add(new_user)
+    bump_stats(total_users=1, daily="signups")
     db.session.commit()
+    cache.invalidate_analytics()
 
     logger.info(f"User registered successfully: {email}")
     return jsonify({"msg": "Registration successful"}), 201
@@ -53,11 +70,16 @@ def login():
         logger.warning(f"Banned user {email} attempted login")
         return jsonify({"msg": "User is banned"}), 403
 
-    if not check_password_hash(user.password, password):
+    if not hasher.verify(user.password, password):
         logger.warning(f"Failed login attempt for email: {email}")
         return jsonify({"msg": "Invalid credentials"}), 401
 
-    token = create_access_token(identity=str(user.id))
+    if hasher.needs_rehash(user.password):
+        user.password = hasher.hash(password)
+        db.session.commit()
+        logger.info(f"Rehashed password for {email}")
+
+    token = issue_token(user)
     logger.info(f"User logged in: {email}")
     return jsonify({"access_token": token}), 200
 
@@ -66,32 +88,59 @@ def login():
 @jwt_required()
 @prevent_banned
 def get_current_user():
-    user_id = get_jwt_identity()
-    user = User.query.get_or_404(user_id)
-
-    def post_with_votes(post):
-        upvotes = sum(1 for v in post.votes if v.value == 1)
-        downvotes = sum(1 for v in post.votes if v.value == -1)
-        return {
-            "id": post.id,
-            "title": post.title,
-            "content": post.content,
-            "link": post.link,
-            "created_at": post.created_at.isoformat(),
-            "author_name": user.name,
-            "upvotes": upvotes,
-            "downvotes": downvotes,
-            "comments": [c.id for c in post.comments],
-        }
-
-    return jsonify({
+    user = current_user()
+    if not user:
+        return jsonify({"msg": "User not found"}), 404
+    etag = make_tag("me", user.id, user.version)
+    unchanged = not_modified(etag, last_modified_of(user))
+    if unchanged:
+        return unchanged
+
+    # counters are maintained by the write paths (app/profiles.py); the posts are at /me/posts
+    return with_validators(jsonify({
         "id": user.id,
         "name": user.name,
         "email": user.email,
         "is_admin": user.is_admin,
-        "posts": [post_with_votes(p) for p in user.posts],
-        "comment_count": len(user.comments),
-    })
+        "post_count": user.post_count,
+        "comment_count": user.comment_count,
+        "karma": user.karma,
+    }), etag, last_modified_of(user))
+
+
+@auth_bp.route("/me/posts", methods=["GET"])
+@jwt_required()
+@prevent_banned
+def get_current_user_posts():
+    user_id = int(get_jwt_identity())
+    limit = get_page_size()
+
+    # newest first, off ix_post_author_id_created_at_id
+    sort_key = [Post.created_at, Post.id]
+    q = Post.query.filter(Post.author_id == user_id)
+    cursor = request.args.get("cursor", type=str)
+    if cursor:
+        try:
+            q = q.filter(seek_filter(sort_key, decode_cursor(cursor, 2)))
+        except ValueError:
+            return jsonify({"msg": "Invalid cursor"}), 400
+
+    posts = q.order_by(*(col.desc() for col in sort_key)).limit(limit + 1).all()
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+
+    etag = digest_tag("my-posts", [(p.id, p.version) for p in posts] + [(next_cursor,)])
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    user = current_user()
+    return with_validators(jsonify({
+        "posts": serialize_posts(posts, comments="count", authors={user_id: user.name if user else None}),
+        "next_cursor": next_cursor
+    }), etag)
 
 
 
@@ -99,8 +148,7 @@ def get_current_user():
 @jwt_required()
 @prevent_banned
 def update_user_info():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user()
     if not user:
         return jsonify({"msg": "User not found"}), 404
 
@@ -108,15 +156,22 @@ def update_user_info():
     new_name = data.get("name", "").strip()
     new_email = data.get("email", "").strip()
 
-    if new_email and User.query.filter(User.email == new_email, User.id != user_id).first():
+    if new_email and User.query.filter(User.email == new_email, User.id != user.id).first():
         return jsonify({"msg": "Email already in use"}), 409
 
+    renamed = bool(new_name) and new_name != user.name
     if new_name:
         user.name = new_name
     if new_email:
         user.email = new_email
 
+    if renamed:
+        touch_renamed_user(user.id)
+    else:
+        touch_users([user.id])
     db.session.commit()
+    if renamed:
+        cache.invalidate_author(user.id)
     logger.info(f"User {user.id} updated their info")
     return jsonify({"msg": "User info updated"}), 200
 
@@ -125,8 +180,7 @@ def update_user_info():
 @jwt_required()
 @prevent_banned
 def change_password():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user()
     if not user:
         return jsonify({"msg": "User not found"}), 404
 
@@ -137,10 +191,13 @@ def change_password():
     if not old_pw or not new_pw:
         return jsonify({"msg": "Both old and new passwords are required"}), 400
 
-    if not check_password_hash(user.password, old_pw):
+    if not hasher.verify(user.password, old_pw):
         return jsonify({"msg": "Old password is incorrect"}), 403
 
-    user.password = generate_password_hash(new_pw)
+    # signs out every other session; this one gets a fresh token
+    user.password = hasher.hash(new_pw)
+    user.token_version += 1
     db.session.commit()
+    invalidate_identity(user.id)
     logger.info(f"User {user.email} changed their password")
-    return jsonify({"msg": "Password updated successfully"}), 200
+    return jsonify({"msg": "Password updated successfully", "access_token": issue_token(user)}), 200
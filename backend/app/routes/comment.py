@@ -1,8 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app.decorators import prevent_banned
-from app.models import db, Comment, User
+from app.identity import current_identity, current_user
+from app.models import db, Comment, User, Post
+from app.extensions import cache, events
+from app.events import post_channel
+from app.serializers import serialize_comment
+from app.stats import bump_stats
+from app.profiles import bump_user_counters
+from app.purge import delete_comment as delete_comment_thread
+from app.versions import last_modified_of, make_tag, not_modified, touch_posts, with_validators
+from app.pagination import decode_cursor, encode_cursor, get_page_size
+from app.streaming import get_stream_limit, stream_list, streaming_requested
+from app.threads import attach_comment, subtree_filter
 import logging
 
 comment_bp = Blueprint("comment_bp", __name__, url_prefix="/api/comments")
@@ -26,10 +37,23 @@ def add_comment():
 
     content = data.get("content")
     post_id = data.get("post_id")
+    parent_id = data.get("parent_id")
 
     if not content or not post_id:
         return error_response("Content and post_id are required", 400)
 
+    post_author_id = db.session.query(Post.author_id).filter_by(id=post_id).scalar()
+    if post_author_id is None:
+        return error_response("Post not found", 404)
+
+    parent = None
+    if parent_id is not None:
+        parent = Comment.query.filter_by(id=parent_id, post_id=post_id).first()
+        if parent is None:
+            return error_response("Parent comment not found", 404)
+        if parent.depth + 1 >= current_app.config.get("COMMENT_MAX_DEPTH", 32):
+            return error_response("Replies are nested too deep", 400)
+
     try:
         comment = Comment(
             content=content,
@@ -37,10 +61,18 @@ def add_comment():
             post_id=post_id
         )
         db.session.add(comment)
+        attach_comment(comment, parent)
+        bump_stats(total_comments=1, daily="comments")
+        bump_user_counters({user_id: {"comment_count": 1}})
+        touch_posts([post_id])
         db.session.commit()
+        # the post's version moved, and no feed order depends on comments
+        cache.invalidate_analytics()
+        events.publish(post_channel(post_id), "comment_added",
+                       serialize_comment(comment, current_user().name))
 
         logger.info(f"User {user_id} added comment to post {post_id}")
-        return jsonify({"msg": "Comment added"}), 201
+        return jsonify({"msg": "Comment added", "id": comment.id}), 201
 
     except Exception as e:
         db.session.rollback()
@@ -57,18 +89,22 @@ def add_comment():
 def delete_comment(comment_id):
     user_id = int(get_jwt_identity())
     comment = Comment.query.get(comment_id)
-    user = User.query.get(user_id)
 
     if not comment:
         return error_response("Comment not found", 404)
 
-    if comment.author_id != user_id and not (user and user.is_admin):
+    if comment.author_id != user_id and not current_identity().is_admin:
         return error_response("Unauthorized", 403)
 
     try:
-        db.session.delete(comment)
+        post_id = comment.post_id
+        # replies go with the comment
+        removed = delete_comment_thread(comment)
         db.session.commit()
-        logger.info(f"User {user_id} deleted comment {comment_id}")
+        cache.invalidate_analytics()
+        events.publish(post_channel(post_id), "comment_deleted",
+                       {"id": comment_id, "post_id": post_id, "removed": removed})
+        logger.info(f"User {user_id} deleted comment {comment_id} ({removed} with replies)")
         return jsonify({"msg": "Comment deleted"}), 200
 
     except Exception as e:
@@ -76,28 +112,91 @@ def delete_comment(comment_id):
         logger.error(f"Error deleting comment {comment_id}: {e}")
         return error_response("Internal server error", 500)
 
+
+# -------------------------------
+# List a thread or one subtree of it
+# -------------------------------
 @comment_bp.route("", methods=["GET"])
 @jwt_required()
 def list_comments():
+    """
+       Comments of `post_id` in thread order (depth-first, replies in posting
+       order), paged with `cursor`. `parent_id` limits the page to the
+       replies under that comment ("load more replies"), `depth` to that
+       many levels below the top-level comments or `parent_id`.
+    """
     post_id = request.args.get("post_id", type=int)
     if not post_id:
         return jsonify({"msg": "post_id is required"}), 400
 
-    comments = (
-        Comment.query
-        .filter_by(post_id=post_id)
-        .order_by(Comment.created_at.asc())
-        .all()
+    parent_id = request.args.get("parent_id", type=int)
+    depth = request.args.get("depth", type=int)
+    if depth is not None and depth < 1:
+        return error_response("depth must be at least 1", 400)
+    cursor = request.args.get("cursor", type=str)
+    limit = get_page_size()
+
+    # every comment change bumps the post's version
+    streaming = streaming_requested()
+    head = db.session.query(Post.version, Post.updated_at, Post.created_at).filter_by(id=post_id).first()
+    etag = head and make_tag("comments", post_id, head.version, parent_id or "", depth or "", cursor or "", limit)
+    if head and not streaming:
+        unchanged = not_modified(etag, last_modified_of(head))
+        if unchanged:
+            return unchanged
+
+    q = (
+        db.session
+        .query(Comment, User.name)
+        .outerjoin(User, Comment.author_id == User.id)
+        .filter(Comment.post_id == post_id)
     )
 
-    result = []
-    for c in comments:
-        result.append({
-            "id": c.id,
-            "content": c.content,
-            "author_id": c.author_id,
-            "author_name": c.author.name if c.author else "Unknown",
-            "created_at": c.created_at.isoformat(),
-            **({"parent_id": c.parent_id} if hasattr(c, "parent_id") else {})
-        })
-    return jsonify(result), 200
+    base_depth = 0
+    if parent_id is not None:
+        parent = (
+            db.session.query(Comment.path, Comment.depth)
+            .filter_by(id=parent_id, post_id=post_id)
+            .first()
+        )
+        if parent is None:
+            return error_response("Parent comment not found", 404)
+        base_depth = parent.depth + 1
+
+    if depth == 1:
+        # direct replies only: ix_comment_post_id_parent_id_path
+        q = q.filter(Comment.parent_id == parent_id)
+    else:
+        # the whole thread or subtree is one range of ix_comment_post_id_path
+        if parent_id is not None:
+            q = q.filter(*subtree_filter(parent.path))
+        if depth is not None:
+            q = q.filter(Comment.depth < base_depth + depth)
+
+    if cursor:
+        try:
+            (after,) = decode_cursor(cursor, 1)
+        except ValueError:
+            return error_response("Invalid cursor", 400)
+        if not isinstance(after, str):
+            return error_response("Invalid cursor", 400)
+        q = q.filter(Comment.path > after)
+
+    q = q.order_by(Comment.path)
+    if streaming:
+        return stream_list(
+            "comments", q, lambda rows: [serialize_comment(c, author_name) for c, author_name in rows],
+            lambda row: encode_cursor(row[0].path), get_stream_limit()
+        )
+
+    rows = q.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0].path)
+
+    result = [serialize_comment(c, author_name) for c, author_name in rows]
+    response = jsonify({"comments": result, "next_cursor": next_cursor})
+    if head:
+        with_validators(response, etag, last_modified_of(head))
+    return response, 200
@@ -1,9 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, abort, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from app.decorators import prevent_banned
-from app.models import Post, User, Vote
-from app.extensions import db
+from app.identity import current_identity
+from app.models import Post, Vote
+from app.cache import SEARCH_SORTS
+from app.extensions import db, cache, events, vote_buffer
+from app.events import STREAMS_FULL_RETRY_SECONDS, StreamsFull, post_channel
+from app.serializers import serialize_posts
+from app.search import apply_search
+from app.stats import bump_stats
+from app.profiles import bump_user_counters
+from app.purge import delete_posts, invalidate_posts
+from app.votes import vote_delta
+from app.versions import (
+    digest_tag, last_modified_of, make_tag, not_modified, touch_posts, versions_current, with_validators
+)
+from app.pagination import decode_cursor, encode_cursor, get_page_size, seek_filter
+from app.streaming import get_stream_limit, stream_list, streaming_requested
 from datetime import datetime, UTC
 import logging
 
@@ -18,6 +32,26 @@ def error_response(message, code=400):
     logger.warning(f"{code} - {message}")
     return jsonify({"msg": message}), code
 
+def pending_vote(user_id, post_id):
+    """(True, value) when the user has a not yet flushed vote on the post (write-behind mode)."""
+    if user_id is None or not vote_buffer.enabled:
+        return False, None
+    return vote_buffer.pending_vote(user_id, post_id)
+
+def with_pending_vote(counts, stored_value, pending):
+    """
+       Applies the user's `pending` vote to `counts`, so they see their click
+       right away. Returns (counts, value).
+    """
+    found, value = pending
+    if not found:
+        return counts, stored_value
+    up, down, score = vote_delta(stored_value, value)
+    counts = {**counts, "upvotes": counts["upvotes"] + up, "downvotes": counts["downvotes"] + down}
+    if "score" in counts:
+        counts["score"] += score
+    return counts, value
+
 
 # -------------------------------
 # Create a new post
@@ -44,7 +78,10 @@ def create_post():
     )
 
     db.session.add(new_post)
+    bump_stats(total_posts=1, daily="posts")
+    bump_user_counters({user_id: {"post_count": 1}})
     db.session.commit()
+    cache.invalidate_post(user_id)
     logger.info(f"Post created by user {user_id}")
 
     return jsonify({"msg": "Post created successfully"}), 201
@@ -57,62 +94,99 @@ def create_post():
 def get_posts():
     author_id = request.args.get("author_id", type=int)
     keyword = request.args.get("keyword", type=str)
-    sort = request.args.get("sort", default="recent", type=str)
-    q = (
-        db.session
-          .query(
-             Post,
-             func.coalesce(func.sum(Vote.value), 0).label("score")
-          )
-          .outerjoin(Vote)
-          .group_by(Post.id)
-    )
+    sort = request.args.get("sort", type=str) or ("relevance" if keyword else "recent")
+    cursor = request.args.get("cursor", type=str)
+    limit = get_page_size()
+    view = request.args.get("view", default="full", type=str)
+    fields = request.args.get("fields", type=str)
+    fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    # "summary" swaps the embedded comments for a comment_count
+    if fields:
+        if "comments" in fields:
+            comments = "full"
+        elif "comment_count" in fields:
+            comments = "count"
+        else:
+            comments = "none"
+    else:
+        comments = "count" if view == "summary" else "full"
+
+    streaming = streaming_requested()
+    key = cache.feed_key(sort, author_id, keyword, cursor, limit,
+                         view=f"{comments}:{','.join(sorted(fields or []))}")
+    cached = None if streaming else cache.get(key)
+    # the generation in the key covers the page's membership and order; the
+    # posts' versions cover what they show (text, counts, comments, names)
+    if cached is not None and versions_current(cached["versions"]):
+        return not_modified(cached["etag"]) or with_validators(jsonify(cached["payload"]), cached["etag"])
+
+    q = Post.query.options(joinedload(Post.author))
     if author_id:
         q = q.filter(Post.author_id == author_id)
+    rank = None
     if keyword:
-        il = f"%{keyword}%"
-        q = q.filter(
-            Post.title.ilike(il) |
-            Post.content.ilike(il)
+        q, rank = apply_search(q, keyword)
+
+    ranked = sort == "relevance" and rank is not None
+    # cursors carry their order: one from another sort never seeks this one
+    kind = "relevance" if ranked else sort if sort in ("top", "hot") else "recent"
+    if ranked:
+        sort_key = [rank, Post.id]
+        q = q.add_columns(rank)
+    elif sort == "top":
+        sort_key = [Post.score, Post.created_at, Post.id]
+    elif sort == "hot":
+        sort_key = [Post.hot_score, Post.id]
+    else:
+        sort_key = [Post.created_at, Post.id]
+
+    if cursor:
+        try:
+            q = q.filter(seek_filter(sort_key, decode_cursor(cursor, len(sort_key), kind=kind)))
+        except ValueError:
+            return error_response("Invalid cursor", 400)
+
+    def posts_of(rows):
+        return [post for post, _ in rows] if ranked else rows
+
+    def cursor_of(row):
+        if ranked:
+            return encode_cursor(row[1], row[0].id, kind=kind)
+        if sort == "top":
+            return encode_cursor(row.score, row.created_at, row.id, kind=kind)
+        if sort == "hot":
+            return encode_cursor(row.hot_score, row.id, kind=kind)
+        return encode_cursor(row.created_at, row.id, kind=kind)
+
+    q = q.order_by(*(col.desc() for col in sort_key))
+    if streaming:
+        return stream_list(
+            "posts", q,
+            lambda rows: serialize_posts(posts_of(rows), comments=comments, fields=fields),
+            cursor_of, get_stream_limit()
         )
 
-    if sort == "top":
-        q = q.order_by(func.sum(Vote.value).desc(), Post.created_at.desc())
-    else:
-        q = q.order_by(Post.created_at.desc())
-
-    results = q.all()
-
-    output = []
-    for post, score in results:
-        upvotes   = sum(1 for v in post.votes if v.value == 1)
-        downvotes = sum(1 for v in post.votes if v.value == -1)
-        comments = [
-            {
-                "id": c.id,
-                "content": c.content,
-                "author_id": c.author_id,
-                "author_name": c.author.name if c.author else "Unknown",
-                "created_at": c.created_at.isoformat()
-            }
-            for c in post.comments
-        ]
-
-        output.append({
-            "id": post.id,
-            "title": post.title,
-            "content": post.content,
-            "link": post.link,
-            "created_at": post.created_at.isoformat(),
-            "author_id": post.author_id,
-            "author_name": post.author.name if post.author else "Unknown",
-            "upvotes": upvotes,
-            "downvotes": downvotes,
-            "score": score,
-            "comments": comments
-        })
-
-    return jsonify(output), 200
+    rows = q.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    results = posts_of(rows)
+    next_cursor = cursor_of(rows[-1]) if has_more else None
+
+    # the page's post versions cover everything serialize_posts would return
+    versions = [(p.id, p.version) for p in results]
+    etag = digest_tag("feed", versions + [(next_cursor,)])
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    payload = {
+        "posts": serialize_posts(results, comments=comments, fields=fields),
+        "next_cursor": next_cursor
+    }
+    cache.set(key, {"etag": etag, "versions": versions, "payload": payload})
+
+    return with_validators(jsonify(payload), etag)
 
 # -------------------------------
 # Get single posts
@@ -120,41 +194,55 @@ def get_posts():
 @post_bp.route("/<int:post_id>", methods=["GET"])
 @jwt_required(optional=True)
 def get_single_post(post_id):
-    post = Post.query.get_or_404(post_id)
-    comments = [
-        {
-            "id": c.id,
-            "content": c.content,
-            "author_id": c.author_id,
-            "author_name": c.author.name if c.author else "Unknown",
-            "created_at": c.created_at.isoformat()
-        }
-        for c in post.comments
-    ]
-
-    upvotes = sum(1 for v in post.votes if v.value == 1)
-    downvotes = sum(1 for v in post.votes if v.value == -1)
+    head = (
+        db.session.query(Post.version, Post.updated_at, Post.created_at)
+        .filter_by(id=post_id)
+        .first()
+    )
+    if head is None:
+        abort(404)
+    version, modified = head.version, last_modified_of(head)
 
-    user_vote = None
     user_id = get_jwt_identity()
+    user_id = int(user_id) if user_id else None
+    stored = None
     if user_id:
-        existing = Vote.query.filter_by(user_id=int(user_id), post_id=post_id).first()
-        if existing:
-            user_vote = "up" if existing.value == 1 else "down"
-
-    return jsonify({
-        "id": post.id,
-        "title": post.title,
-        "content": post.content,
-        "link": post.link,
-        "created_at": post.created_at.isoformat(),
-        "author_id": post.author_id,
-        "author_name": post.author.name if post.author else "Unknown",
-        "upvotes": upvotes,
-        "downvotes": downvotes,
-        "user_vote": user_vote,
-        "comments": comments
-    }), 200
+        stored = (
+            Vote.query.with_entities(Vote.value)
+            .filter_by(user_id=user_id, post_id=post_id)
+            .scalar()
+        )
+    pending = pending_vote(user_id, post_id)
+
+    # the response also carries the caller's own vote
+    def etag(version):
+        return make_tag("post", post_id, version, user_id or "", stored, pending[1] if pending[0] else "")
+
+    # a pending vote is newer than the post's timestamp
+    unchanged = not_modified(etag(version), None if pending[0] else modified)
+    if unchanged:
+        return unchanged
+
+    key = cache.post_key(post_id, version)
+    entry = cache.get(key)
+    if entry is None:
+        post = Post.query.options(joinedload(Post.author)).get_or_404(post_id)
+        entry = {
+            "post": serialize_posts([post])[0],
+            "version": post.version,
+            "modified": last_modified_of(post).isoformat()
+        }
+        # a write between the two reads makes this a newer version: key it by that
+        cache.set(cache.post_key(post_id, post.version), entry)
+    version, modified = entry["version"], datetime.fromisoformat(entry["modified"])
+
+    data, value = with_pending_vote(entry["post"], stored, pending)
+    user_vote = None
+    if value:
+        user_vote = "up" if value == 1 else "down"
+
+    response = jsonify({**data, "user_vote": user_vote})
+    return with_validators(response, etag(version), None if pending[0] else modified)
 
 
 
@@ -167,15 +255,16 @@ def get_single_post(post_id):
 def delete_post(post_id):
     user_id = int(get_jwt_identity())
     post = Post.query.get(post_id)
-    user = User.query.get(user_id)
 
     if not post:
         return error_response("Post not found", 404)
-    if post.author_id != user_id and not user.is_admin:
+    if post.author_id != user_id and not current_identity().is_admin:
         return error_response("Unauthorized", 403)
 
-    db.session.delete(post)
+    # its votes and comments go with it, through the database's cascades
+    authors = delete_posts([post_id])
     db.session.commit()
+    invalidate_posts(authors)
     logger.info(f"Post {post_id} deleted by user {user_id}")
     return jsonify({"msg": "Post deleted"}), 200
 
@@ -189,20 +278,24 @@ def delete_post(post_id):
 def edit_post(post_id):
     user_id = int(get_jwt_identity())
     post = Post.query.get(post_id)
-    user = User.query.get(user_id)
 
     if not post:
         return error_response("Post not found", 404)
 
-    if post.author_id != user_id and not user.is_admin:
+    if post.author_id != user_id and not current_identity().is_admin:
         return error_response("Unauthorized", 403)
 
     data = request.get_json()
     post.title   = data.get("title",   post.title)
     post.content = data.get("content", post.content)
     post.link    = data.get("link",    post.link)
+    author_id = post.author_id
+    touch_posts([post_id])
 
     db.session.commit()
+    # the text changed, not the order (the version bump covers the pages
+    # showing the post), but what searches match may have
+    cache.invalidate_post(author_id, sorts=(), search_sorts=SEARCH_SORTS)
     logger.info(f"Post {post_id} updated by user {user_id}")
     return jsonify({"msg": "Post updated"}), 200
 
@@ -218,11 +311,40 @@ def get_post_votes(post_id):
     if not post:
         return error_response("Post not found", 404)
 
-    upvotes = sum(1 for v in post.votes if v.value == 1)
-    downvotes = sum(1 for v in post.votes if v.value == -1)
+    counts = {"upvotes": post.upvote_count, "downvotes": post.downvote_count}
+    if vote_buffer.enabled:
+        user_id = int(get_jwt_identity())
+        stored = (
+            Vote.query.with_entities(Vote.value)
+            .filter_by(user_id=user_id, post_id=post_id)
+            .scalar()
+        )
+        counts, _ = with_pending_vote(counts, stored, pending_vote(user_id, post_id))
+
+    return jsonify({"post_id": post_id, **counts}), 200
 
-    return jsonify({
-        "post_id": post_id,
-        "upvotes": upvotes,
-        "downvotes": downvotes
-    }), 200
+
+# -------------------------------
+# Live vote / comment events (SSE)
+# -------------------------------
+@post_bp.route("/<int:post_id>/events", methods=["GET"])
+def post_events(post_id):
+    if not Post.query.get(post_id):
+        return error_response("Post not found", 404)
+    db.session.remove()  # don't hold a pooled connection for the life of the stream
+
+    try:
+        stream = events.stream(
+            post_channel(post_id),
+            heartbeat=current_app.config.get("EVENTS_HEARTBEAT_SECONDS", 15),
+            max_age=current_app.config.get("EVENTS_MAX_STREAM_SECONDS", 300)
+        )
+    except StreamsFull:
+        # each stream holds a server thread: past the limit, leave the rest to other requests
+        response, code = error_response("Too many live event streams, retry later", 503)
+        response.headers["Retry-After"] = str(STREAMS_FULL_RETRY_SECONDS)
+        return response, code
+    return Response(stream, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
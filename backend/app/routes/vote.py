@@ -3,15 +3,34 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app.decorators import prevent_banned
 from app.models import db, Vote, Post
+from app.cache import VOTE_SORTS
+from app.extensions import cache, vote_buffer
+from app.votes import apply_vote_delta, publish_vote_totals, write_votes
+from app.stats import bump_stats
 import logging
 
 vote_bp = Blueprint("vote", __name__, url_prefix="/api/votes")
+MAX_BATCH_VOTES = 500
 logger = logging.getLogger(__name__)
 
 def error_response(message, code=400):
     logger.warning(f"{code} - {message}")
     return jsonify({"msg": message}), code
 
+def _vote_msg(old_val, new_val):
+    if new_val is None:
+        return "Vote removed"
+    return "Vote recorded" if old_val is None else "Vote updated"
+
+def _parse_post_id(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
 # -------------------------------
 # Submit or update vote
 # -------------------------------
@@ -29,19 +48,123 @@ def vote():
 
     val  = 1 if vt=="up" else -1
 
+    author_id = db.session.query(Post.author_id).filter_by(id=post_id).scalar()
+    if author_id is None:
+        return error_response("Post not found", 404)
+
+    if vote_buffer.enabled:
+        # acknowledged once logged; the flusher writes it with the others
+        old_val, new_val = vote_buffer.submit(user_id, int(post_id), val)
+        return jsonify({"msg": _vote_msg(old_val, new_val), "post_id": post_id, "vote": vt, "pending": True}), 202
+
     existing = Vote.query.filter_by(user_id=user_id, post_id=post_id).first()
     if existing:
+        old_val = existing.value
         if existing.value == val:
             db.session.delete(existing)
+            new_val = None
             msg = "Vote removed"
         else:
             existing.value = val
+            new_val = val
             msg = "Vote updated"
     else:
         new = Vote(user_id=user_id, post_id=post_id, value=val)
         db.session.add(new)
+        old_val, new_val = None, val
         msg = "Vote recorded"
 
+    db.session.flush()
+    up, down, score = apply_vote_delta(post_id, old_val, new_val)
+    if old_val is None:
+        bump_stats(total_votes=1, daily="votes")
+    elif new_val is None:
+        bump_stats(total_votes=-1)
     db.session.commit()
+    cache.invalidate_post(author_id, VOTE_SORTS)
+    publish_vote_totals({int(post_id): (up, down, score)})
     return jsonify({"msg": msg, "post_id": post_id, "vote": vt}), 200
 
+
+
+# -------------------------------
+# Submit many votes at once
+# -------------------------------
+# Body: {"votes": [{"post_id": 1, "vote_type": "up"}, ...]}. Items apply in
+# order with the same toggle rules as POST /api/votes (repeating a post
+# toggles it again) and get one result each. Only each post's final vote is
+# written: one upsert, one delete, one counter update and a single commit.
+# In write-behind mode the batch goes through the vote buffer like single
+# votes, so it toggles against the user's pending votes and answers 202.
+@vote_bp.route("/batch", methods=["POST"])
+@jwt_required()
+@prevent_banned
+def vote_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get("votes")
+    user_id = int(get_jwt_identity())
+
+    if not isinstance(items, list) or not items:
+        return error_response("votes must be a non-empty list", 400)
+    if len(items) > MAX_BATCH_VOTES:
+        return error_response(f"At most {MAX_BATCH_VOTES} votes per batch", 400)
+
+    parsed = []
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        parsed.append((_parse_post_id(item.get("post_id")), item.get("vote_type")))
+    post_ids = {pid for pid, _ in parsed if pid is not None}
+
+    authors = dict(
+        db.session.query(Post.id, Post.author_id).filter(Post.id.in_(post_ids)).all()
+    ) if post_ids else {}
+
+    results = []
+    for post_id, vt in parsed:
+        if vt not in ("up", "down") or post_id is None:
+            results.append({"post_id": post_id, "vote_type": vt, "status": 400,
+                            "msg": "Invalid post_id or vote_type"})
+        elif post_id not in authors:
+            results.append({"post_id": post_id, "vote_type": vt, "status": 404, "msg": "Post not found"})
+        else:
+            results.append({"post_id": post_id, "vote_type": vt, "status": 200})
+    accepted = [
+        (result["post_id"], 1 if result["vote_type"] == "up" else -1)
+        for result in results if result["status"] == 200
+    ]
+
+    if vote_buffer.enabled:
+        # acknowledged once logged; the flusher writes them with the others
+        outcomes = vote_buffer.submit_many(user_id, accepted) if accepted else []
+        for result, (old_val, new_val) in zip((r for r in results if r["status"] == 200), outcomes):
+            result["msg"] = _vote_msg(old_val, new_val)
+        logger.info(f"User {user_id} submitted {len(items)} votes in a batch, {len(accepted)} buffered")
+        return jsonify({"results": results, "pending": True}), 202
+
+    original = dict(
+        db.session.query(Vote.post_id, Vote.value)
+        .filter(Vote.user_id == user_id, Vote.post_id.in_(authors))
+        .all()
+    ) if authors else {}
+
+    # replay the toggles in memory; only each post's final vote is written
+    current = dict(original)
+    for result, (post_id, val) in zip((r for r in results if r["status"] == 200), accepted):
+        old_val = current.get(post_id)
+        current[post_id] = None if old_val == val else val
+        result["msg"] = _vote_msg(old_val, current[post_id])
+
+    changed = {pid: val for pid, val in current.items() if original.get(pid) != val}
+    if changed:
+        deltas = write_votes(
+            {(user_id, pid): val for pid, val in changed.items()},
+            {(user_id, pid): val for pid, val in original.items()}
+        )
+        db.session.commit()
+
+        for author_id in {authors[pid] for pid in changed}:
+            cache.invalidate_post(author_id, VOTE_SORTS)
+        publish_vote_totals(deltas)
+
+    logger.info(f"User {user_id} submitted {len(items)} votes in a batch, {len(changed)} post(s) changed")
+    return jsonify({"results": results}), 200
@@ -0,0 +1,122 @@
+import re
+
+from sqlalchemy import DDL, Float, Integer, event, func, literal_column, text
+
+from .extensions import db
+from .models import Post
+
+# Inverted index over post title + content.
+#   SQLite:   an external-content FTS5 table kept in sync by triggers.
+#   Postgres: a GIN expression index over a weighted tsvector, which the
+#             database keeps current on its own.
+# Anything else falls back to ILIKE.
+
+TS_CONFIG = "english"
+
+_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+    "title, content, content='post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN "
+    "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "END",
+    # only text edits reindex; vote counter updates on post leave the index alone
+    "CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE OF title, content ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); "
+    "END",
+]
+
+
+def _pg_document(table=""):
+    # must stay textually identical to the indexed expression for the planner to use it
+    return (
+        f"setweight(to_tsvector('{TS_CONFIG}', coalesce({table}title, '')), 'A') || "
+        f"setweight(to_tsvector('{TS_CONFIG}', coalesce({table}content, '')), 'B')"
+    )
+
+
+_PG_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_post_search ON post USING GIN (({_pg_document()}))",
+]
+
+for statement in _SQLITE_DDL:
+    event.listen(Post.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in _PG_DDL:
+    event.listen(Post.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+event.listen(
+    Post.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS post_fts").execute_if(dialect="sqlite")
+)
+
+_fts_ready = set()
+
+
+def search_backend():
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        return "tsvector"
+    if dialect == "sqlite":
+        url = str(db.engine.url)
+        if url not in _fts_ready:
+            exists = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'post_fts'")
+            ).first()
+            if not exists:
+                return "like"
+            _fts_ready.add(url)
+        return "fts5"
+    return "like"
+
+
+def _terms(keyword):
+    return re.findall(r"\w+", keyword.lower())
+
+
+def apply_search(q, keyword):
+    """
+       Restricts `q` (a Post query) to posts matching every term of `keyword`,
+       each term treated as a prefix. Returns (query, rank_column); higher
+       rank is more relevant, None when the backend cannot rank.
+    """
+    terms = _terms(keyword)
+    backend = search_backend() if terms else "like"
+    if backend == "fts5":
+        match = " ".join(f'"{t}"*' for t in terms)
+        hits = (
+            text(
+                "SELECT rowid AS post_id, -bm25(post_fts, 10.0, 1.0) AS rank "
+                "FROM post_fts WHERE post_fts MATCH :match"
+            )
+            .bindparams(match=match)
+            .columns(post_id=Integer, rank=Float)
+            .subquery("post_search")
+        )
+        return q.join(hits, hits.c.post_id == Post.id), hits.c.rank
+
+    if backend == "tsvector":
+        document = literal_column(_pg_document("post."))
+        query = func.to_tsquery(literal_column(f"'{TS_CONFIG}'"), " & ".join(f"{t}:*" for t in terms))
+        return q.filter(document.op("@@")(query)), func.ts_rank(document, query)
+
+    il = f"%{keyword}%"
+    return q.filter(Post.title.ilike(il) | Post.content.ilike(il)), None
+
+
+def rebuild_search_index():
+    """Creates the index structures if missing and repopulates them from post."""
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        for statement in _SQLITE_DDL:
+            db.session.execute(text(statement))
+        db.session.execute(text("INSERT INTO post_fts(post_fts) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        for statement in _PG_DDL:
+            db.session.execute(text(statement))
+    db.session.commit()
+    return dialect
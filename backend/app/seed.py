@@ -0,0 +1,172 @@
+import random
+from datetime import timedelta
+
+from sqlalchemy import func, insert, select
+
+from .cache import SEARCH_SORTS
+from .extensions import db, cache, hasher
+from .models import Comment, Post, User, Vote
+from .profiles import rebuild_user_counters
+from .ranking import _utcnow, refresh_hot_scores
+from .stats import rebuild_site_stats
+from .threads import rebuild_comment_threads
+from .votes import reconcile_vote_counts
+
+# Synthetic data for load tests and benchmarks.
+#
+# Real communities are skewed: a few users write most posts, a few posts get
+# most votes and comments, and a handful of fresh "hot" threads are busy
+# right now. Popularity is drawn from a power law (rank ** -skew) and the hot
+# threads get a large extra weight, so the queries see realistic hot rows and
+# long tails instead of a uniform spread.
+
+SEED_PASSWORD = "password"
+HOT_THREAD_BOOST = 50
+# replies are inserted in this many rounds, each answering the comments of
+# the rounds before, so threads get up to this many levels of nesting
+REPLY_ROUNDS = 3
+
+_WORDS = (
+    "community pulse vote post comment thread hot new today question answer "
+    "python flask sqlite postgres cache index query latency release update bug "
+    "fix feature design review idea launch meetup event news opinion guide help "
+    "the a of and to in is it that for on with as this was be at by from"
+).split()
+
+
+def _power_law(count, skew, rng):
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return [r ** -skew for r in ranks]
+
+
+def _insert(model, rows, batch_size):
+    ids = []
+    for start in range(0, len(rows), batch_size):
+        ids.extend(db.session.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            rows[start:start + batch_size]
+        ))
+    return ids
+
+
+def _pairs(total, post_ids, weights, user_ids, rng, unique):
+    """Draws `total` (post_id, user_id) pairs, at most one per user and post when `unique`."""
+    seen = set()
+    pairs = []
+    attempts = 0
+    while len(pairs) < total and attempts < total * 10:
+        chunk = total - len(pairs)
+        attempts += chunk
+        for post_id in rng.choices(post_ids, weights, k=chunk):
+            pair = (post_id, rng.choice(user_ids))
+            if unique:
+                if pair in seen:
+                    continue
+                seen.add(pair)
+            pairs.append(pair)
+    return pairs
+
+
+def seed_dataset(users=100, posts=1000, votes=20000, comments=5000, skew=1.1,
+                 hot_fraction=0.01, days=30, seed=42, batch_size=5000, reply_fraction=0.4):
+    """
+       Inserts a synthetic community through the models and brings every
+       derived column (vote counters, hot scores, search index, reply
+       threads, site stats) up to date. About `reply_fraction` of the
+       comments are replies to other comments on the same post.
+       All users share SEED_PASSWORD; the first one is an admin. Returns the
+       number of rows inserted per model.
+    """
+    rng = random.Random(seed)
+    now = _utcnow()
+    password = hasher.hash(SEED_PASSWORD)
+
+    # numbered after any existing users so the script can be rerun
+    first = (db.session.scalar(select(func.max(User.id))) or 0) + 1
+    user_ids = _insert(User, [
+        {
+            "name": f"user{i}",
+            "email": f"user{i}@example.com",
+            "password": password,
+            "created_at": now - timedelta(days=days, seconds=i),
+            "is_admin": i == first,
+            "is_banned": False,
+        }
+        for i in range(first, first + users)
+    ], batch_size)
+
+    hot_posts = int(posts * hot_fraction)
+    author_weights = _power_law(users, skew, rng)
+    authors = rng.choices(user_ids, author_weights, k=posts)
+    post_rows = []
+    for i, author_id in enumerate(authors):
+        # hot threads are the most recent ones
+        age = rng.uniform(0, 6 * 3600) if i < hot_posts else rng.uniform(0, days * 86400)
+        post_rows.append({
+            "title": f"Post {i} by user {author_id}",
+            "content": " ".join(rng.choices(_WORDS, k=rng.randint(10, 120))),
+            "link": f"https://example.com/{i}" if rng.random() < 0.2 else None,
+            "created_at": now - timedelta(seconds=age),
+            "author_id": author_id,
+        })
+    post_ids = _insert(Post, post_rows, batch_size)
+
+    weights = _power_law(posts, skew, rng)
+    for i in range(hot_posts):
+        weights[i] *= HOT_THREAD_BOOST
+    created = dict(zip(post_ids, (row["created_at"] for row in post_rows)))
+
+    vote_rows = [
+        {
+            "post_id": post_id,
+            "user_id": user_id,
+            "value": 1 if rng.random() < 0.8 else -1,
+            "created_at": created[post_id] + timedelta(seconds=rng.uniform(0, 3600)),
+        }
+        for post_id, user_id in _pairs(votes, post_ids, weights, user_ids, rng, unique=True)
+    ]
+    _insert(Vote, vote_rows, batch_size)
+
+    comment_pairs = _pairs(comments, post_ids, weights, user_ids, rng, unique=False)
+    top_level = len(comment_pairs) - int(len(comment_pairs) * reply_fraction)
+    rounds = [comment_pairs[:top_level]] + [
+        comment_pairs[top_level + i::REPLY_ROUNDS] for i in range(REPLY_ROUNDS)
+    ]
+    threads = {}  # post_id -> [(comment_id, created_at), ...]
+    comment_count = 0
+    for pairs in rounds:
+        rows = []
+        for post_id, user_id in pairs:
+            parent_id, after = None, created[post_id]
+            if threads.get(post_id):
+                parent_id, after = rng.choice(threads[post_id])
+            rows.append({
+                "post_id": post_id,
+                "author_id": user_id,
+                "parent_id": parent_id,
+                "content": " ".join(rng.choices(_WORDS, k=rng.randint(3, 40))),
+                "created_at": after + timedelta(seconds=rng.uniform(0, 3600)),
+            })
+        for row, comment_id in zip(rows, _insert(Comment, rows, batch_size)):
+            threads.setdefault(row["post_id"], []).append((comment_id, row["created_at"]))
+        comment_count += len(rows)
+    db.session.commit()
+
+    rebuild_comment_threads()
+    reconcile_vote_counts()
+    rebuild_user_counters()
+    db.session.commit()
+    refresh_hot_scores(now)
+    rebuild_site_stats()
+    for sort in SEARCH_SORTS:
+        cache.invalidate_feed(sort, set(authors))
+    cache.invalidate_analytics()
+
+    return {
+        "users": len(user_ids),
+        "posts": len(post_ids),
+        "votes": len(vote_rows),
+        "comments": comment_count,
+    }
+
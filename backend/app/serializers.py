@@ -0,0 +1,144 @@
+from collections import defaultdict
+
+from sqlalchemy import func
+
+from .extensions import db
+from .instrumentation import timed_serialization
+from .models import Comment, User
+
+# Every helper here works on a whole page of rows at once and issues a fixed
+# number of queries no matter how many posts/comments the page holds, so the
+# routes never touch the lazy relationships on the models while serializing.
+
+
+def load_comments(post_ids):
+    """Returns {post_id: [comment, ...]} in thread order, with authors fetched in the same query."""
+    grouped = defaultdict(list)
+    if not post_ids:
+        return grouped
+    rows = (
+        db.session
+          .query(Comment, User.name)
+          .outerjoin(User, Comment.author_id == User.id)
+          .filter(Comment.post_id.in_(post_ids))
+          .order_by(Comment.post_id, Comment.path)
+          .all()
+    )
+    for comment, author_name in rows:
+        grouped[comment.post_id].append(serialize_comment(comment, author_name))
+    return grouped
+
+
+def load_comment_ids(post_ids):
+    grouped = defaultdict(list)
+    if not post_ids:
+        return grouped
+    rows = (
+        db.session
+          .query(Comment.post_id, Comment.id)
+          .filter(Comment.post_id.in_(post_ids))
+          .order_by(Comment.id.asc())
+          .all()
+    )
+    for post_id, comment_id in rows:
+        grouped[post_id].append(comment_id)
+    return grouped
+
+
+def load_comment_counts(post_ids):
+    if not post_ids:
+        return {}
+    rows = (
+        db.session
+          .query(Comment.post_id, func.count(Comment.id))
+          .filter(Comment.post_id.in_(post_ids))
+          .group_by(Comment.post_id)
+          .all()
+    )
+    return dict(rows)
+
+
+def serialize_user(user):
+    return {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "created_at": user.created_at.isoformat(),
+        "is_admin": user.is_admin,
+        "is_banned": user.is_banned
+    }
+
+
+def serialize_comment(comment, author_name):
+    return {
+        "id": comment.id,
+        "content": comment.content,
+        "author_id": comment.author_id,
+        "author_name": author_name or "Unknown",
+        "created_at": comment.created_at.isoformat(),
+        "parent_id": comment.parent_id,
+        "depth": comment.depth,
+        "reply_count": comment.reply_count,
+        "descendant_count": comment.descendant_count
+    }
+
+
+@timed_serialization
+def serialize_posts(posts, comments="full", authors=None, fields=None):
+    """
+       Serializes a page of posts in two queries at most: authors (one IN
+       lookup, skipped when they were eager loaded with the posts or passed in
+       as `authors`) and comments. Vote counts come from the counter columns.
+
+       `comments` is "full" for embedded comment objects, "ids" for comment
+       ids only, "count" for a comment_count computed in SQL and "none" to
+       leave comments out. `fields`, when given, limits the keys returned.
+    """
+    post_ids = [p.id for p in posts]
+    if comments == "full":
+        post_comments = load_comments(post_ids)
+    elif comments == "ids":
+        post_comments = load_comment_ids(post_ids)
+    elif comments == "count":
+        comment_counts = load_comment_counts(post_ids)
+    author_names = load_author_names(posts, authors)
+
+    output = []
+    for post in posts:
+        data = {
+            "id": post.id,
+            "title": post.title,
+            "content": post.content,
+            "link": post.link,
+            "created_at": post.created_at.isoformat(),
+            "author_id": post.author_id,
+            "author_name": author_names.get(post.author_id) or "Unknown",
+            "upvotes": post.upvote_count,
+            "downvotes": post.downvote_count,
+            "score": post.score,
+        }
+        if comments in ("full", "ids"):
+            data["comments"] = post_comments.get(post.id, [])
+        elif comments == "count":
+            data["comment_count"] = comment_counts.get(post.id, 0)
+        if fields:
+            data = {k: v for k, v in data.items() if k in fields}
+        output.append(data)
+    return output
+
+
+def load_author_names(posts, known=None):
+    names = dict(known or {})
+    missing = set()
+    for post in posts:
+        # use an eager loaded author when there is one, never trigger a lazy load
+        author = post.__dict__.get("author")
+        if author is not None:
+            names[author.id] = author.name
+        elif post.author_id not in names:
+            missing.add(post.author_id)
+    missing -= names.keys()
+    if missing:
+        rows = db.session.query(User.id, User.name).filter(User.id.in_(missing)).all()
+        names.update(rows)
+    return names
@@ -0,0 +1,88 @@
+import gc
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Startup of server workers (create_app(profile="serving")).
+#
+# A worker never runs migrations or CLI commands, so the serving profile
+# leaves out Flask-Migrate (and the Alembic import behind it) and the CLI
+# groups, and registers the blueprints on the first request instead of in
+# create_app(): a new worker answers its first connection sooner, which is
+# what counts when workers are added during a spike.
+#
+# Pre-fork servers can go further and pay the imports once: preload()
+# imports every module a worker runs in the master, then freezes the
+# garbage collector so those objects stay out of the collector's reach and
+# their pages stay shared copy-on-write between the forked workers. It
+# creates no app: engines, threads and the vote buffer log are per process
+# and are set up by each worker's create_app() (see gunicorn.conf.py).
+
+BLUEPRINTS = (
+    ("app.routes.auth", "auth_bp"),
+    ("app.routes.post", "post_bp"),
+    ("app.routes.vote", "vote_bp"),
+    ("app.routes.comment", "comment_bp"),
+    ("app.routes.admin", "admin_bp"),
+)
+
+# imported by preload() besides the blueprints and what they import
+PRELOAD_MODULES = (
+    "app.asgi",
+    "app.ranking",
+    "app.streaming",
+    "app.threads",
+    "sqlalchemy.dialects.sqlite",
+    "sqlalchemy.dialects.postgresql",
+)
+
+_lock = threading.Lock()
+
+
+def register_blueprints(app):
+    for module, name in BLUEPRINTS:
+        blueprint = getattr(importlib.import_module(module), name)
+        if blueprint.name not in app.blueprints:
+            app.register_blueprint(blueprint)
+
+
+def defer_blueprints(app):
+    """Registers the blueprints when the first request comes in, before Flask dispatches it."""
+    app.extensions["deferred_blueprints"] = True
+    wsgi_app = app.wsgi_app
+
+    def load_and_dispatch(environ, start_response):
+        load_blueprints(app)
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = load_and_dispatch
+
+
+def load_blueprints(app):
+    """Registers deferred blueprints now; a no-op once done or when nothing was deferred."""
+    if not app.extensions.get("deferred_blueprints"):
+        return
+    with _lock:
+        if app.extensions.get("deferred_blueprints"):
+            start = time.perf_counter()
+            register_blueprints(app)
+            app.extensions["deferred_blueprints"] = False
+            logger.info(f"Loaded blueprints in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+def preload():
+    """Imports what the workers run, then freezes the GC; call in a pre-fork master."""
+    start = time.perf_counter()
+    for module, _ in BLUEPRINTS:
+        importlib.import_module(module)
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass  # optional dependency of a mode this deployment does not use
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded {len(BLUEPRINTS) + len(PRELOAD_MODULES)} modules in {time.perf_counter() - start:.2f}s")
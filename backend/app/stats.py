@@ -0,0 +1,160 @@
+from datetime import date, datetime, timedelta, UTC
+
+from sqlalchemy import DDL, event, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .extensions import db, cache
+from .models import Comment, DailyStat, Post, SiteStats, User, Vote
+from .serializers import load_comment_counts
+
+# Rollups behind /api/admin/analytics, so the dashboard never scans the
+# big tables:
+#   site_stats   one row of running totals, moved by the write paths with
+#                UPDATE x = x + n inside their own transaction
+#   daily_stat   (day, metric) creation counts for the dashboard series
+# The top posts come straight off the ix_post_score_created_at_id index.
+
+SITE_STATS_ID = 1
+DAILY_METRICS = ("signups", "posts", "votes", "comments")
+TOP_POSTS = 5
+
+# created together with the table so every bump is a plain UPDATE
+event.listen(
+    SiteStats.__table__, "after_create",
+    DDL(f"INSERT INTO site_stats (id) VALUES ({SITE_STATS_ID})")
+)
+
+
+def _today():
+    return datetime.now(UTC).date()
+
+
+def bump_stats(daily=None, daily_count=1, **deltas):
+    """
+       Adds each `deltas` value to its site_stats column and counts
+       `daily_count` `daily` events (one of DAILY_METRICS) for today. Runs
+       inside the caller's transaction; the caller commits.
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if deltas:
+        db.session.execute(
+            update(SiteStats)
+            .where(SiteStats.id == SITE_STATS_ID)
+            .values({getattr(SiteStats, k): getattr(SiteStats, k) + v for k, v in deltas.items()})
+            .execution_options(synchronize_session=False)
+        )
+    if daily and daily_count:
+        _bump_daily(daily, _today(), daily_count)
+
+
+def _bump_daily(metric, day, n):
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        db.session.execute(
+            insert(DailyStat)
+            .values(day=day, metric=metric, count=n)
+            .on_conflict_do_update(
+                index_elements=[DailyStat.day, DailyStat.metric],
+                set_={"count": DailyStat.count + n}
+            )
+        )
+        return
+    updated = db.session.execute(
+        update(DailyStat)
+        .where(DailyStat.day == day, DailyStat.metric == metric)
+        .values(count=DailyStat.count + n)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.session.add(DailyStat(day=day, metric=metric, count=n))
+
+
+def rebuild_site_stats():
+    """
+       Recomputes site_stats and the whole daily series from the base tables.
+       Used as the backfill and after bulk loads that skip the write paths.
+    """
+    def count(*criteria, model=None):
+        return db.session.scalar(select(func.count()).select_from(model).where(*criteria))
+
+    totals = {
+        "total_users": count(model=User),
+        "banned_users": count(User.is_banned.is_(True), model=User),
+        "active_admins": count(User.is_admin.is_(True), model=User),
+        "total_posts": count(model=Post),
+        "total_comments": count(model=Comment),
+        "total_votes": count(model=Vote),
+    }
+    stats = db.session.get(SiteStats, SITE_STATS_ID)
+    if stats is None:
+        db.session.add(SiteStats(id=SITE_STATS_ID, **totals))
+    else:
+        for column, value in totals.items():
+            setattr(stats, column, value)
+
+    db.session.query(DailyStat).delete(synchronize_session=False)
+    for metric, model in zip(DAILY_METRICS, (User, Post, Vote, Comment)):
+        day = func.date(model.created_at)
+        for value, n in db.session.execute(select(day, func.count()).group_by(day)):
+            if value is not None:
+                db.session.add(DailyStat(day=_as_date(value), metric=metric, count=n))
+    db.session.commit()
+    cache.invalidate_analytics()
+    return totals
+
+
+def _as_date(value):
+    # SQLite's date() returns text
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def site_analytics(days=30):
+    """Dashboard payload in a fixed number of small queries, whatever the site size."""
+    stats = db.session.get(SiteStats, SITE_STATS_ID)
+    if stats is None:
+        rebuild_site_stats()
+        stats = db.session.get(SiteStats, SITE_STATS_ID)
+
+    top = (
+        Post.query
+        .order_by(Post.score.desc(), Post.created_at.desc(), Post.id.desc())
+        .limit(TOP_POSTS)
+        .all()
+    )
+    comment_counts = load_comment_counts([p.id for p in top])
+    top_posts = [
+        {
+            "id": p.id,
+            "title": p.title,
+            "score": p.score,
+            "upvotes": p.upvote_count,
+            "comments": comment_counts.get(p.id, 0)
+        } for p in top
+    ]
+
+    first_day = _today() - timedelta(days=days - 1)
+    counts = {
+        (row.metric, row.day): row.count
+        for row in DailyStat.query.filter(DailyStat.day >= first_day)
+    }
+    series = {
+        metric: [
+            {"day": (first_day + timedelta(days=i)).isoformat(),
+             "count": counts.get((metric, first_day + timedelta(days=i)), 0)}
+            for i in range(days)
+        ]
+        for metric in DAILY_METRICS
+    }
+
+    return {
+        "total_users": stats.total_users,
+        "banned_users": stats.banned_users,
+        "active_admins": stats.active_admins,
+        "total_posts": stats.total_posts,
+        "total_comments": stats.total_comments,
+        "total_votes": stats.total_votes,
+        "top_post": top_posts[0] if top_posts else None,
+        "top_posts": top_posts,
+        "daily": series
+    }
@@ -0,0 +1,109 @@
+import json
+import logging
+
+from flask import Response, current_app, request, stream_with_context
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Streamed list responses, for results too big to build in memory.
+#
+# A list endpoint streams when the client asks for NDJSON
+# (Accept: application/x-ndjson) or passes stream=1. Rows are pulled from
+# the database STREAM_CHUNK_SIZE at a time (Query.yield_per: a server-side
+# cursor on Postgres, a lazily stepped cursor on SQLite), each chunk goes
+# through the endpoint's page serializer and is written out before the next
+# one is fetched, so memory stays at one chunk whatever the result size.
+#
+#   application/json       {"<key>": [item, ...], "next_cursor": ...}, the
+#                          same document as the paged response
+#   application/x-ndjson   one item per line, then {"next_cursor": ...} as
+#                          the last line when there is more to fetch
+#
+# Without a `limit` a stream runs to the end of the result or
+# STREAM_MAX_ROWS, whichever comes first; next_cursor resumes from there.
+# Streams skip the response cache and ETags, since the body only exists
+# as it is sent. orjson is used for encoding when installed.
+
+NDJSON = "application/x-ndjson"
+
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(["application/json", NDJSON]) == NDJSON
+
+
+def streaming_requested():
+    return wants_ndjson() or request.args.get("stream", type=str) in ("1", "true")
+
+
+def get_stream_limit():
+    max_rows = current_app.config.get("STREAM_MAX_ROWS", 100000)
+    limit = request.args.get("limit", type=int)
+    return max(1, min(limit, max_rows)) if limit else max_rows
+
+
+def stream_list(key, query, serialize, cursor_of, limit):
+    """
+       Streams `query` (ordered, ORM Query) as a list response. `serialize`
+       turns a chunk of rows into a list of dicts, `cursor_of` gives the
+       cursor of a row. At most `limit` rows are sent; when more remain the
+       response ends with a next_cursor.
+    """
+    chunk_size = current_app.config.get("STREAM_CHUNK_SIZE", 500)
+    ndjson = wants_ndjson()
+
+    def encode(items, first):
+        if ndjson:
+            return b"".join(dumps(item) + b"\n" for item in items)
+        body = b",".join(dumps(item) for item in items)
+        return body if first or not body else b"," + body
+
+    def generate():
+        # sent along with the first chunk, so the first byte is a real item
+        head = b"" if ndjson else b'{"' + key.encode() + b'":['
+        sent = 0
+        chunk = []
+        last = None
+        next_cursor = None
+        try:
+            # one row past the limit tells whether there is a next page
+            for row in query.limit(limit + 1).yield_per(chunk_size):
+                if sent + len(chunk) == limit:
+                    next_cursor = cursor_of(last)
+                    break
+                chunk.append(row)
+                last = row
+                if len(chunk) == chunk_size:
+                    yield head + encode(serialize(chunk), sent == 0)
+                    head = b""
+                    sent += len(chunk)
+                    chunk = []
+            if chunk:
+                yield head + encode(serialize(chunk), sent == 0)
+                head = b""
+                sent += len(chunk)
+        except Exception as e:
+            # the status line is long gone: end the body early, the client sees it truncated
+            logger.error(f"Streaming {request.path} failed after {sent} rows: {e}")
+            raise
+        if ndjson:
+            if next_cursor is not None:
+                yield dumps({"next_cursor": next_cursor}) + b"\n"
+        else:
+            yield head + b'],"next_cursor":' + dumps(next_cursor) + b"}"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=NDJSON if ndjson else "application/json",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
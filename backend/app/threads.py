@@ -0,0 +1,160 @@
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import aliased
+
+from .extensions import db
+from .models import Comment
+
+# Threaded comments as a materialized path.
+#
+# Every comment stores `path`: the ids of its ancestors and its own, each
+# zero-padded to SEGMENT_WIDTH digits and followed by "/", e.g.
+#   0000000007/                       a top-level comment
+#   0000000007/0000000012/            a reply to it
+# Sorting a post's comments by path gives the thread depth-first with
+# replies in posting order, and the descendants of a comment are exactly
+# the paths in [path, path + "~"), so a whole thread, one subtree or the
+# page after a cursor is a single range scan of ix_comment_post_id_path.
+# reply_count / descendant_count are moved with UPDATE x = x + n on the
+# ancestors (read off the path) by every insert and delete.
+
+SEGMENT_WIDTH = 10
+# sorts after every digit and "/", so path + SUBTREE_END bounds a subtree
+SUBTREE_END = "~"
+
+
+def path_segment(comment_id):
+    return f"{comment_id:0{SEGMENT_WIDTH}d}/"
+
+
+def ancestor_ids(path):
+    """Ids of the comments above the one at `path`, root first."""
+    ids = [int(segment) for segment in path.split("/") if segment]
+    return ids[:-1]
+
+
+def subtree_filter(path):
+    """Matches the descendants of the comment at `path` (not the comment itself)."""
+    return Comment.path > path, Comment.path < path + SUBTREE_END
+
+
+def attach_comment(comment, parent=None):
+    """
+       Gives a newly added `comment` its path and depth under `parent` (None
+       for a top-level comment) and counts it on every ancestor. Flushes to
+       get the id; runs inside the caller's transaction, the caller commits.
+    """
+    db.session.flush()
+    prefix = parent.path if parent is not None else ""
+    comment.parent_id = parent.id if parent is not None else None
+    comment.path = prefix + path_segment(comment.id)
+    comment.depth = parent.depth + 1 if parent is not None else 0
+    if parent is None:
+        return
+    db.session.execute(
+        update(Comment)
+        .where(Comment.id.in_(ancestor_ids(comment.path)))
+        .values(
+            descendant_count=Comment.descendant_count + 1,
+            reply_count=Comment.reply_count + case((Comment.id == parent.id, 1), else_=0)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_subtree(comment):
+    """
+       Deletes `comment` and all its replies with one range DELETE and
+       uncounts them on its ancestors. Runs inside the caller's transaction;
+       the caller commits. Returns the number of comments removed.
+    """
+    subtree = (
+        Comment.post_id == comment.post_id,
+        Comment.path >= comment.path,
+        Comment.path < comment.path + SUBTREE_END
+    )
+    # counted first: replies the parent_id ON DELETE CASCADE removes are not
+    # in the DELETE's rowcount on SQLite
+    removed = db.session.scalar(select(func.count()).select_from(Comment).where(*subtree))
+    db.session.execute(
+        delete(Comment).where(*subtree).execution_options(synchronize_session=False)
+    )
+    ancestors = ancestor_ids(comment.path)
+    if ancestors:
+        db.session.execute(
+            update(Comment)
+            .where(Comment.id.in_(ancestors))
+            .values(
+                descendant_count=Comment.descendant_count - removed,
+                reply_count=Comment.reply_count - case((Comment.id == comment.parent_id, 1), else_=0)
+            )
+            .execution_options(synchronize_session=False)
+        )
+    db.session.expunge(comment)
+    return removed
+
+
+def subtree_authors(comment):
+    """Select of the author id of `comment` and of each of its replies, one row per comment."""
+    return select(Comment.author_id).where(
+        Comment.post_id == comment.post_id,
+        Comment.path >= comment.path,
+        Comment.path < comment.path + SUBTREE_END
+    )
+
+
+def rebuild_comment_threads(post_ids=None, chunk_size=5000):
+    """
+       Backfill: fills path/depth for comments that have none (rows from bulk
+       inserts, or from before threads), parents before children, then
+       recomputes reply_count / descendant_count set-wise. Limited to
+       `post_ids` when given. Returns the number of paths filled.
+    """
+    def scoped(stmt):
+        return stmt.where(Comment.post_id.in_(post_ids)) if post_ids is not None else stmt
+
+    filled = 0
+    while True:
+        parent = aliased(Comment)
+        rows = db.session.execute(scoped(
+            select(Comment.id, parent.path, parent.depth)
+            .outerjoin(parent, Comment.parent_id == parent.id)
+            .where(Comment.path.is_(None))
+            # a parent without a path yet waits for the next round
+            .where((Comment.parent_id.is_(None)) | (parent.path.is_not(None)))
+            .order_by(Comment.id)
+            .limit(chunk_size)
+        )).all()
+        if not rows:
+            break
+        db.session.execute(update(Comment), [
+            {
+                "id": comment_id,
+                "path": (parent_path or "") + path_segment(comment_id),
+                "depth": parent_depth + 1 if parent_path is not None else 0,
+            }
+            for comment_id, parent_path, parent_depth in rows
+        ])
+        filled += len(rows)
+
+    child = aliased(Comment)
+    reply_counts = (
+        select(func.count(child.id))
+        .where(child.parent_id == Comment.id)
+        .scalar_subquery()
+    )
+    descendant_counts = (
+        select(func.count(child.id))
+        .where(
+            child.post_id == Comment.post_id,
+            child.path > Comment.path,
+            child.path < Comment.path + SUBTREE_END
+        )
+        .scalar_subquery()
+    )
+    db.session.execute(scoped(
+        update(Comment)
+        .values(reply_count=reply_counts, descendant_count=descendant_counts)
+        .execution_options(synchronize_session=False)
+    ))
+    db.session.commit()
+    return filled
@@ -0,0 +1,125 @@
+import hashlib
+from datetime import datetime, UTC
+
+from flask import current_app, request
+from sqlalchemy import select, update
+from sqlalchemy.sql.expression import SelectBase
+
+from .extensions import db
+from .models import Comment, Post, User
+
+# Version counters behind conditional GETs (ETag / Last-Modified).
+#
+#   Post.version  moves with every change to the post's serialized form:
+#                 its fields, vote counts, comments and the names of its
+#                 author and commenters
+#   User.version  moves with every change to what /api/auth/me returns:
+#                 the user's fields and profile counters (app/profiles.py)
+#
+# Handlers compare If-None-Match (or If-Modified-Since against updated_at)
+# before running any serialization query and answer 304 when it still
+# matches.
+# The touch_* helpers run inside the caller's transaction; the caller
+# commits.
+
+
+def _utcnow():
+    return datetime.now(UTC)
+
+
+def touch_posts(post_ids):
+    """Bumps the version of `post_ids` (ids or a select of ids)."""
+    if not isinstance(post_ids, SelectBase):
+        post_ids = list(set(post_ids))
+        if not post_ids:
+            return
+    db.session.execute(
+        update(Post)
+        .where(Post.id.in_(post_ids))
+        .values(version=Post.version + 1, updated_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def touch_users(user_ids):
+    """Bumps the version of `user_ids` (ids or a select of ids)."""
+    if not isinstance(user_ids, SelectBase):
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(version=User.version + 1, updated_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def touch_renamed_user(user_id):
+    """A name shows up in the user's posts and under every post they commented on."""
+    touch_users([user_id])
+    touch_posts(
+        select(Post.id).where(Post.author_id == user_id)
+        .union(select(Comment.post_id).where(Comment.author_id == user_id))
+    )
+
+
+# ------------------------
+# Validators
+# ------------------------
+def make_tag(*parts):
+    return "-".join(str(p) for p in parts)
+
+
+def digest_tag(prefix, rows):
+    """Tag for a list response, from the (id, version) pairs of its rows."""
+    h = hashlib.blake2b(digest_size=12)
+    for row in rows:
+        h.update(repr(tuple(row)).encode())
+    return f"{prefix}-{h.hexdigest()}"
+
+
+def versions_current(rows):
+    """
+       True while every (post_id, version) in `rows` is still the post's
+       current version: one primary-key lookup, to check a cached list
+       response against the posts it shows.
+    """
+    rows = {post_id: version for post_id, version in rows}
+    if not rows:
+        return True
+    current = db.session.execute(select(Post.id, Post.version).where(Post.id.in_(rows))).all()
+    return len(current) == len(rows) and all(rows[post_id] == version for post_id, version in current)
+
+
+def last_modified_of(obj):
+    value = obj.updated_at or obj.created_at
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value
+
+
+def not_modified(tag, last_modified=None):
+    """
+       A 304 response when the request's If-None-Match (or, without one,
+       If-Modified-Since) still matches, else None.
+    """
+    if request.if_none_match:
+        if not request.if_none_match.contains_weak(tag):
+            return None
+    elif last_modified is None or request.if_modified_since is None:
+        return None
+    elif last_modified.replace(microsecond=0) > request.if_modified_since:
+        return None
+    return with_validators(current_app.response_class(status=304), tag, last_modified)
+
+
+def with_validators(response, tag, last_modified=None):
+    response.set_etag(tag, weak=True)
+    # HTTP dates have whole seconds: a change later in this same second
+    # would carry the same date, so only dates already past can revalidate
+    if last_modified is not None and last_modified < _utcnow().replace(microsecond=0):
+        response.last_modified = last_modified
+    # responses depend on the caller (their vote, their profile): revalidate each time
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
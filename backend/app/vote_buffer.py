@@ -0,0 +1,357 @@
+import atexit
+import contextlib
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+
+from .hashing import in_hashing_pool
+
+logger = logging.getLogger(__name__)
+
+# Optional write-behind mode for votes (VOTE_BUFFER_ENABLED).
+#
+# A vote is acknowledged once it is appended to this process's log on local
+# disk. In memory, pending votes are coalesced per (user_id, post_id) as the
+# user's resulting vote (1, -1 or None), so a burst of toggles on a hot
+# post collapses into at most one row write. A flusher thread writes them to
+# the Vote table every VOTE_BUFFER_FLUSH_INTERVAL seconds in one transaction
+# (app.votes.write_votes), instead of one commit per click. A transaction
+# takes at most VOTE_BUFFER_MAX_FLUSH_ROWS keys; the rest are carried into
+# the next segment and flushed right after, so a backlog drains in bounded
+# batches instead of one ever larger write that keeps failing.
+#
+# Log layout, in VOTE_BUFFER_DIR:
+#   votes-<pid>.lock        held with flock for the life of the process
+#   votes-<pid>-<seq>.log   one segment per flush cycle, JSON lines
+# Each flush starts a new segment and deletes the older ones once their
+# votes are committed. Entries hold the resulting vote, not the click, so
+# replaying a segment twice is harmless. On startup, the segments of any
+# process whose lock is free (it died) are replayed into this process.
+#
+# Limit: pending votes live in the worker that took them. Another worker
+# applies a toggle against the committed vote, so two clicks of one user on
+# one post landing on different workers within a flush interval can lose
+# the toggle, and a user only sees their own unflushed vote on the worker
+# that has it. With several workers, route each user to one of them (e.g.
+# hash the Authorization header at the load balancer), or run one worker
+# per host.
+
+
+class VoteBuffer:
+    """
+       Configured from:
+         VOTE_BUFFER_ENABLED         acknowledge votes from the log (off by default)
+         VOTE_BUFFER_DIR             where the log segments live
+         VOTE_BUFFER_FLUSH_INTERVAL  seconds between flushes
+         VOTE_BUFFER_MAX_PENDING     flush early once this many keys are pending
+         VOTE_BUFFER_MAX_FLUSH_ROWS  most keys written per flush transaction
+         VOTE_BUFFER_FSYNC           fsync every append (durable across power loss)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self._pending = {}
+        self._flushing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self._segment = None
+        self._seq = 0
+        atexit.register(self.close)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("VOTE_BUFFER_ENABLED", False)
+        app.extensions["vote_buffer"] = self
+        # the password hashing pool re-imports the app
+        if not self.enabled or in_hashing_pool():
+            self.enabled = False
+            return
+        self.app = app
+        self.directory = app.config.get("VOTE_BUFFER_DIR", "vote-buffer")
+        self.interval = app.config.get("VOTE_BUFFER_FLUSH_INTERVAL", 1.0)
+        self.max_pending = app.config.get("VOTE_BUFFER_MAX_PENDING", 10000)
+        self.max_flush_rows = app.config.get("VOTE_BUFFER_MAX_FLUSH_ROWS", 5000)
+        self.fsync = app.config.get("VOTE_BUFFER_FSYNC", True)
+        self._open()
+
+    # ------------------------
+    # Log
+    # ------------------------
+    def _prefix(self, pid=None):
+        return os.path.join(self.directory, f"votes-{pid or os.getpid()}")
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._pending, self._flushing, self._segment, self._seq = {}, {}, None, 0
+        self._lock_file = open(self._prefix() + ".lock", "w")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # a crashed process that had our pid
+        leftovers = []
+        for path in _segments(self._prefix()):
+            leftovers.extend(_read_segment(path))
+            os.remove(path)
+        self._rotate()
+        for user_id, post_id, value in leftovers:
+            self._pending[(user_id, post_id)] = value
+        self._append_many(leftovers)
+        self._recover()
+        self._closed.clear()
+        self._thread = threading.Thread(target=self._run, name="vote-buffer-flusher", daemon=True)
+        self._thread.start()
+
+    def _rotate(self):
+        """Starts a new segment; returns the paths of the older ones. Caller holds _lock or is starting up."""
+        if self._segment is not None:
+            self._segment.close()
+        self._seq += 1
+        self._segment = open(f"{self._prefix()}-{self._seq}.log", "a")
+        return [
+            path for path in _segments(self._prefix())
+            if _segment_seq(path) < self._seq
+        ]
+
+    def _append(self, user_id, post_id, value):
+        self._append_many([(user_id, post_id, value)])
+
+    def _append_many(self, votes):
+        """Appends (user_id, post_id, value) entries with a single fsync."""
+        if not votes:
+            return
+        self._segment.write("".join(json.dumps(list(vote)) + "\n" for vote in votes))
+        self._segment.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+
+    def _recover(self):
+        """Replays the segments of dead processes into this one."""
+        for lock_path in glob.glob(os.path.join(self.directory, "votes-*.lock")):
+            prefix = lock_path[:-len(".lock")]
+            if prefix == self._prefix():
+                continue
+            with open(lock_path, "a") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # owner is alive
+                # another worker recovered it and deleted the lock file after
+                # we opened it: the lock we hold is on a file nobody else sees
+                if not _is_current(f, lock_path):
+                    continue
+                recovered = 0
+                for path in _segments(prefix):
+                    with contextlib.suppress(FileNotFoundError):
+                        votes = list(_read_segment(path))
+                        for user_id, post_id, value in votes:
+                            self._pending[(user_id, post_id)] = value
+                        self._append_many(votes)
+                        recovered += len(votes)
+                        os.remove(path)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(lock_path)
+            if recovered:
+                logger.warning(f"Recovered {recovered} buffered vote(s) from {prefix}")
+
+    # ------------------------
+    # Votes
+    # ------------------------
+    def submit(self, user_id, post_id, value):
+        """
+           Applies the POST /api/votes toggle rules to the user's current vote
+           (pending, else stored) and logs the result. Returns (old, new).
+        """
+        return self.submit_many(user_id, [(post_id, value)])[0]
+
+    def submit_many(self, user_id, votes):
+        """
+           submit() for a list of (post_id, value) clicks of one user, applied
+           in order (a repeated post toggles again) with one lookup of the
+           stored votes and one log append. Returns [(old, new), ...].
+        """
+        from .votes import load_votes
+
+        keys = {(user_id, post_id) for post_id, _ in votes}
+        with self._lock:
+            known = {key: self._lookup(key) for key in keys}
+        unknown = [key for key, (found, _) in known.items() if not found]
+        # pending votes flushed meanwhile were written with the value seen here
+        stored = {key: value for key, (found, value) in known.items() if found}
+        stored.update(load_votes(unknown) if unknown else {})
+        with self._lock:
+            # a concurrent request of the same user may have got in first
+            current, outcomes = {}, []
+            for post_id, value in votes:
+                key = (user_id, post_id)
+                if key in current:
+                    old = current[key]
+                else:
+                    found, old = self._lookup(key)
+                    if not found:
+                        old = stored.get(key)
+                new = None if old == value else value
+                current[key] = new
+                outcomes.append((old, new))
+            self._append_many([(u, p, val) for (u, p), val in current.items()])
+            self._pending.update(current)
+            pending = len(self._pending)
+        if pending >= self.max_pending:
+            self._wake.set()
+        return outcomes
+
+    def pending_vote(self, user_id, post_id):
+        """(True, value) when the user has a vote on the post that is not committed yet."""
+        with self._lock:
+            return self._lookup((user_id, post_id))
+
+    def _lookup(self, key):
+        for votes in (self._pending, self._flushing):
+            if key in votes:
+                return True, votes[key]
+        return False, None
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    # ------------------------
+    # Flushing
+    # ------------------------
+    def flush(self):
+        """
+           Writes up to max_flush_rows pending votes in one transaction, the
+           oldest first. Returns the number of keys written.
+        """
+        from .cache import VOTE_SORTS
+        from .extensions import cache, db
+        from .models import Post, User
+        from .votes import load_votes, publish_vote_totals, write_votes
+
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                if len(self._pending) > self.max_flush_rows:
+                    keys = list(self._pending)[:self.max_flush_rows]
+                    pending = {key: self._pending.pop(key) for key in keys}
+                else:
+                    pending, self._pending = self._pending, {}
+                # still visible to submit/pending_vote until committed
+                self._flushing = pending
+                flushed_segments = self._rotate()
+                # the votes left for the next flush move to the new segment,
+                # so the older ones can go once this batch is committed
+                self._append_many([(u, p, val) for (u, p), val in self._pending.items()])
+
+            with self.app.app_context():
+                try:
+                    authors = dict(
+                        db.session.query(Post.id, Post.author_id)
+                        .filter(Post.id.in_({post_id for _, post_id in pending}))
+                        .all()
+                    )
+                    users = {
+                        user_id for (user_id,) in
+                        db.session.query(User.id)
+                        .filter(User.id.in_({user_id for user_id, _ in pending}))
+                        .all()
+                    }
+                    # votes on posts or by users deleted in the meantime are dropped
+                    final = {
+                        key: val for key, val in pending.items()
+                        if key[1] in authors and key[0] in users
+                    }
+                    deltas = write_votes(final, load_votes(final))
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    db.session.remove()
+                    # newer votes that arrived meanwhile win; the old segments stay on disk
+                    with self._lock:
+                        for key, val in pending.items():
+                            self._pending.setdefault(key, val)
+                        self._flushing = {}
+                    raise
+                with self._lock:
+                    self._flushing = {}
+
+                for author_id in {authors[post_id] for post_id in deltas}:
+                    cache.invalidate_post(author_id, VOTE_SORTS)
+                publish_vote_totals(deltas)
+                db.session.remove()
+
+            for path in flushed_segments:
+                os.remove(path)
+            return len(pending)
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._closed.is_set():
+                return
+            try:
+                flushed = self.flush()
+                if flushed:
+                    logger.info(f"Flushed {flushed} buffered vote(s)")
+                if flushed >= self.max_flush_rows:
+                    # a backlog: keep going without waiting out the interval
+                    self._wake.set()
+            except Exception as e:
+                logger.error(f"Vote buffer flush failed: {e}")
+
+    def close(self):
+        if not self.enabled or self._lock_file is None:
+            return
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        try:
+            while self.flush():
+                pass
+        except Exception as e:
+            logger.error(f"Final vote buffer flush failed, votes stay in the log: {e}")
+            return
+        # nothing left to replay
+        with self._lock:
+            self._segment.close()
+            for path in _segments(self._prefix()):
+                os.remove(path)
+            os.remove(self._prefix() + ".lock")
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def _is_current(f, path):
+    """True when the open file `f` is still the file at `path`."""
+    try:
+        on_disk = os.stat(path)
+    except FileNotFoundError:
+        return False
+    held = os.fstat(f.fileno())
+    return (held.st_dev, held.st_ino) == (on_disk.st_dev, on_disk.st_ino)
+
+
+def _segments(prefix):
+    return sorted(glob.glob(f"{glob.escape(prefix)}-*.log"), key=_segment_seq)
+
+
+def _segment_seq(path):
+    return int(path.rsplit("-", 1)[1][:-len(".log")])
+
+
+def _read_segment(path):
+    with open(path) as f:
+        for line in f:
+            try:
+                user_id, post_id, value = json.loads(line)
+            except ValueError:
+                # a torn last line from a crash mid-append was never acknowledged
+                continue
+            yield user_id, post_id, value
@@ -0,0 +1,236 @@
+from datetime import datetime, UTC
+
+from sqlalchemy import bindparam, case, delete, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .events import post_channel
+from .extensions import db, events
+from .models import Post, Vote
+from .stats import bump_stats
+from .profiles import bump_karma, rebuild_user_counters
+
+
+def apply_vote_delta(post_id, old_value, new_value):
+    """
+       Moves the counters on Post from `old_value` to `new_value` (1, -1 or
+       None for "no vote") with a single atomic UPDATE ... SET x = x + n, so
+       concurrent voters never overwrite each other. Runs inside the caller's
+       transaction; the caller commits. Returns the (up, down, score) deltas.
+    """
+    up, down, score = vote_delta(old_value, new_value)
+    if not (up or down or score):
+        return up, down, score
+
+    db.session.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(
+            upvote_count=Post.upvote_count + up,
+            downvote_count=Post.downvote_count + down,
+            score=Post.score + score,
+            hot_dirty=True,
+            version=Post.version + 1,
+            updated_at=datetime.now(UTC)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    bump_karma({post_id: score})
+    return up, down, score
+
+
+def reconcile_vote_counts(post_ids=None):
+    """
+       Rebuilds upvote_count/downvote_count/score from the Vote table in one
+       set-based UPDATE, then the karma of the posts' authors. Limited to
+       `post_ids` when given. Returns the number of posts touched.
+    """
+    def count_of(value):
+        return (
+            select(func.count(Vote.id))
+            .where(Vote.post_id == Post.id, Vote.value == value)
+            .scalar_subquery()
+        )
+
+    upvotes, downvotes = count_of(1), count_of(-1)
+    stmt = update(Post).values(
+        upvote_count=upvotes,
+        downvote_count=downvotes,
+        score=upvotes - downvotes,
+        hot_dirty=True,
+        version=Post.version + 1,
+        updated_at=datetime.now(UTC)
+    )
+    authors = select(Post.author_id)
+    if post_ids is not None:
+        stmt = stmt.where(Post.id.in_(post_ids))
+        authors = authors.where(Post.id.in_(post_ids))
+
+    result = db.session.execute(stmt.execution_options(synchronize_session=False))
+    rebuild_user_counters(authors)
+    db.session.commit()
+    return result.rowcount
+
+
+def find_drifted_posts():
+    """Returns ids of posts whose stored counters disagree with the Vote table."""
+    totals = (
+        select(
+            Vote.post_id,
+            func.sum(case((Vote.value == 1, 1), else_=0)).label("up"),
+            func.sum(case((Vote.value == -1, 1), else_=0)).label("down")
+        )
+        .group_by(Vote.post_id)
+        .subquery()
+    )
+    up = func.coalesce(totals.c.up, 0)
+    down = func.coalesce(totals.c.down, 0)
+    rows = db.session.execute(
+        select(Post.id)
+        .outerjoin(totals, totals.c.post_id == Post.id)
+        .where(
+            (Post.upvote_count != up) |
+            (Post.downvote_count != down) |
+            (Post.score != up - down)
+        )
+    )
+    return [pid for (pid,) in rows]
+
+
+def apply_vote_deltas(deltas):
+    """
+       apply_vote_delta for many posts at once: `deltas` maps post_id to
+       (up, down, score) and is written with one executemany UPDATE.
+    """
+    params = [
+        {"pid": post_id, "up": up, "down": down, "score": score}
+        for post_id, (up, down, score) in deltas.items()
+        if up or down or score
+    ]
+    if not params:
+        return
+    # Core table statement so the params list runs as a plain executemany
+    post = Post.__table__
+    db.session.execute(
+        update(post)
+        .where(post.c.id == bindparam("pid"))
+        .values(
+            upvote_count=post.c.upvote_count + bindparam("up"),
+            downvote_count=post.c.downvote_count + bindparam("down"),
+            score=post.c.score + bindparam("score"),
+            hot_dirty=True,
+            version=post.c.version + 1,
+            updated_at=datetime.now(UTC)
+        ),
+        params
+    )
+    bump_karma({post_id: score for post_id, (_, _, score) in deltas.items()})
+
+
+def vote_delta(old_value, new_value):
+    """(up, down, score) change when a user's vote moves from `old_value` to `new_value`."""
+    return (
+        (new_value == 1) - (old_value == 1),
+        (new_value == -1) - (old_value == -1),
+        (new_value or 0) - (old_value or 0),
+    )
+
+
+def load_votes(keys, chunk_size=500):
+    """Current value of each (user_id, post_id) in `keys` that has a vote."""
+    keys = list(keys)
+    found = {}
+    for start in range(0, len(keys), chunk_size):
+        rows = db.session.execute(
+            select(Vote.user_id, Vote.post_id, Vote.value)
+            .where(tuple_(Vote.user_id, Vote.post_id).in_(keys[start:start + chunk_size]))
+        )
+        found.update({(u, p): v for u, p, v in rows})
+    return found
+
+
+def upsert_votes(rows, chunk_size=500):
+    """
+       Writes `rows` ({user_id, post_id, value} dicts) with
+       INSERT ... ON CONFLICT (user_id, post_id) DO UPDATE, so the
+       unique_user_vote constraint decides between insert and update.
+       One statement per `chunk_size` rows keeps each under the bound
+       parameter limits (32766 on SQLite, 65535 on Postgres).
+    """
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(Vote).values(rows[start:start + chunk_size])
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[Vote.user_id, Vote.post_id],
+                set_={"value": stmt.excluded.value}
+            ))
+        return
+    for row in rows:
+        existing = Vote.query.filter_by(user_id=row["user_id"], post_id=row["post_id"]).first()
+        if existing:
+            existing.value = row["value"]
+        else:
+            db.session.add(Vote(**row))
+
+
+def write_votes(final, original, chunk_size=500):
+    """
+       Moves every (user_id, post_id) key of `final` from its `original`
+       value to its final one (1, -1 or None for "no vote") set-wise: an
+       upsert and a delete per `chunk_size` keys, one counter update and one
+       site_stats bump.
+       Runs inside the caller's transaction; the caller commits. Returns the
+       {post_id: (up, down, score)} counter deltas.
+    """
+    changed = {key: val for key, val in final.items() if original.get(key) != val}
+    upsert_votes([
+        {"user_id": u, "post_id": p, "value": val}
+        for (u, p), val in changed.items() if val is not None
+    ], chunk_size)
+    removed = [key for key, val in changed.items() if val is None]
+    for start in range(0, len(removed), chunk_size):
+        db.session.execute(
+            delete(Vote)
+            .where(tuple_(Vote.user_id, Vote.post_id).in_(removed[start:start + chunk_size]))
+            .execution_options(synchronize_session=False)
+        )
+
+    deltas = {}
+    for key, val in changed.items():
+        post_id = key[1]
+        up, down, score = vote_delta(original.get(key), val)
+        d_up, d_down, d_score = deltas.get(post_id, (0, 0, 0))
+        deltas[post_id] = (d_up + up, d_down + down, d_score + score)
+    apply_vote_deltas(deltas)
+
+    added = sum(1 for key in changed if original.get(key) is None)
+    bump_stats(total_votes=added - len(removed), daily="votes", daily_count=added)
+    return deltas
+
+
+def publish_vote_totals(deltas):
+    """
+       Sends the "vote" live event for each post of `deltas` ({post_id: (up,
+       down, score)}), with the fresh totals too so clients that also
+       refetch never double count. Call after the commit.
+    """
+    if not deltas:
+        return
+    totals = db.session.execute(
+        select(Post.id, Post.upvote_count, Post.downvote_count, Post.score)
+        .where(Post.id.in_(deltas))
+    )
+    for post_id, upvotes, downvotes, score in totals:
+        up, down, score_delta = deltas[post_id]
+        events.publish(post_channel(post_id), "vote", {
+            "post_id": post_id,
+            "upvotes_delta": up,
+            "downvotes_delta": down,
+            "score_delta": score_delta,
+            "upvotes": upvotes,
+            "downvotes": downvotes,
+            "score": score
+        })
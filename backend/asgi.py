@@ -0,0 +1,10 @@
+# ASGI entry point, e.g. `uvicorn asgi:app --workers 4` (see app/asgi.py);
+# wsgi.py is the WSGI one. Needs uvicorn (or any ASGI server), greenlet and
+# aiosqlite or asyncpg for the database in use
+from app import create_app
+from app.asgi import create_asgi_app
+from app.ranking import start_hot_refresher
+
+flask_app = create_app("serving")
+start_hot_refresher(flask_app)
+app = create_asgi_app(flask_app)
@@ -0,0 +1,236 @@
+"""
+ASGI serving (app/asgi.py): async read paths vs the same requests on threads.
+
+    python bench/asgi_bench.py                           # 64 clients, 100 idle SSE streams
+    python bench/asgi_bench.py --clients 256 --sse 500 --threads 16 --duration 20
+
+Seeds a throwaway SQLite database (app/seed.py), then for each mode starts
+uvicorn in a child process on asgi.AsgiApp:
+  async    feed, post, comments and event streams run on the async engine
+  threads  every request runs the WSGI app on the --threads pool, which is
+           what a threaded WSGI server (gunicorn gthread, waitress) does
+--sse event streams are opened first and left idle, then --clients
+keep-alive connections read the feed, single posts and comment pages for
+--duration seconds. Prints one JSON object per mode with throughput,
+p50/p95/p99 latency, errors and how many streams were served. Needs
+uvicorn, greenlet and aiosqlite.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def configure(args, db_path):
+    from app.config import Config
+
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+    Config.CACHE_BACKEND = args.cache
+    Config.HOT_REFRESH_INTERVAL = 0
+    Config.ASGI_THREADS = args.threads
+
+
+# ------------------------
+# Server (child process)
+# ------------------------
+def serve(args):
+    import uvicorn
+
+    from app import asgi, create_app
+
+    configure(args, args.db)
+    if args.serve == "threads":
+        asgi.ASYNC_ENDPOINTS.clear()
+    uvicorn.run(asgi.create_asgi_app(create_app()), host="127.0.0.1", port=args.port,
+                log_level="warning", backlog=4096)
+
+
+# ------------------------
+# Client
+# ------------------------
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = dict(line.lower().split(": ", 1) for line in lines[1:] if line)
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status
+
+
+def request_bytes(path, token):
+    return (f"GET {path} HTTP/1.1\r\nHost: bench\r\nAuthorization: Bearer {token}\r\n\r\n").encode()
+
+
+async def client(port, state, deadline, rng, samples, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.monotonic() < deadline:
+            post_id = rng.choice(state["post_ids"])
+            path = rng.choice([
+                "/api/posts/?view=summary",
+                f"/api/posts/{post_id}",
+                f"/api/comments?post_id={post_id}",
+            ])
+            start = time.perf_counter()
+            writer.write(request_bytes(path, rng.choice(state["tokens"])))
+            # a request stuck behind busy threads counts as an error once the run is over
+            status = await asyncio.wait_for(read_response(reader), max(deadline - time.monotonic(), 0) + 5)
+            samples.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append(status)
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+        errors.append(type(e).__name__)
+    finally:
+        writer.close()
+
+
+async def event_stream(port, state, post_id, opened):
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request_bytes(f"/api/posts/{post_id}/events", state["tokens"][0]))
+        await reader.readuntil(b"\r\n\r\n")
+        opened.append(post_id)
+        while await reader.read(4096):
+            pass
+    except (OSError, asyncio.IncompleteReadError):
+        pass
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else None
+
+
+async def drive(port, state, args):
+    rng = random.Random(args.seed)
+    opened = []
+    streams = [
+        asyncio.create_task(event_stream(port, state, rng.choice(state["post_ids"]), opened))
+        for _ in range(args.sse)
+    ]
+    await asyncio.sleep(1)
+
+    samples, errors = [], []
+    start = time.monotonic()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        client(port, state, deadline, random.Random(args.seed + i), samples, errors)
+        for i in range(args.clients)
+    ))
+    elapsed = time.monotonic() - start
+    for task in streams:
+        task.cancel()
+    await asyncio.gather(*streams, return_exceptions=True)
+
+    ordered = sorted(samples)
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 50) or 0, 2),
+        "p95_ms": round(percentile(ordered, 95) or 0, 2),
+        "p99_ms": round(percentile(ordered, 99) or 0, 2),
+        "errors": len(errors),
+        "sse_open": len(opened),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def prepare(args, db_path):
+    from flask_jwt_extended import create_access_token
+
+    from app import create_app
+    from app.extensions import db
+    from app.models import Post, User
+    from app.seed import seed_dataset
+
+    configure(args, db_path)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed_dataset(users=args.users, posts=args.posts, votes=args.votes,
+                     comments=args.comments, seed=args.seed)
+        state = {
+            "tokens": [create_access_token(identity=str(u.id)) for u in User.query.all()],
+            "post_ids": [pid for (pid,) in Post.query.with_entities(Post.id)],
+        }
+        db.engine.dispose()
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=["async", "threads"], default=["async", "threads"])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--sse", type=int, default=100, help="idle event streams held open during the run")
+    parser.add_argument("--threads", type=int, default=32, help="ASGI_THREADS")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--cache", default="null", help="CACHE_BACKEND of the server")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--serve", choices=["async", "threads"], help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.sqlite3")
+        state = prepare(args, db_path)
+        for mode in args.modes:
+            port = free_port()
+            server = subprocess.Popen([
+                sys.executable, __file__, "--serve", mode, "--db", db_path, "--port", str(port),
+                "--threads", str(args.threads), "--cache", args.cache,
+            ])
+            try:
+                wait_for(port)
+                result = asyncio.run(drive(port, state, args))
+            finally:
+                server.terminate()
+                try:
+                    server.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    server.kill()  # threads still held by event streams
+                    server.wait()
+            print(json.dumps({"mode": mode, "clients": args.clients, "sse": args.sse,
+                              "threads": args.threads, **result}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
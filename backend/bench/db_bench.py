@@ -0,0 +1,212 @@
+"""
+Mixed read/write throughput per database engine profile (app/database.py).
+
+    python bench/db_bench.py                                   # SQLite default vs tuned
+    python bench/db_bench.py --processes 4 --threads 8 --write-ratio 0.3
+    python bench/db_bench.py --postgres-url postgresql://bench@localhost/bench_scratch
+
+For each profile, seeds a fresh database (app/seed.py), then runs
+--processes worker processes of --threads threads each for --duration
+seconds. Every worker is its own create_app(), like a multi-worker
+deployment, and drives the Flask test client with reads (feed, single post,
+comments) and, with probability --write-ratio, writes (vote toggles on
+popular posts, new comments). Profiles:
+  sqlite-default   SQLite file, SQLAlchemy defaults (rollback journal)
+  sqlite-tuned     WAL, pragmas, single writer + reader pool
+  postgres-*       the same pair against --postgres-url
+
+Prints one JSON object with throughput, p50/p95 latency per operation kind
+and the exceptions behind any 5xx (e.g. "database is locked") per profile.
+--postgres-url must point at a scratch database: its tables are dropped.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+READS = [
+    ("feed", lambda s, r: ("GET", "/api/posts/?view=summary", None)),
+    ("post", lambda s, r: ("GET", f"/api/posts/{r.choice(s['hot'])}", None)),
+    ("comments", lambda s, r: ("GET", f"/api/comments?post_id={r.choice(s['hot'])}", None)),
+]
+WRITES = [
+    ("vote", lambda s, r: ("POST", "/api/votes/", {"post_id": r.choice(s["hot"]), "vote_type": r.choice(["up", "down"])})),
+    ("comment", lambda s, r: ("POST", "/api/comments/", {"post_id": r.choice(s["hot"]), "content": "bench"})),
+]
+
+
+def _make_app(url, profile):
+    # Config reads the environment at import: call before importing anything
+    # from app (each profile runs in freshly spawned processes)
+    os.environ.update({
+        "DATABASE_URL": url,
+        "DB_ENGINE_PROFILE": profile,
+        "PASSWORD_HASH_WORKERS": "0",
+        "PASSWORD_HASH_COST": "4",
+        "HOT_REFRESH_INTERVAL": "0",
+    })
+    from app import create_app
+    return create_app()
+
+
+def _seed(url, profile, args, results):
+    app = _make_app(url, profile)
+    from flask_jwt_extended import create_access_token
+
+    from app.extensions import db
+    from app.models import Post, User
+    from app.seed import seed_dataset
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_dataset(users=args.users, posts=args.posts, votes=args.votes,
+                     comments=args.comments, seed=args.seed)
+        hot = Post.query.order_by(Post.score.desc()).limit(args.hot_posts).all()
+        users = User.query.order_by(User.id).offset(1).all()
+        results.put({
+            "hot": [p.id for p in hot],
+            "tokens": [create_access_token(identity=str(u.id)) for u in users],
+        })
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _worker(url, profile, state, args, seed, results):
+    from flask import got_request_exception
+
+    app = _make_app(url, profile)
+    failures = Counter()
+
+    def record(sender, exception, **extra):
+        failures[f"{type(exception).__name__}: {str(exception).splitlines()[0][:120]}"] += 1
+
+    got_request_exception.connect(record, app)
+
+    samples = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        client = app.test_client()
+        token = rng.choice(state["tokens"])
+        mine = []
+        while time.perf_counter() < deadline:
+            ops = WRITES if rng.random() < args.write_ratio else READS
+            name, request = rng.choice(ops)
+            method, path, body = request(state, rng)
+            start = time.perf_counter()
+            res = client.open(path, method=method, json=body, headers={"Authorization": f"Bearer {token}"})
+            mine.append((name, res.status_code, (time.perf_counter() - start) * 1000))
+        with lock:
+            samples.extend(mine)
+
+    threads = [threading.Thread(target=run, args=(seed * 1000 + i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put((samples, dict(failures), time.perf_counter() - started))
+
+
+def percentile(ordered, pct):
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 3)
+
+
+def summarize(samples, duration):
+    latencies = sorted(ms for _, _, ms in samples)
+    if not latencies:
+        return {"requests": 0}
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, status, _ in samples if status >= 500),
+        "throughput_ops": round(len(samples) / duration, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+    }
+
+
+def run_profile(url, profile, args):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    seeder = ctx.Process(target=_seed, args=(url, profile, args, results))
+    seeder.start()
+    state = results.get()
+    seeder.join()
+
+    workers = [
+        ctx.Process(target=_worker, args=(url, profile, state, args, args.seed + i, results))
+        for i in range(args.processes)
+    ]
+    for w in workers:
+        w.start()
+    samples, failures, elapsed = [], Counter(), 0
+    for _ in workers:
+        part, failed, wall = results.get()
+        samples.extend(part)
+        failures.update(failed)
+        elapsed = max(elapsed, wall)
+    for w in workers:
+        w.join()
+
+    write_names = {name for name, _ in WRITES}
+    by_op = {}
+    for sample in samples:
+        by_op.setdefault(sample[0], []).append(sample)
+    return {
+        "overall": summarize(samples, elapsed),
+        "reads": summarize([s for s in samples if s[0] not in write_names], elapsed),
+        "writes": summarize([s for s in samples if s[0] in write_names], elapsed),
+        "operations": {name: summarize(s, elapsed) for name, s in sorted(by_op.items())},
+        "failures": dict(failures.most_common(5)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="threads per process")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--hot-posts", type=int, default=10, help="posts the traffic concentrates on")
+    parser.add_argument("--postgres-url", help="also run the postgres profiles (tables are dropped)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    report = {
+        "processes": args.processes,
+        "threads": args.threads,
+        "write_ratio": args.write_ratio,
+        "profiles": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = [
+            (f"sqlite-{profile}", f"sqlite:///{os.path.join(tmp, f'{profile}.sqlite3')}", profile)
+            for profile in ("default", "tuned")
+        ]
+        if args.postgres_url:
+            targets += [(f"postgres-{profile}", args.postgres_url, profile) for profile in ("default", "tuned")]
+        for name, url, profile in targets:
+            report["profiles"][name] = run_profile(url, profile, args)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
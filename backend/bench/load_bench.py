@@ -0,0 +1,339 @@
+"""
+End-to-end load test over every blueprint (auth, posts, votes, comments,
+admin) against a seeded synthetic dataset (app/seed.py).
+
+    python bench/load_bench.py                                 # test client, 10s
+    python bench/load_bench.py --mode http --workers 8 --duration 30
+    python bench/load_bench.py --users 2000 --posts 50000 --votes 500000 --output base.json
+
+Seeds a throwaway SQLite database, then drives a weighted mix of requests
+for --duration seconds:
+  client  one thread through the Flask test client; SQL queries are counted
+          per endpoint
+  http    --workers client processes hitting a threaded HTTP server started
+          in this process; SQL queries are counted for the run as a whole
+
+Prints one JSON object with throughput, p50/p95/p99 latency and queries per
+request for each endpoint and overall, plus the peak RSS of the process
+serving the app and the git commit, so runs can be diffed between commits.
+The SSE stream (/api/posts/<id>/events) is long-lived and left out.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+# ------------------------
+# Workload
+# ------------------------
+# Each scenario returns (method, path, json_body, token) for one request, or
+# None when it has nothing left to do (e.g. no disposable rows to delete).
+
+def _reader(state, rng):
+    return rng.choice(state["tokens"])
+
+
+def _post(state, rng):
+    # readers follow the same skew as the seeded votes: mostly popular posts
+    return rng.choices(state["post_ids"], state["post_weights"])[0]
+
+
+def _pop(state, key):
+    return state[key].pop() if state[key] else None
+
+
+SCENARIOS = [
+    # name,                weight, request
+    ("posts.list_recent",   20, lambda s, r: ("GET", "/api/posts/", None, None)),
+    ("posts.list_top",      10, lambda s, r: ("GET", "/api/posts/?sort=top", None, None)),
+    ("posts.list_hot",      10, lambda s, r: ("GET", "/api/posts/?sort=hot", None, None)),
+    ("posts.list_summary",  10, lambda s, r: ("GET", "/api/posts/?view=summary", None, None)),
+    ("posts.search",         5, lambda s, r: ("GET", f"/api/posts/?keyword={r.choice(s['keywords'])}", None, None)),
+    ("posts.get",           15, lambda s, r: ("GET", f"/api/posts/{_post(s, r)}", None, _reader(s, r))),
+    ("posts.votes",          5, lambda s, r: ("GET", f"/api/posts/{_post(s, r)}/votes", None, _reader(s, r))),
+    ("posts.create",         2, lambda s, r: ("POST", "/api/posts/", {"title": "load test", "content": "body"}, _reader(s, r))),
+    ("posts.edit",           1, lambda s, r: ("PATCH", f"/api/posts/{_post(s, r)}", {"title": f"edited {r.random():.6f}"}, s["admin"])),
+    ("posts.delete",         1, lambda s, r: (lambda pid: pid and ("DELETE", f"/api/posts/{pid}", None, s["admin"]))(_pop(s, "spare_posts"))),
+    ("votes.cast",          10, lambda s, r: ("POST", "/api/votes/", {"post_id": _post(s, r), "vote_type": r.choice(["up", "down"])}, _reader(s, r))),
+    ("votes.batch",          1, lambda s, r: ("POST", "/api/votes/batch", {"votes": [{"post_id": _post(s, r), "vote_type": r.choice(["up", "down"])} for _ in range(20)]}, _reader(s, r))),
+    ("comments.list",        8, lambda s, r: ("GET", f"/api/comments?post_id={_post(s, r)}", None, _reader(s, r))),
+    ("comments.add",         3, lambda s, r: ("POST", "/api/comments/", {"post_id": _post(s, r), "content": "load test"}, _reader(s, r))),
+    ("comments.delete",      1, lambda s, r: (lambda cid: cid and ("DELETE", f"/api/comments/{cid}", None, s["admin"]))(_pop(s, "spare_comments"))),
+    ("auth.login",           2, lambda s, r: ("POST", "/api/auth/login", {"email": r.choice(s["emails"]), "password": s["password"]}, None)),
+    ("auth.me",              4, lambda s, r: ("GET", "/api/auth/me", None, _reader(s, r))),
+    ("auth.me_posts",        1, lambda s, r: ("GET", "/api/auth/me/posts", None, _reader(s, r))),
+    ("auth.update",          1, lambda s, r: ("PATCH", "/api/auth/update", {"name": f"user {r.randrange(10 ** 6)}"}, _reader(s, r))),
+    ("auth.change_password", 1, lambda s, r: ("PATCH", "/api/auth/change-password", {"old_password": s["password"], "new_password": s["password"]}, _reader(s, r))),
+    ("auth.register",        1, lambda s, r: ("POST", "/api/auth/register", {"name": "new", "email": f"new{r.getrandbits(48)}@example.com", "password": s["password"]}, None)),
+    ("admin.users",          1, lambda s, r: ("GET", "/api/admin/users", None, s["admin"])),
+    ("admin.analytics",      2, lambda s, r: ("GET", "/api/admin/analytics", None, s["admin"])),
+    ("admin.cache_stats",    1, lambda s, r: ("GET", "/api/admin/cache-stats", None, s["admin"])),
+    ("admin.ban",            1, lambda s, r: ("PATCH", f"/api/admin/users/{s['victim']}/ban", None, s["admin"])),
+    ("admin.set_admin",      1, lambda s, r: ("PATCH", f"/api/admin/users/{s['victim']}/set-admin", {"is_admin": r.random() < 0.5}, s["admin"])),
+]
+
+
+def next_request(state, rng):
+    names, weights = zip(*((name, weight) for name, weight, _ in SCENARIOS))
+    while True:
+        index = rng.choices(range(len(SCENARIOS)), weights)[0]
+        request = SCENARIOS[index][2](state, rng)
+        if request:
+            return names[index], request
+
+
+# ------------------------
+# Setup
+# ------------------------
+def prepare(app, args):
+    """Seeds the database and returns the state the scenarios draw from."""
+    from flask_jwt_extended import create_access_token
+
+    from app.extensions import db
+    from app.models import Comment, Post, User
+    from app.seed import SEED_PASSWORD, seed_dataset
+    from app.profiles import rebuild_user_counters
+    from app.threads import rebuild_comment_threads
+
+    with app.app_context():
+        db.create_all()
+        dataset = seed_dataset(
+            users=args.users, posts=args.posts, votes=args.votes,
+            comments=args.comments, skew=args.skew, seed=args.seed
+        )
+        users = User.query.order_by(User.id).all()
+        admin, victim, readers = users[0], users[1], users[2:]
+
+        # rows the delete scenarios may remove without shrinking the dataset
+        posts = Post.query.with_entities(Post.id, Post.score).all()
+        spare_posts = [Post(title="spare", content="spare", author_id=admin.id) for _ in range(args.spare)]
+        spare_comments = [
+            Comment(content="spare", author_id=admin.id, post_id=posts[i % len(posts)].id)
+            for i in range(args.spare)
+        ]
+        db.session.add_all(spare_posts + spare_comments)
+        db.session.commit()
+        rebuild_comment_threads()
+        rebuild_user_counters([admin.id])
+        db.session.commit()
+
+        state = {
+            "admin": create_access_token(identity=str(admin.id)),
+            "victim": victim.id,
+            "tokens": [create_access_token(identity=str(u.id)) for u in readers],
+            "emails": [u.email for u in readers],
+            "password": SEED_PASSWORD,
+            "post_ids": [pid for pid, _ in posts],
+            "post_weights": [max(score, 0) + 1 for _, score in posts],
+            "keywords": ["community", "flask", "cache", "release", "que", "pyth"],
+            "spare_posts": [p.id for p in spare_posts],
+            "spare_comments": [c.id for c in spare_comments],
+        }
+    return dataset, state
+
+
+def split_state(state, parts):
+    """Gives each worker its own share of the disposable rows."""
+    shares = []
+    for i in range(parts):
+        share = dict(state)
+        share["spare_posts"] = state["spare_posts"][i::parts]
+        share["spare_comments"] = state["spare_comments"][i::parts]
+        shares.append(share)
+    return shares
+
+
+# ------------------------
+# Runners
+# ------------------------
+def run_client(app, state, args):
+    from app.extensions import db
+    from app.query_counter import count_queries
+
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    samples = []
+    deadline = time.perf_counter() + args.duration
+    with app.app_context():
+        engines = tuple(db.engines.values())
+    while time.perf_counter() < deadline:
+        name, (method, path, body, token) = next_request(state, rng)
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        with count_queries(*engines) as counter:
+            start = time.perf_counter()
+            res = client.open(path, method=method, json=body, headers=headers)
+            ms = (time.perf_counter() - start) * 1000
+        samples.append((name, res.status_code, ms, counter.count))
+    return samples, None
+
+
+def _http_worker(base_url, state, seed, duration, results):
+    rng = random.Random(seed)
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        name, (method, path, body, token) = next_request(state, rng)
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        if token:
+            req.add_header("Authorization", f"Bearer {token}")
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as res:
+                res.read()
+                status = res.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = 0
+        samples.append((name, status, (time.perf_counter() - start) * 1000, None))
+    results.put(samples)
+
+
+def run_http(app, state, args):
+    from werkzeug.serving import make_server
+
+    from app.extensions import db
+    from app.query_counter import count_queries
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_http_worker, args=(base_url, share, args.seed + i, args.duration, results))
+        for i, share in enumerate(split_state(state, args.workers))
+    ]
+    with app.app_context():
+        engines = tuple(db.engines.values())
+    with count_queries(*engines) as counter:
+        for w in workers:
+            w.start()
+        samples = []
+        for _ in workers:
+            samples.extend(results.get())
+        for w in workers:
+            w.join()
+    server.shutdown()
+    return samples, counter.count
+
+
+# ------------------------
+# Report
+# ------------------------
+def percentile(ordered, pct):
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 3)
+
+
+def summarize(samples, duration):
+    latencies = sorted(ms for _, _, ms, _ in samples)
+    queries = [q for _, _, _, q in samples if q is not None]
+    summary = {
+        "requests": len(samples),
+        "errors": sum(1 for _, status, _, _ in samples if status == 0 or status >= 500),
+        "statuses": dict(Counter(str(status) for _, status, _, _ in samples)),
+        "throughput_rps": round(len(samples) / duration, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+    }
+    if queries:
+        summary["queries_per_request"] = round(statistics.fmean(queries), 2)
+        summary["max_queries"] = max(queries)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(__file__), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["client", "http"], default="client")
+    parser.add_argument("--workers", type=int, default=4, help="client processes in http mode")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--votes", type=int, default=50000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--spare", type=int, default=1000, help="disposable posts/comments for the delete scenarios")
+    parser.add_argument("--hash-cost", type=int, default=4, help="bcrypt cost, kept low so logins do not dominate")
+    parser.add_argument("--hash-workers", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        from app import create_app
+        from app.config import Config
+        from app.extensions import db
+
+        Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        Config.PASSWORD_HASH_COST = args.hash_cost
+        Config.PASSWORD_HASH_WORKERS = args.hash_workers
+        Config.HOT_REFRESH_INTERVAL = 0
+        app = create_app()
+        dataset, state = prepare(app, args)
+
+        runner = run_http if args.mode == "http" else run_client
+        started = time.perf_counter()
+        samples, total_queries = runner(app, state, args)
+        elapsed = time.perf_counter() - started
+
+        by_endpoint = {}
+        for sample in samples:
+            by_endpoint.setdefault(sample[0], []).append(sample)
+        overall = summarize(samples, elapsed)
+        if total_queries is not None:
+            overall["queries_per_request"] = round(total_queries / max(len(samples), 1), 2)
+
+        report = {
+            "commit": git_commit(),
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "http" else 1,
+            "duration_s": round(elapsed, 3),
+            "dataset": dataset,
+            "overall": overall,
+            "endpoints": {name: summarize(s, elapsed) for name, s in sorted(by_endpoint.items())},
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Login throughput with inline hashing vs the hashing process pool.
+
+    python bench/login_bench.py --threads 8 --duration 10
+    python bench/login_bench.py --workers 0 4 --cost 10
+
+For each pool size, hammers POST /api/auth/login from --threads threads for
+--duration seconds while one more thread keeps reading GET /api/posts, and
+prints one JSON object with login throughput, 429 count and the feed's
+p50/p99 latency during the burst.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 3)
+
+
+def run(workers, args):
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db, hasher
+    from app.models import Post, User
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        Config.CACHE_BACKEND = "null"
+        Config.PASSWORD_HASH_WORKERS = workers
+        Config.PASSWORD_HASH_COST = args.cost
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            users = []
+            for i in range(args.users):
+                users.append(User(name=f"user{i}", email=f"user{i}@example.com", password=hasher.hash("secret")))
+            db.session.add_all(users)
+            db.session.flush()
+            db.session.add_all(Post(title=f"post {i}", content="bench", author_id=users[0].id) for i in range(50))
+            db.session.commit()
+
+        stop = threading.Event()
+        statuses = []
+        feed_ms = []
+
+        def login(n):
+            client = app.test_client()
+            i = n
+            while not stop.is_set():
+                r = client.post("/api/auth/login", json={"email": f"user{i % args.users}@example.com", "password": "secret"})
+                statuses.append(r.status_code)
+                i += args.threads
+
+        def feed():
+            client = app.test_client()
+            while not stop.is_set():
+                start = time.perf_counter()
+                client.get("/api/posts/")
+                feed_ms.append((time.perf_counter() - start) * 1000)
+
+        threads = [threading.Thread(target=login, args=(n,)) for n in range(args.threads)]
+        threads.append(threading.Thread(target=feed))
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        hasher.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+
+    ok = statuses.count(200)
+    return {
+        "hash_workers": workers,
+        "cost": args.cost,
+        "threads": args.threads,
+        "logins_ok": ok,
+        "logins_per_sec": round(ok / elapsed, 2),
+        "rejected_429": statuses.count(429),
+        "feed_requests": len(feed_ms),
+        "feed_p50_ms": percentile(feed_ms, 50),
+        "feed_p99_ms": percentile(feed_ms, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, min(4, os.cpu_count() or 1)])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--cost", type=int, default=10)
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        print(json.dumps(run(workers, args)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Feed payload: view=full (embedded comments) vs view=summary (comment_count).
+
+    python bench/payload_bench.py                       # 1k posts, 50 comments each
+    python bench/payload_bench.py --posts 5000 --comments 200 --pages 50
+
+Builds a throwaway SQLite database, walks the first --pages pages of
+GET /api/posts for each view and prints one JSON object per view with the
+mean response size in bytes and p50/p99 latency in milliseconds.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def populate(db, posts, comments, rng, batch=10000):
+    from app.threads import rebuild_comment_threads
+
+    db.session.execute(db.text(
+        "INSERT INTO user (id, name, email, password) VALUES (1, 'bench', 'bench@example.com', 'x')"
+    ))
+    post_insert = db.text(
+        "INSERT INTO post (id, title, content, created_at, author_id, upvote_count, downvote_count, score) "
+        "VALUES (:id, :title, :content, CURRENT_TIMESTAMP, 1, 0, 0, 0)"
+    )
+    db.session.execute(post_insert, [
+        {"id": i, "title": f"Post {i}", "content": "lorem ipsum " * rng.randint(5, 50)}
+        for i in range(1, posts + 1)
+    ])
+    comment_insert = db.text(
+        "INSERT INTO comment (content, created_at, author_id, post_id) "
+        "VALUES (:content, CURRENT_TIMESTAMP, 1, :post_id)"
+    )
+    rows = [
+        {"content": "dolor sit amet " * rng.randint(1, 10), "post_id": post_id}
+        for post_id in range(1, posts + 1)
+        for _ in range(rng.randint(0, comments * 2))
+    ]
+    for start in range(0, len(rows), batch):
+        db.session.execute(comment_insert, rows[start:start + batch])
+    db.session.commit()
+    rebuild_comment_threads()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def walk(client, view, pages):
+    sizes, samples = [], []
+    cursor = None
+    for _ in range(pages):
+        params = {"view": view}
+        if cursor:
+            params["cursor"] = cursor
+        start = time.perf_counter()
+        res = client.get("/api/posts", query_string=params)
+        samples.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(res.data))
+        cursor = res.get_json()["next_cursor"]
+        if not cursor:
+            break
+    return {
+        "view": view,
+        "pages": len(samples),
+        "mean_bytes": round(statistics.fmean(sizes)),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--comments", type=int, default=50, help="mean comments per post")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        from app import create_app
+        from app.config import Config
+        from app.extensions import db
+
+        Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        Config.CACHE_BACKEND = "null"
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            populate(db, args.posts, args.comments, random.Random(args.seed))
+
+        client = app.test_client()
+        for view in ("full", "summary"):
+            print(json.dumps(walk(client, view, args.pages)), flush=True)
+
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
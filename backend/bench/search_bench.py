@@ -0,0 +1,125 @@
+"""
+Search latency: ILIKE '%kw%' scan vs the full-text index (app/search.py).
+
+    python bench/search_bench.py                 # 10k, 100k, 1M posts
+    python bench/search_bench.py --sizes 10000 --queries 200
+
+Builds a throwaway SQLite database per size and prints one JSON object per
+size with p50/p99 latency in milliseconds for both strategies.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+def populate(db, count, vocab, rng, batch=10000):
+    # zipf-like word frequencies so some terms are common and most are rare
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    insert = db.text(
+        "INSERT INTO post (title, content, created_at, author_id, upvote_count, downvote_count, score) "
+        "VALUES (:title, :content, CURRENT_TIMESTAMP, 1, 0, 0, 0)"
+    )
+    for start in range(0, count, batch):
+        rows = []
+        for _ in range(min(batch, count - start)):
+            rows.append({
+                "title": " ".join(rng.choices(vocab, weights, k=6)),
+                "content": " ".join(rng.choices(vocab, weights, k=60)),
+            })
+        db.session.execute(insert, rows)
+        db.session.commit()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed(fn, terms):
+    samples = []
+    for term in terms:
+        start = time.perf_counter()
+        fn(term)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+def run(size, queries, seed):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        from app import create_app
+        from app.config import Config
+        from app.extensions import db
+        from app.models import Post, User
+        from app.search import apply_search
+
+        Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        Config.CACHE_BACKEND = "null"
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(name="bench", email="bench@example.com", password="x"))
+            db.session.commit()
+
+            vocab = make_vocabulary(5000, rng)
+            populate(db, size, vocab, rng)
+
+            # mid-frequency words, searched both whole and as 4-letter prefixes
+            pool = vocab[50:2000]
+            terms = [rng.choice(pool) for _ in range(queries)]
+            terms = [t if i % 2 else t[:4] for i, t in enumerate(terms)]
+
+            def like(term):
+                il = f"%{term}%"
+                (Post.query
+                    .filter(Post.title.ilike(il) | Post.content.ilike(il))
+                    .order_by(Post.created_at.desc())
+                    .limit(20).all())
+
+            def fts(term):
+                q, rank = apply_search(Post.query, term)
+                q.order_by(rank.desc(), Post.id.desc()).limit(20).all()
+
+            result = {
+                "posts": size,
+                "queries": len(terms),
+                "ilike": timed(like, terms),
+                "fulltext": timed(fts, terms),
+            }
+            db.session.remove()
+            db.engine.dispose()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        print(json.dumps(run(size, args.queries, args.seed)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
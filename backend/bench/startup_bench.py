@@ -0,0 +1,158 @@
+"""
+Worker cold start: time from a fresh interpreter to a ready app, per profile.
+
+    python bench/startup_bench.py                              # every profile, 7 runs each
+    python bench/startup_bench.py --output bench/startup_baseline.json   # record a new baseline
+    python bench/startup_bench.py --baseline ""                # no baseline comparison
+    python bench/startup_bench.py --budget-ms 900 --top 15
+
+Each run is a new Python process that imports the app and calls
+create_app(profile), then registers the blueprints the way the first
+request of the serving profile does (app/serving.py). "preloaded" is the
+serving profile in a process that already ran app.serving.preload(), i.e.
+a worker forked from a gunicorn.conf.py master. Prints one JSON
+object per profile with the median and best create_app time, the first
+request's blueprint load time, how many modules were imported and, with
+--top, the modules with the most import time of their own
+(python -X importtime).
+
+Exits with status 1, so CI fails, when:
+  - the serving profiles imported a module they must not (Flask-Migrate,
+    Alembic, the CLI)
+  - a profile's median is over --budget-ms (DEFAULT_BUDGET_MS)
+  - a profile's median is more than --tolerance slower than in --baseline
+    (the committed bench/startup_baseline.json by default)
+tests/test_startup.py runs it with the test suite. Record a new baseline
+when a change makes startup slower on purpose, or on new CI hardware.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SERVING_FORBIDDEN = ("flask_migrate", "alembic", "app.cli", "app.seed")
+# about twice the full profile's median on the machine that recorded the baseline
+DEFAULT_BUDGET_MS = 1500
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+PROBE = """
+import json, sys, time
+profile = sys.argv[1]
+if profile == "preloaded":
+    # what a worker forked from a master that ran preload() (gunicorn.conf.py) still pays
+    from app.serving import preload
+    preload()
+    profile = "serving"
+start = time.perf_counter()
+from app import create_app
+app = create_app(profile)
+ready = time.perf_counter()
+from app.serving import load_blueprints
+load_blueprints(app)
+loaded = time.perf_counter()
+print(json.dumps({
+    "create_ms": (ready - start) * 1000,
+    "first_request_ms": (loaded - ready) * 1000,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def probe(profile, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE, profile]
+    # without the caller's DATABASE_URL: every run starts from the same config
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    result = subprocess.run(command, cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def top_imports(stderr, n):
+    own = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        own.append((int(self_us), name.strip()))
+    return [{"module": name, "self_ms": round(us / 1000, 1)} for us, name in sorted(own, reverse=True)[:n]]
+
+
+def measure(profile, runs, top):
+    samples = [probe(profile)[0] for _ in range(runs)]
+    create = [s["create_ms"] for s in samples]
+    result = {
+        "profile": profile,
+        "runs": runs,
+        "median_ms": round(statistics.median(create), 1),
+        "best_ms": round(min(create), 1),
+        "first_request_ms": round(statistics.median(s["first_request_ms"] for s in samples), 1),
+        "modules": len(samples[-1]["modules"]),
+    }
+    if profile != "full":
+        result["forbidden"] = [
+            name for name in samples[-1]["modules"]
+            if any(name == f or name.startswith(f + ".") for f in SERVING_FORBIDDEN)
+        ]
+    if top:
+        result["top_imports"] = top_imports(probe(profile, importtime=True)[1], top)
+    return result
+
+
+def check(result, args, baseline):
+    failures = []
+    if result.get("forbidden"):
+        failures.append(f"{result['profile']} profile imported {', '.join(result['forbidden'])}")
+    if args.budget_ms and result["median_ms"] > args.budget_ms:
+        failures.append(f"{result['profile']}: {result['median_ms']}ms is over the {args.budget_ms}ms budget")
+    previous = baseline.get(result["profile"])
+    if previous:
+        limit = previous["median_ms"] * (1 + args.tolerance) + args.slack_ms
+        if result["median_ms"] > limit:
+            failures.append(
+                f"{result['profile']}: {result['median_ms']}ms is more than {args.tolerance:.0%} "
+                f"(+{args.slack_ms}ms) over the baseline {previous['median_ms']}ms"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=["full", "serving", "preloaded"],
+                        default=["full", "serving", "preloaded"])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest imports")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="fail when a median is over this, 0 for no budget")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="report from --output to compare against, \"\" for none")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline")
+    parser.add_argument("--slack-ms", type=float, default=25,
+                        help="allowed on top of --tolerance, so a few ms of noise never fails the fast profiles")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r["profile"]: r for r in json.load(f)["results"]}
+
+    results, failures = [], []
+    for profile in args.profiles:
+        result = measure(profile, args.runs, args.top)
+        results.append(result)
+        failures.extend(check(result, args, baseline))
+        print(json.dumps(result), flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
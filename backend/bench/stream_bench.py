@@ -0,0 +1,102 @@
+"""
+Streamed list responses (app/streaming.py): memory and time to first byte.
+
+    python bench/stream_bench.py                         # 2k / 10k / 50k posts
+    python bench/stream_bench.py --sizes 100000 --chunk-size 1000
+
+For each size, builds a throwaway SQLite database and fetches the whole
+feed (GET /api/posts?view=summary) as one streamed response, reading the
+body as it is produced. Each size runs with the default chunk size and
+with a single chunk as big as the result, which is what building the whole
+list before writing it costs. Prints one JSON object per run with the
+Python heap peak (tracemalloc) during the request, time to first byte,
+total time and body size; the peak should stay flat across sizes for the
+chunked runs and grow with the size for the single-chunk ones.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def populate(db, posts, batch=10000):
+    db.session.execute(db.text(
+        "INSERT INTO user (id, name, email, password) VALUES (1, 'bench', 'bench@example.com', 'x')"
+    ))
+    post_insert = db.text(
+        "INSERT INTO post (id, title, content, created_at, author_id, upvote_count, downvote_count, score) "
+        "VALUES (:id, :title, :content, CURRENT_TIMESTAMP, 1, 0, 0, 0)"
+    )
+    rows = [{"id": i, "title": f"Post {i}", "content": "lorem ipsum " * 20} for i in range(1, posts + 1)]
+    for start in range(0, len(rows), batch):
+        db.session.execute(post_insert, rows[start:start + batch])
+    db.session.commit()
+
+
+def fetch(client, accept):
+    tracemalloc.start()
+    start = time.perf_counter()
+    res = client.get("/api/posts", query_string={"view": "summary", "stream": 1},
+                     headers={"Accept": accept}, buffered=False)
+    first_byte = None
+    size = 0
+    for part in res.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(part)
+    total = time.perf_counter() - start
+    res.close()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "peak_mb": round(peak / 1e6, 2),
+        "first_byte_ms": round(first_byte * 1000, 2),
+        "total_ms": round(total * 1000, 1),
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db
+
+    for posts in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+            Config.CACHE_BACKEND = "null"
+            Config.STREAM_MAX_ROWS = posts
+            app = create_app()
+            with app.app_context():
+                db.create_all()
+                populate(db, posts)
+
+            client = app.test_client()
+            fetch(client, "application/json")  # warm up
+            for chunk_size in (args.chunk_size, posts):
+                app.config["STREAM_CHUNK_SIZE"] = chunk_size
+                for accept in ("application/json", "application/x-ndjson"):
+                    print(json.dumps({
+                        "posts": posts,
+                        "chunk_size": chunk_size,
+                        "format": accept.split("/")[1],
+                        **fetch(client, accept),
+                    }), flush=True)
+
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# The master imports the app's modules once (app.serving.preload) and the
+# workers fork with them already loaded and shared copy-on-write; each
+# worker then imports wsgi.py, which only has to build its app. preload_app
+# stays off: a preloaded app would open its vote buffer log and start its
+# threads in the master, which the workers cannot inherit.
+#
+# Trade-off: preload() imports every blueprint module, admin included, so
+# the serving profile's deferred blueprint imports save nothing in these
+# workers. What they save instead is all of the import time: a forked
+# worker builds its app in a few ms instead of the serving profile's
+# ~0.5s (bench/startup_baseline.json, "preloaded" vs "serving"), at the
+# cost of the master's own start and of the admin modules staying in
+# memory in every worker. GUNICORN_PRELOAD=0 turns it off (e.g. with
+# --reload, where the master's copy would go stale), leaving each worker
+# to import on its own with the blueprints deferred to its first request.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.serving import preload  # noqa: E402
+
+if os.getenv("GUNICORN_PRELOAD", "1") == "1":
+    preload()
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# event streams hold a thread for up to EVENTS_MAX_STREAM_SECONDS
+timeout = 30
+graceful_timeout = 10
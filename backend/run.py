@@ -1,6 +1,8 @@
 from app import create_app
+from app.ranking import start_hot_refresher
 
 app = create_app()
+start_hot_refresher(app)
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,104 @@
+import os
+
+# before app.config reads them: an in-memory database, no response cache
+# (every request below really queries), inline password hashing
+os.environ.update({
+    "DATABASE_URL": "sqlite://",
+    "CACHE_BACKEND": "null",
+    "PASSWORD_HASH_WORKERS": "0",
+    "PASSWORD_HASH_COST": "4",
+    "VOTE_BUFFER_ENABLED": "0",
+    "INSTRUMENTATION_ENABLED": "0",
+})
+
+import pytest
+from sqlalchemy import func, select
+
+from app import create_app
+from app.config import Config
+from app.extensions import db, cache, hasher, events, instrumentation, vote_buffer, replicas, purge_jobs
+from app.models import Comment, Post, User
+from app.seed import SEED_PASSWORD, seed_dataset
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        seed_dataset(users=12, posts=60, votes=400, comments=300, seed=7)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_app(app, monkeypatch):
+    """
+       make_app(seed=True, **config) builds a separate app on its own
+       in-memory database, with Config overrides (e.g. CACHE_BACKEND="memory"),
+       for tests that write or need the cache or the vote buffer. The shared
+       extension objects go back to the session app afterwards, db's
+       per-bind metadata included (a replica or reader bind would otherwise
+       be created on every later app).
+    """
+    extensions = (cache, hasher, events, instrumentation, vote_buffer, replicas, purge_jobs)
+    saved = [(ext, dict(vars(ext))) for ext in extensions]
+    metadatas = dict(db.metadatas)
+
+    def make(seed=True, **config):
+        for name, value in config.items():
+            monkeypatch.setattr(Config, name, value, raising=False)
+        new_app = create_app()
+        new_app.config["TESTING"] = True
+        with new_app.app_context():
+            db.create_all()
+            if seed:
+                seed_dataset(users=8, posts=30, votes=150, comments=80, seed=11)
+        return new_app
+
+    yield make
+    vote_buffer.close()
+    hasher.shutdown()
+    for ext, state in saved:
+        vars(ext).clear()
+        vars(ext).update(state)
+    db.metadatas.clear()
+    db.metadatas.update(metadatas)
+
+
+@pytest.fixture
+def login():
+    """login(client, user_id) returns Bearer headers for seeded user `user_id`."""
+    def login(client, user_id):
+        response = client.post("/api/auth/login", json={"email": f"user{user_id}@example.com", "password": SEED_PASSWORD})
+        return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+    return login
+
+
+@pytest.fixture(scope="session")
+def auth_headers(app):
+    """Logged in as the member with the most posts, so /me/posts pages fill up."""
+    with app.app_context():
+        email = db.session.scalar(
+            select(User.email)
+            .join(Post, Post.author_id == User.id)
+            .group_by(User.id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+    response = app.test_client().post("/api/auth/login", json={"email": email, "password": SEED_PASSWORD})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def busy_post_id(app):
+    """The post with the most comments."""
+    with app.app_context():
+        return db.session.scalar(
+            select(Comment.post_id).group_by(Comment.post_id).order_by(func.count().desc()).limit(1)
+        )
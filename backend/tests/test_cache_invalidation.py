@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import select
+
+from app.cache import FEED_SORTS, SEARCH_SORTS
+from app.extensions import db
+from app.models import Post
+
+# Every change a post's readers can see must reach every cached feed page
+# showing it: warm the cache on each sort (global, author, search), change
+# the post, then read each page again.
+
+
+@pytest.fixture
+def cached_app(make_app):
+    return make_app(CACHE_BACKEND="memory")
+
+
+@pytest.fixture
+def target(cached_app):
+    """(post_id, author_id, a word of its title) for a post with a non-admin author."""
+    with cached_app.app_context():
+        post = db.session.scalars(select(Post).where(Post.author_id != 1).order_by(Post.id)).first()
+        word = max(post.title.split(), key=len)
+        return post.id, post.author_id, word
+
+
+def feed_urls(author_id, keyword, view="full"):
+    urls = [f"/api/posts?sort={sort}&limit=50&view={view}" for sort in FEED_SORTS]
+    urls += [f"/api/posts?sort={sort}&author_id={author_id}&limit=50&view={view}" for sort in FEED_SORTS]
+    urls += [f"/api/posts?sort={sort}&keyword={keyword}&limit=50&view={view}" for sort in SEARCH_SORTS]
+    return urls
+
+
+def find(client, url, post_id, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, url
+    posts = {p["id"]: p for p in response.get_json()["posts"]}
+    assert post_id in posts, url
+    return posts[post_id], response.headers["ETag"]
+
+
+def warm(client, urls, post_id):
+    """Reads every page twice (the second from the cache); returns {url: (post, etag)}."""
+    for url in urls:
+        find(client, url, post_id)
+    return {url: find(client, url, post_id) for url in urls}
+
+
+def test_edit_reaches_every_cached_sort(cached_app, target, login):
+    post_id, author_id, word = target
+    client = cached_app.test_client()
+    urls = feed_urls(author_id, word)
+    before = warm(client, urls, post_id)
+
+    response = client.patch(f"/api/posts/{post_id}", json={"title": f"{word} edited"}, headers=login(client, author_id))
+    assert response.status_code == 200
+
+    for url in urls:
+        post, etag = find(client, url, post_id, etag=before[url][1])
+        assert post["title"] == f"{word} edited", url
+        assert etag != before[url][1], url
+
+
+def test_vote_reaches_every_cached_sort(cached_app, target, login):
+    post_id, author_id, word = target
+    client = cached_app.test_client()
+    urls = feed_urls(author_id, word)
+    before = warm(client, urls, post_id)
+
+    # whatever the voter's earlier vote, an upvote (or its removal) moves the score
+    response = client.post("/api/votes", json={"post_id": post_id, "vote_type": "up"}, headers=login(client, 1))
+    assert response.status_code == 200
+
+    for url in urls:
+        post, etag = find(client, url, post_id, etag=before[url][1])
+        assert post["score"] != before[url][0]["score"], url
+        assert etag != before[url][1], url
+
+
+@pytest.mark.parametrize("view", ["full", "summary"])
+def test_comments_reach_every_cached_sort(cached_app, target, login, view):
+    post_id, author_id, word = target
+    client = cached_app.test_client()
+    headers = login(client, author_id)
+    urls = feed_urls(author_id, word, view=view)
+
+    def comments_of(post):
+        return post["comment_count"] if view == "summary" else len(post["comments"])
+
+    before = warm(client, urls, post_id)
+    response = client.post("/api/comments", json={"post_id": post_id, "content": "fresh comment"}, headers=headers)
+    assert response.status_code == 201
+    comment_id = response.get_json()["id"]
+    added = {}
+    for url in urls:
+        post, etag = find(client, url, post_id, etag=before[url][1])
+        assert comments_of(post) == comments_of(before[url][0]) + 1, url
+        if view == "full":
+            assert comment_id in [c["id"] for c in post["comments"]], url
+        added[url] = (post, etag)
+
+    assert client.delete(f"/api/comments/{comment_id}", headers=headers).status_code == 200
+    for url in urls:
+        post, _ = find(client, url, post_id, etag=added[url][1])
+        assert comments_of(post) == comments_of(before[url][0]), url
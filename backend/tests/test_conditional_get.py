@@ -0,0 +1,121 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+from werkzeug.http import http_date
+
+from app import versions
+from app.extensions import db
+from app.models import Post, User
+
+
+@pytest.fixture
+def setup(make_app, login):
+    app = make_app(CACHE_BACKEND="memory")
+    client = app.test_client()
+    with app.app_context():
+        post_id, author_id = db.session.execute(
+            select(Post.id, Post.author_id).where(Post.author_id != 3).limit(1)
+        ).one()
+        # seeding just touched them; Last-Modified is only sent for past seconds
+        db.session.execute(update(Post).values(updated_at=Post.created_at))
+        db.session.execute(update(User).values(updated_at=User.created_at))
+        db.session.commit()
+    return client, post_id, login(client, author_id), login(client, 3)
+
+
+def get(client, url, headers=None, etag=None, since=None):
+    headers = dict(headers or {})
+    if etag:
+        headers["If-None-Match"] = etag
+    if since:
+        headers["If-Modified-Since"] = since
+    return client.get(url, headers=headers)
+
+
+def assert_revalidates(client, url, headers=None, by_date=True):
+    """The page's validators give a 304 as long as nothing changed; returns the first response."""
+    first = get(client, url, headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = get(client, url, headers, etag=etag)
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+    assert get(client, url, headers, etag='W/"something-else"').status_code == 200
+    if by_date:
+        assert get(client, url, headers, since=first.headers["Last-Modified"]).status_code == 304
+        # If-None-Match wins over If-Modified-Since
+        assert get(client, url, headers, etag='W/"something-else"', since=first.headers["Last-Modified"]).status_code == 200
+    return first
+
+
+def test_single_post(setup):
+    client, post_id, author, reader = setup
+    url = f"/api/posts/{post_id}"
+    anonymous = assert_revalidates(client, url)
+    own = assert_revalidates(client, url, reader)
+    # the caller's vote is part of the response, so of its tag
+    assert own.headers["ETag"] != anonymous.headers["ETag"]
+
+    client.post("/api/votes", json={"post_id": post_id, "vote_type": "down"}, headers=reader)
+    assert get(client, url, reader, etag=own.headers["ETag"]).status_code == 200
+
+    assert client.patch(url, json={"title": "a new title"}, headers=author).status_code == 200
+    response = get(client, url, etag=anonymous.headers["ETag"])
+    assert response.status_code == 200
+    assert response.get_json()["title"] == "a new title"
+    assert get(client, url, since=anonymous.headers["Last-Modified"]).status_code == 200
+
+
+@pytest.mark.parametrize("sort", ["new", "top", "hot"])
+def test_feed(setup, sort):
+    client, post_id, author, _ = setup
+    url = f"/api/posts?sort={sort}&limit=50"
+    first = assert_revalidates(client, url, by_date=False)
+
+    assert client.patch(f"/api/posts/{post_id}", json={"content": "changed"}, headers=author).status_code == 200
+    assert get(client, url, etag=first.headers["ETag"]).status_code == 200
+
+
+def test_comments(setup):
+    client, post_id, author, reader = setup
+    url = f"/api/comments?post_id={post_id}&limit=100"
+    first = assert_revalidates(client, url, reader)
+
+    response = client.post("/api/comments", json={"post_id": post_id, "content": "new"}, headers=author)
+    assert response.status_code == 201
+    response = get(client, url, reader, etag=first.headers["ETag"])
+    assert response.status_code == 200
+    assert len(response.get_json()["comments"]) == len(first.get_json()["comments"]) + 1
+
+
+def test_me(setup):
+    client, _, _, reader = setup
+    first = assert_revalidates(client, "/api/auth/me", reader)
+
+    assert client.patch("/api/auth/update", json={"name": "Renamed"}, headers=reader).status_code == 200
+    assert get(client, "/api/auth/me", reader, etag=first.headers["ETag"]).status_code == 200
+    assert get(client, "/api/auth/me", reader, since=first.headers["Last-Modified"]).status_code == 200
+
+
+def test_no_last_modified_within_the_changing_second(setup, monkeypatch):
+    client, post_id, author, _ = setup
+    url = f"/api/posts/{post_id}"
+    now = datetime.now(UTC).replace(microsecond=500000)
+    monkeypatch.setattr(versions, "_utcnow", lambda: now)
+
+    assert client.patch(url, json={"title": "first"}, headers=author).status_code == 200
+    # a second edit may follow in the same second: the date cannot tell them apart
+    response = get(client, url)
+    assert "Last-Modified" not in response.headers
+    assert client.patch(url, json={"title": "second"}, headers=author).status_code == 200
+    assert get(client, url, etag=response.headers["ETag"]).get_json()["title"] == "second"
+
+    monkeypatch.setattr(versions, "_utcnow", lambda: now + timedelta(seconds=1))
+    response = get(client, url)
+    assert response.headers["Last-Modified"] == http_date(now.replace(microsecond=0))
+    assert get(client, url, since=response.headers["Last-Modified"]).status_code == 304
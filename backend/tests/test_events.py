@@ -0,0 +1,23 @@
+from app.extensions import events
+
+
+def test_streams_past_the_limit_get_503_with_retry_after(make_app):
+    app = make_app(EVENTS_MAX_STREAMS=2)
+    client = app.test_client()
+
+    open_streams = [client.get("/api/posts/1/events", buffered=False) for _ in range(2)]
+    assert [r.status_code for r in open_streams] == [200, 200]
+    assert events.subscriber_count() == 2
+
+    refused = client.get("/api/posts/2/events", buffered=False)
+    assert refused.status_code == 503
+    assert int(refused.headers["Retry-After"]) > 0
+
+    # a closed stream frees its slot
+    open_streams.pop().close()
+    assert events.subscriber_count() == 1
+    again = client.get("/api/posts/2/events", buffered=False)
+    assert again.status_code == 200
+    for response in open_streams + [again]:
+        response.close()
+    assert events.subscriber_count() == 0
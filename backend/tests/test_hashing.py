@@ -0,0 +1,57 @@
+from app.extensions import db, hasher
+from app.models import User
+from app.seed import SEED_PASSWORD
+
+
+def login_response(client, user_id, password=SEED_PASSWORD):
+    return client.post("/api/auth/login", json={"email": f"user{user_id}@example.com", "password": password})
+
+
+def stored_hash(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).password
+
+
+def test_full_hashing_queue_answers_429(make_app):
+    app = make_app(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    client = app.test_client()
+
+    # another request holds the only slot
+    assert hasher._slots.acquire(blocking=False)
+    try:
+        response = login_response(client, 2)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        response = client.post("/api/auth/register", json={"name": "n", "email": "new@example.com", "password": "pw123456"})
+        assert response.status_code == 429
+    finally:
+        hasher._slots.release()
+
+    # once it is free the pool takes the work
+    assert login_response(client, 2).status_code == 200
+
+
+def test_login_rehashes_after_a_cost_or_algorithm_change(make_app, login):
+    app = make_app()
+    client = app.test_client()
+    assert stored_hash(app, 2).startswith("$2b$04$")
+    headers = login(client, 2)
+
+    app.config["PASSWORD_HASH_COST"] = 5
+    hasher.init_app(app)
+    assert login_response(client, 2).status_code == 200
+    assert stored_hash(app, 2).startswith("$2b$05$")
+
+    app.config.update(PASSWORD_HASH_ALGORITHM="pbkdf2", PASSWORD_HASH_COST=1000)
+    hasher.init_app(app)
+    assert login_response(client, 2, "wrong").status_code == 401
+    assert stored_hash(app, 2).startswith("$2b$05$")
+    assert login_response(client, 2).status_code == 200
+    rehashed = stored_hash(app, 2)
+    assert rehashed.startswith("pbkdf2:sha256:1000$")
+
+    # already current: left alone, and the old password still works
+    assert login_response(client, 2).status_code == 200
+    assert stored_hash(app, 2) == rehashed
+    # a rehash is not a password change, earlier tokens keep working
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
@@ -0,0 +1,53 @@
+from app.extensions import cache
+from app.seed import SEED_PASSWORD
+
+# The identity cache gets a long TTL here, so anything below that sees a
+# change sees it because the change invalidated the entry.
+
+
+def test_password_change_revokes_earlier_tokens(make_app, login):
+    app = make_app(CACHE_BACKEND="memory", IDENTITY_CACHE_TTL=3600)
+    client = app.test_client()
+    laptop, phone = login(client, 3), login(client, 3)
+    assert client.get("/api/auth/me", headers=phone).status_code == 200
+
+    response = client.patch("/api/auth/change-password", headers=laptop,
+                            json={"old_password": SEED_PASSWORD, "new_password": "hunter22"})
+    assert response.status_code == 200
+    fresh = {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+    assert client.get("/api/auth/me", headers=phone).status_code == 401
+    assert client.get("/api/auth/me", headers=laptop).status_code == 401
+    assert client.get("/api/auth/me", headers=fresh).status_code == 200
+
+    relogin = client.post("/api/auth/login", json={"email": "user3@example.com", "password": "hunter22"})
+    assert relogin.status_code == 200
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {relogin.get_json()['access_token']}"}).status_code == 200
+
+
+def test_deleted_user_token_is_revoked(make_app, login):
+    app = make_app(CACHE_BACKEND="memory", IDENTITY_CACHE_TTL=3600)
+    client = app.test_client()
+    headers = login(client, 4)
+    assert client.post("/api/posts", json={"title": "still here", "content": "hi"}, headers=headers).status_code == 201
+    with app.app_context():
+        assert cache.get("identity:4") is not None
+
+    assert client.delete("/api/admin/users/4", headers=login(client, 1)).status_code == 200
+
+    assert client.post("/api/posts", json={"title": "gone", "content": "hi"}, headers=headers).status_code == 401
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+def test_ban_and_role_changes_apply_to_cached_identities(make_app, login):
+    app = make_app(CACHE_BACKEND="memory", IDENTITY_CACHE_TTL=3600)
+    client = app.test_client()
+    admin, member = login(client, 1), login(client, 5)
+    assert client.get("/api/admin/users", headers=member).status_code == 403
+
+    assert client.patch("/api/admin/users/5/set-admin", json={"is_admin": True}, headers=admin).status_code == 200
+    assert client.get("/api/admin/users", headers=member).status_code == 200
+
+    assert client.patch("/api/admin/users/5/ban", headers=admin).status_code == 200
+    response = client.post("/api/posts", json={"title": "banned", "content": "hi"}, headers=member)
+    assert response.status_code == 403
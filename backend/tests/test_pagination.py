@@ -0,0 +1,80 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models import Post
+from app.pagination import decode_cursor, encode_cursor
+
+SORTS = ["sort=recent", "sort=top", "sort=hot", "sort=relevance&keyword=the"]
+
+
+def walk(client, query, limit=7):
+    """Every page of /api/posts?<query>; returns the post ids in order."""
+    ids, cursor = [], None
+    while True:
+        url = f"/api/posts?{query}&limit={limit}&view=summary" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        ids.extend(p["id"] for p in page["posts"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_cursor_round_trip():
+    when = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(when, 3.25, 42), 3) == [when, 3.25, 42]
+    assert decode_cursor(encode_cursor(7, kind="hot"), 1, kind="hot") == [7]
+
+
+@pytest.mark.parametrize("token, size, kind", [
+    ("not a cursor!", 2, None),
+    (encode_cursor(1, 2), 3, None),                      # wrong number of parts
+    (encode_cursor(1.5, 2, kind="hot"), 2, "relevance"),  # another order's cursor
+    (encode_cursor(1.5, 2), 2, "hot"),                   # untagged
+    (base64.urlsafe_b64encode(json.dumps([{"dt": 5}, 1]).encode()).decode(), 2, None),
+    (base64.urlsafe_b64encode(json.dumps({"a": 1}).encode()).decode(), 1, None),
+])
+def test_decode_rejects_bad_cursors(token, size, kind):
+    with pytest.raises(ValueError):
+        decode_cursor(token, size, kind=kind)
+
+
+@pytest.mark.parametrize("query", SORTS)
+def test_pages_cover_the_feed_once_in_order(client, query):
+    everything = client.get(f"/api/posts?{query}&limit=100&view=summary").get_json()["posts"]
+    assert walk(client, query) == [p["id"] for p in everything]
+
+
+@pytest.mark.parametrize("query", SORTS[:3])
+def test_ties_on_the_sort_key_break_on_id(make_app, query):
+    app = make_app()
+    with app.app_context():
+        # every post ties on score, hot score and creation time
+        db.session.execute(update(Post).values(
+            score=5, hot_score=1.0, created_at=datetime(2024, 1, 1), hot_dirty=False
+        ))
+        db.session.commit()
+        ids = db.session.scalars(select(Post.id).order_by(Post.id.desc())).all()
+    assert walk(app.test_client(), query, limit=4) == ids
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "e30", encode_cursor(1, 2, 3, 4)])
+def test_malformed_cursor_is_a_400(client, cursor):
+    response = client.get(f"/api/posts?cursor={cursor}")
+    assert response.status_code == 400
+    assert response.get_json()["msg"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("issued_by", SORTS)
+@pytest.mark.parametrize("used_with", SORTS)
+def test_cursor_reused_across_sorts_is_a_400(client, issued_by, used_with):
+    cursor = client.get(f"/api/posts?{issued_by}&limit=3").get_json()["next_cursor"]
+    assert cursor is not None
+    response = client.get(f"/api/posts?{used_with}&limit=3&cursor={cursor}")
+    assert response.status_code == (200 if issued_by == used_with else 400)
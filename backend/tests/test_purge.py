@@ -0,0 +1,131 @@
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.extensions import db, purge_jobs
+from app.models import Comment, Post, SiteStats, User, Vote
+from app.profiles import rebuild_user_counters
+from app.purge import purge_user
+from app.votes import find_drifted_posts
+
+# Deletes are set-based and cascade in the database; every denormalized
+# counter they move must still match the base tables afterwards.
+
+PURGED = 5
+
+
+def assert_counters_consistent(app):
+    with app.app_context():
+        def count(model, *criteria):
+            return db.session.scalar(select(func.count()).select_from(model).where(*criteria))
+
+        stats = db.session.get(SiteStats, 1)
+        assert (
+            stats.total_users, stats.banned_users, stats.active_admins,
+            stats.total_posts, stats.total_comments, stats.total_votes
+        ) == (
+            count(User), count(User, User.is_banned.is_(True)), count(User, User.is_admin.is_(True)),
+            count(Post), count(Comment), count(Vote)
+        )
+        assert find_drifted_posts() == []
+        assert rebuild_user_counters() == 0
+        db.session.rollback()
+
+        comments = db.session.execute(
+            select(Comment.id, Comment.parent_id, Comment.path, Comment.reply_count, Comment.descendant_count)
+        ).all()
+        paths = [c.path for c in comments]
+        for c in comments:
+            assert c.reply_count == sum(1 for other in comments if other.parent_id == c.id), c
+            assert c.descendant_count == sum(1 for p in paths if p != c.path and p.startswith(c.path)), c
+
+        # nothing left pointing at a deleted row
+        assert count(Vote, ~Vote.user_id.in_(select(User.id))) == 0
+        assert count(Vote, ~Vote.post_id.in_(select(Post.id))) == 0
+        assert count(Comment, ~Comment.author_id.in_(select(User.id))) == 0
+        assert count(Comment, ~Comment.post_id.in_(select(Post.id))) == 0
+
+
+@pytest.fixture
+def purge_app(make_app, login):
+    """
+       A seeded app where user PURGED is an admin, replied inside other
+       users' threads and has replies from others under their comments.
+    """
+    app = make_app(CACHE_BACKEND="memory")
+    client = app.test_client()
+    admin, purged, other = login(client, 1), login(client, PURGED), login(client, 2)
+    assert client.patch(f"/api/admin/users/{PURGED}/set-admin", json={"is_admin": True}, headers=admin).status_code == 200
+
+    with app.app_context():
+        foreign = db.session.execute(
+            select(Comment.id, Comment.post_id).where(Comment.author_id != PURGED).limit(3)
+        ).all()
+        own_post = db.session.scalar(select(Post.id).where(Post.author_id == PURGED).limit(1))
+    for comment_id, post_id in foreign:
+        response = client.post("/api/comments", headers=purged,
+                               json={"post_id": post_id, "parent_id": comment_id, "content": "reply"})
+        assert response.status_code == 201
+        # someone answers the purged user's reply, and that answer gets a reply too
+        response = client.post("/api/comments", headers=other,
+                               json={"post_id": post_id, "parent_id": response.get_json()["id"], "content": "answer"})
+        client.post("/api/comments", headers=purged,
+                    json={"post_id": post_id, "parent_id": response.get_json()["id"], "content": "again"})
+    for user_id in (2, 3):
+        client.post("/api/votes", json={"post_id": own_post, "vote_type": "up"}, headers=login(client, user_id))
+    assert_counters_consistent(app)
+    return app, client, admin
+
+
+def assert_purged(app, removed):
+    with app.app_context():
+        assert db.session.get(User, PURGED) is None
+    assert removed["votes"] and removed["comments"] and removed["posts"]
+    assert_counters_consistent(app)
+
+
+@pytest.mark.parametrize("chunk_size", [3, 500])
+def test_purge_in_chunks(purge_app, chunk_size):
+    app, _, _ = purge_app
+    with app.app_context():
+        removed = purge_user(PURGED, chunk_size=chunk_size)
+    assert_purged(app, removed)
+
+
+def test_admin_delete_inline(purge_app):
+    app, client, admin = purge_app
+    response = client.delete(f"/api/admin/users/{PURGED}", headers=admin)
+    assert response.status_code == 200
+    assert_purged(app, response.get_json()["removed"])
+
+
+def test_admin_delete_in_the_background(purge_app, monkeypatch):
+    app, client, admin = purge_app
+    monkeypatch.setattr(purge_jobs, "sync_max_rows", 0)
+    monkeypatch.setattr(purge_jobs, "chunk_size", 10)
+    response = client.delete(f"/api/admin/users/{PURGED}", headers=admin)
+    assert response.status_code == 202
+
+    deadline = time.monotonic() + 10
+    while purge_jobs.status(PURGED)["state"] == "running":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    job = client.get(f"/api/admin/users/{PURGED}/purge", headers=admin).get_json()
+    assert job["state"] == "done"
+    assert_purged(app, job["removed"])
+
+
+def test_post_and_comment_deletes(purge_app, login):
+    app, client, admin = purge_app
+    with app.app_context():
+        post_id = db.session.scalar(
+            select(Comment.post_id).group_by(Comment.post_id).order_by(func.count().desc()).limit(1)
+        )
+        root = db.session.scalar(
+            select(Comment.id).where(Comment.parent_id.is_(None), Comment.descendant_count > 0).limit(1)
+        )
+    assert client.delete(f"/api/comments/{root}", headers=admin).status_code == 200
+    assert_counters_consistent(app)
+    assert client.delete(f"/api/posts/{post_id}", headers=admin).status_code == 200
+    assert_counters_consistent(app)
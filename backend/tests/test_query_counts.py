@@ -0,0 +1,71 @@
+import pytest
+
+from app.query_counter import assert_max_queries, count_queries
+
+# Statement ceilings of the hot read paths, with the response cache off.
+# Each path batch-loads what it serializes (app/serializers.py), so its
+# count does not grow with the page: a relationship touched per row (an
+# N+1) fails here with the offending statements listed.
+
+FEED_VIEWS = [
+    "view=full",
+    "view=summary",
+    "fields=id,title,comment_count",
+    "fields=id,title,comments",
+    "sort=top",
+    "sort=hot",
+    "keyword=the",
+]
+
+
+def _get(client, app, url, limit, headers=None):
+    with app.app_context():
+        with count_queries() as counter:
+            separator = "&" if "?" in url else "?"
+            response = client.get(f"{url}{separator}limit={limit}", headers=headers or {})
+    assert response.status_code == 200, response.get_json()
+    return counter
+
+
+@pytest.mark.parametrize("params", FEED_VIEWS)
+def test_feed(app, client, auth_headers, params):
+    with app.app_context(), assert_max_queries(3):
+        assert client.get(f"/api/posts/?{params}&limit=25", headers=auth_headers).status_code == 200
+
+
+@pytest.mark.parametrize("params", FEED_VIEWS)
+def test_feed_does_not_grow_with_the_page(app, client, params):
+    small = _get(client, app, f"/api/posts/?{params}", 5)
+    large = _get(client, app, f"/api/posts/?{params}", 25)
+    assert large.count <= small.count, large.statements
+
+
+def test_single_post(app, client, busy_post_id):
+    with app.app_context(), assert_max_queries(3):
+        assert client.get(f"/api/posts/{busy_post_id}").status_code == 200
+
+
+def test_single_post_with_own_vote(app, client, auth_headers, busy_post_id):
+    with app.app_context(), assert_max_queries(4):
+        assert client.get(f"/api/posts/{busy_post_id}", headers=auth_headers).status_code == 200
+
+
+def test_me(app, client, auth_headers):
+    with app.app_context(), assert_max_queries(1):
+        assert client.get("/api/auth/me", headers=auth_headers).status_code == 200
+
+
+def test_my_posts(app, client, auth_headers):
+    small = _get(client, app, "/api/auth/me/posts", 2, auth_headers)
+    large = _get(client, app, "/api/auth/me/posts", 25, auth_headers)
+    # the user, the page, its comment counts
+    assert large.count <= 3, large.statements
+    assert large.count <= small.count, large.statements
+
+
+def test_comment_thread(app, client, auth_headers, busy_post_id):
+    url = f"/api/comments?post_id={busy_post_id}"
+    small = _get(client, app, url, 5, auth_headers)
+    large = _get(client, app, url, 50, auth_headers)
+    assert large.count <= 2, large.statements
+    assert large.count <= small.count, large.statements
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app import ranking
+from app.extensions import db
+from app.leases import acquire_lease, release_lease
+from app.models import Post, Vote
+from app.ranking import HotRankRefresher, _utcnow, hot_rank, refresh_hot_scores
+
+
+def test_lease_has_one_holder_until_it_expires(make_app):
+    app = make_app(seed=False)
+    with app.app_context():
+        assert acquire_lease("job", "a", ttl=60)
+        assert acquire_lease("job", "a", ttl=60)  # renewal
+        assert not acquire_lease("job", "b", ttl=60)
+
+        # a holder that stops renewing loses it
+        assert acquire_lease("job", "a", ttl=-1)
+        assert acquire_lease("job", "b", ttl=60)
+        assert not acquire_lease("job", "a", ttl=60)
+
+        release_lease("job", "b")
+        assert acquire_lease("job", "a", ttl=60)
+
+
+def test_only_the_lease_holder_refreshes(make_app):
+    app = make_app()
+    workers = [HotRankRefresher(app, interval=60) for _ in range(3)]
+    for i, worker in enumerate(workers):
+        worker.holder = f"worker-{i}"
+
+    with app.app_context():
+        db.session.execute(update(Post).values(hot_dirty=True))
+        db.session.commit()
+        outcomes = [worker.run_once() for worker in workers]
+        dirty = db.session.scalar(select(Post.id).where(Post.hot_dirty.is_(True)).limit(1))
+
+    assert outcomes[0] > 0
+    assert outcomes[1:] == [None, None]
+    assert dirty is None
+
+
+# ------------------------
+# Hot score refresh (user-006)
+# ------------------------
+def hot_feed(client):
+    return [p["id"] for p in client.get("/api/posts?sort=hot&limit=100").get_json()["posts"]]
+
+
+def test_vote_marks_post_dirty_and_refresh_reorders_hot_feed(make_app, login):
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        # the newest post, from a user other than the voters below
+        post_id = db.session.scalar(select(Post.id).order_by(Post.created_at.desc()).limit(1))
+        # a repeated vote toggles off, so only users who have not upvoted it yet
+        upvoted = set(db.session.scalars(select(Vote.user_id).where(Vote.post_id == post_id, Vote.value == 1)))
+        db.session.execute(update(Post).values(hot_dirty=False))
+        db.session.commit()
+    for uid in set(range(1, 9)) - upvoted:
+        response = client.post("/api/votes", json={"post_id": post_id, "vote_type": "up"}, headers=login(client, uid))
+        assert response.status_code == 200
+
+    with app.app_context():
+        assert db.session.scalar(select(Post.hot_dirty).where(Post.id == post_id))
+        assert refresh_hot_scores() >= 1
+        assert not db.session.scalar(select(Post.id).where(Post.hot_dirty.is_(True)).limit(1))
+        rows = db.session.execute(select(Post.id, Post.score, Post.created_at, Post.hot_score)).all()
+
+    now = _utcnow()
+    expected = sorted(rows, key=lambda r: (hot_rank(r.score, r.created_at, now)[0], r.id), reverse=True)
+    for row in rows:
+        assert row.hot_score == pytest.approx(hot_rank(row.score, row.created_at, now)[0])
+    assert hot_feed(client) == [r.id for r in expected]
+
+
+def test_refresh_picks_up_posts_whose_age_bucket_ended(make_app):
+    app = make_app()
+    with app.app_context():
+        post = db.session.scalars(select(Post).where(Post.score > 0).limit(1)).one()
+        db.session.execute(update(Post).where(Post.id == post.id).values(hot_score=1e9))
+        db.session.commit()
+        assert refresh_hot_scores() == 0
+
+        later = post.hot_expires_at + timedelta(seconds=1)
+        assert refresh_hot_scores(now=later) >= 1
+        db.session.refresh(post)
+        assert post.hot_score == pytest.approx(hot_rank(post.score, post.created_at, later)[0])
+        assert post.hot_expires_at > later
+
+
+def test_refresh_leaves_a_post_dirty_if_its_score_moved(make_app, monkeypatch):
+    app = make_app()
+    with app.app_context():
+        post_id = db.session.scalar(select(Post.id).limit(1))
+        db.session.execute(update(Post).values(hot_dirty=False))
+        db.session.execute(update(Post).where(Post.id == post_id).values(hot_dirty=True))
+        db.session.commit()
+
+        # a vote lands between the refresher's read and its write
+        real_rank = ranking.hot_rank
+
+        def vote_meanwhile(score, created_at, now=None):
+            db.session.execute(update(Post).where(Post.id == post_id).values(score=Post.score + 1, hot_dirty=True))
+            return real_rank(score, created_at, now)
+        monkeypatch.setattr(ranking, "hot_rank", vote_meanwhile)
+        refresh_hot_scores()
+        monkeypatch.setattr(ranking, "hot_rank", real_rank)
+
+        assert db.session.scalar(select(Post.hot_dirty).where(Post.id == post_id))
+        assert refresh_hot_scores() == 1
+        assert not db.session.scalar(select(Post.hot_dirty).where(Post.id == post_id))
@@ -0,0 +1,54 @@
+import sqlite3
+
+from sqlalchemy import select
+
+from app.extensions import db, cache, replicas
+from app.models import Post
+from app.replicas import _sticky_key
+
+
+def replicate(primary, replica):
+    """Copies the primary database file over the replica, like a file-copy replication step."""
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def test_writers_read_their_own_writes(make_app, tmp_path, login):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    app = make_app(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{primary}",
+        DB_REPLICA_URLS=f"sqlite:///{replica}",
+        DB_REPLICA_CHECK_INTERVAL=3600,
+        DB_REPLICA_STICKY_SECONDS=60,
+        CACHE_BACKEND="memory",
+    )
+    with app.app_context():
+        replicas.check()  # stamps a heartbeat
+        replicate(primary, replica)
+        assert replicas.check() == {"replica_0": 0.0}
+        post_id, author_id, title = db.session.execute(
+            select(Post.id, Post.author_id, Post.title).where(Post.author_id != 3).limit(1)
+        ).one()
+
+    client = app.test_client()
+    author, reader = login(client, author_id), login(client, 3)
+    response = client.patch(f"/api/posts/{post_id}", json={"title": "edited on the primary"}, headers=author)
+    assert response.status_code == 200
+
+    def title_seen(headers=None):
+        return client.get(f"/api/posts/{post_id}", headers=headers or {}).get_json()["title"]
+
+    # the replica has not caught up: the author reads the primary, everyone else the replica
+    assert title_seen(author) == "edited on the primary"
+    assert title_seen(reader) == title
+    assert title_seen() == title
+
+    # once the sticky window is over the author is back on the replica
+    with app.app_context():
+        cache.delete(_sticky_key(author_id))
+    assert title_seen(author) == title
+
+    replicate(primary, replica)
+    assert title_seen(reader) == "edited on the primary"
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import text
+
+from app.extensions import db
+
+
+@pytest.fixture
+def search_app(make_app, login):
+    """A seeded app plus three posts with known words, written through the API."""
+    app = make_app()
+    client = app.test_client()
+    headers = login(client, 2)
+    for title, content in [
+        ("Zephyrine gardening", "growing quolls in the allotment"),
+        ("Weekly allotment notes", "zephyrine seedlings came up"),
+        ("Unrelated", "nothing to see"),
+    ]:
+        assert client.post("/api/posts", json={"title": title, "content": content}, headers=headers).status_code == 201
+    return app, client, headers
+
+
+def titles(client, keyword, sort="relevance"):
+    response = client.get(f"/api/posts?keyword={keyword}&sort={sort}&limit=100")
+    assert response.status_code == 200
+    return [p["title"] for p in response.get_json()["posts"]]
+
+
+def test_search_matches_every_term_as_a_prefix(search_app):
+    _, client, _ = search_app
+    assert sorted(titles(client, "zephyrine")) == ["Weekly allotment notes", "Zephyrine gardening"]
+    assert sorted(titles(client, "zephyr")) == ["Weekly allotment notes", "Zephyrine gardening"]
+    assert titles(client, "zephyr quoll") == ["Zephyrine gardening"]
+    assert titles(client, "zephyr nothing") == []
+
+
+def test_title_matches_rank_above_content_matches(search_app):
+    _, client, _ = search_app
+    assert titles(client, "zephyrine") == ["Zephyrine gardening", "Weekly allotment notes"]
+    assert titles(client, "allotment") == ["Weekly allotment notes", "Zephyrine gardening"]
+
+
+def test_index_follows_edits_and_deletes(search_app):
+    app, client, headers = search_app
+    posts = client.get("/api/posts?keyword=zephyrine&limit=100").get_json()["posts"]
+    post_id = next(p["id"] for p in posts if p["title"] == "Zephyrine gardening")
+
+    client.patch(f"/api/posts/{post_id}", json={"title": "Marrow gardening", "content": "big marrows"}, headers=headers)
+    assert titles(client, "zephyrine") == ["Weekly allotment notes"]
+    assert titles(client, "quoll") == []
+    assert titles(client, "marrow") == ["Marrow gardening"]
+
+    client.delete(f"/api/posts/{post_id}", headers=headers)
+    assert titles(client, "marrow") == []
+
+
+def test_rebuild_repopulates_the_index(search_app):
+    app, client, _ = search_app
+    with app.app_context():
+        db.session.execute(text("INSERT INTO post_fts(post_fts) VALUES ('delete-all')"))
+        db.session.commit()
+    assert titles(client, "zephyrine") == []
+
+    result = app.test_cli_runner().invoke(args=["search", "rebuild"])
+    assert "Search index rebuilt (sqlite)" in result.output
+    assert titles(client, "zephyrine") == ["Zephyrine gardening", "Weekly allotment notes"]
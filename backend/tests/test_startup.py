@@ -0,0 +1,17 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+BENCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench", "startup_bench.py")
+
+
+@pytest.mark.slow
+def test_startup_stays_within_budget_and_baseline():
+    """bench/startup_bench.py against its committed baseline, with room for a slower or busier machine."""
+    result = subprocess.run(
+        [sys.executable, BENCH, "--runs", "3", "--tolerance", "1.0"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
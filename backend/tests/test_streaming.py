@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+# A streamed list is the same document as the paged response, only written
+# out chunk by chunk; small chunks here so every body spans several.
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(app, monkeypatch):
+    monkeypatch.setitem(app.config, "STREAM_CHUNK_SIZE", 7)
+
+
+@pytest.fixture
+def admin_headers(client, login):
+    return login(client, 1)
+
+
+def both(client, url, headers=None):
+    """(paged body, streamed JSON body, streamed NDJSON lines) of `url`."""
+    headers = headers or {}
+    paged = client.get(url, headers=headers)
+    assert paged.status_code == 200
+    streamed = client.get(f"{url}&stream=1", headers=headers)
+    assert streamed.status_code == 200
+    assert streamed.mimetype == "application/json"
+    assert streamed.headers["Cache-Control"] == "no-store"
+    ndjson = client.get(url, headers={**headers, "Accept": "application/x-ndjson"})
+    assert ndjson.status_code == 200
+    assert ndjson.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()]
+    return paged.get_json(), json.loads(streamed.get_data()), lines
+
+
+def assert_same(paged, streamed, lines, key):
+    assert streamed == paged
+    items = lines[:-1] if paged["next_cursor"] else lines
+    assert items == paged[key]
+    if paged["next_cursor"]:
+        assert lines[-1] == {"next_cursor": paged["next_cursor"]}
+
+
+URLS = [
+    "/api/posts?sort=new&limit={limit}",
+    "/api/posts?sort=top&limit={limit}",
+    "/api/posts?sort=hot&limit={limit}",
+    "/api/posts?sort=new&view=summary&limit={limit}",
+    "/api/posts?sort=relevance&keyword=flask&limit={limit}",
+]
+
+
+@pytest.mark.parametrize("url", URLS)
+@pytest.mark.parametrize("limit", [1, 7, 20, 100])
+def test_feed(client, url, limit):
+    paged, streamed, lines = both(client, url.format(limit=limit))
+    assert paged["posts"]
+    assert_same(paged, streamed, lines, "posts")
+
+
+def test_feed_cursor_walk(client):
+    """Following the streamed next_cursor visits the same pages as the paged one."""
+    url = "/api/posts?sort=top&limit=13"
+    cursor, pages = None, 0
+    while True:
+        page_url = url + (f"&cursor={cursor}" if cursor else "")
+        paged, streamed, lines = both(client, page_url)
+        assert_same(paged, streamed, lines, "posts")
+        cursor, pages = paged["next_cursor"], pages + 1
+        if not cursor:
+            break
+    assert pages == 5
+
+
+@pytest.mark.parametrize("limit", [5, 14, 100])
+def test_comments(client, auth_headers, busy_post_id, limit):
+    paged, streamed, lines = both(client, f"/api/comments?post_id={busy_post_id}&limit={limit}", auth_headers)
+    assert paged["comments"]
+    assert_same(paged, streamed, lines, "comments")
+
+
+@pytest.mark.parametrize("limit", [3, 12, 100])
+def test_admin_users(client, admin_headers, limit):
+    paged, streamed, lines = both(client, f"/api/admin/users?limit={limit}", admin_headers)
+    assert_same(paged, streamed, lines, "users")
@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models import Comment
+from app.threads import path_segment
+
+
+@pytest.fixture
+def thread(make_app, login):
+    """
+       A fresh post with the thread
+         a
+           b
+             c
+           d
+         e
+       posted in that order by different users: (app, client, post_id, ids, headers).
+    """
+    app = make_app(COMMENT_MAX_DEPTH=4)
+    client = app.test_client()
+    headers = {user_id: login(client, user_id) for user_id in (2, 3, 4)}
+    response = client.post("/api/posts", json={"title": "thread", "content": "replies"}, headers=headers[2])
+    assert response.status_code == 201
+    post_id = client.get("/api/posts?sort=new&limit=1").get_json()["posts"][0]["id"]
+
+    ids = {}
+    for name, parent, user_id in [("a", None, 3), ("b", "a", 4), ("c", "b", 2), ("d", "a", 2), ("e", None, 4)]:
+        body = {"post_id": post_id, "content": name}
+        if parent:
+            body["parent_id"] = ids[parent]
+        response = client.post("/api/comments", json=body, headers=headers[user_id])
+        assert response.status_code == 201
+        ids[name] = response.get_json()["id"]
+    return app, client, post_id, ids, headers
+
+
+def listing(client, headers, post_id, **args):
+    query = "&".join(f"{key}={value}" for key, value in {"post_id": post_id, "limit": 100, **args}.items())
+    response = client.get(f"/api/comments?{query}", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def shape(comments):
+    """(content, depth, reply_count, descendant_count) in listing order."""
+    return [(c["content"], c["depth"], c["reply_count"], c["descendant_count"]) for c in comments]
+
+
+def test_thread_order_paths_and_counts(thread):
+    app, client, post_id, ids, headers = thread
+    comments = listing(client, headers[2], post_id)["comments"]
+    assert shape(comments) == [("a", 0, 2, 3), ("b", 1, 1, 1), ("c", 2, 0, 0), ("d", 1, 0, 0), ("e", 0, 0, 0)]
+    parents = {c["content"]: c["parent_id"] for c in comments}
+    assert parents == {"a": None, "b": ids["a"], "c": ids["b"], "d": ids["a"], "e": None}
+
+    with app.app_context():
+        path = db.session.scalar(select(Comment.path).where(Comment.id == ids["c"]))
+    assert path == path_segment(ids["a"]) + path_segment(ids["b"]) + path_segment(ids["c"])
+
+
+def test_subtrees_levels_and_pages(thread):
+    _, client, post_id, ids, headers = thread
+    h = headers[2]
+
+    def contents(**args):
+        return [c["content"] for c in listing(client, h, post_id, **args)["comments"]]
+
+    assert contents(parent_id=ids["a"]) == ["b", "c", "d"]
+    assert contents(parent_id=ids["a"], depth=1) == ["b", "d"]
+    assert contents(depth=1) == ["a", "e"]
+    assert contents(depth=2) == ["a", "b", "d", "e"]
+
+    walked, cursor = [], None
+    while True:
+        page = listing(client, h, post_id, limit=2, **({"cursor": cursor} if cursor else {}))
+        walked += [c["content"] for c in page["comments"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert walked == ["a", "b", "c", "d", "e"]
+
+
+def test_replies_are_checked(thread):
+    _, client, post_id, ids, headers = thread
+    h = headers[3]
+    # c is at depth 2; COMMENT_MAX_DEPTH=4 allows one more level
+    response = client.post("/api/comments", json={"post_id": post_id, "content": "f", "parent_id": ids["c"]}, headers=h)
+    assert response.status_code == 201
+    too_deep = {"post_id": post_id, "content": "g", "parent_id": response.get_json()["id"]}
+    assert client.post("/api/comments", json=too_deep, headers=h).status_code == 400
+
+    elsewhere = {"post_id": post_id + 1000, "content": "x", "parent_id": ids["a"]}
+    assert client.post("/api/comments", json=elsewhere, headers=h).status_code == 404
+
+
+def test_deleting_a_reply_takes_its_subtree(thread):
+    _, client, post_id, ids, headers = thread
+    assert client.delete(f"/api/comments/{ids['b']}", headers=headers[4]).status_code == 200
+
+    comments = listing(client, headers[2], post_id)["comments"]
+    assert shape(comments) == [("a", 0, 1, 1), ("d", 1, 0, 0), ("e", 0, 0, 0)]
+    post = client.get(f"/api/posts/{post_id}").get_json()
+    assert len(post["comments"]) == 3
+
+
+def test_rebuild_restores_paths_and_counts(thread):
+    app, client, post_id, _, headers = thread
+    before = listing(client, headers[2], post_id)["comments"]
+    with app.app_context():
+        db.session.execute(
+            update(Comment).where(Comment.post_id == post_id)
+            .values(path=None, depth=0, reply_count=0, descendant_count=0)
+        )
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["comments", "rebuild"])
+    assert "Filled 5 comment path(s)" in result.output
+    assert listing(client, headers[2], post_id)["comments"] == before
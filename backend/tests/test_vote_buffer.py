@@ -0,0 +1,188 @@
+import fcntl
+import json
+import os
+import sqlite3
+
+from sqlalchemy import func, select
+
+from app.extensions import db, vote_buffer
+from app.models import Post, Vote
+from app.seed import seed_dataset
+from app.vote_buffer import VoteBuffer, _read_segment, _segments
+
+
+def buffered_app(make_app, tmp_path, **config):
+    app = make_app(
+        seed=False,
+        VOTE_BUFFER_ENABLED=True,
+        VOTE_BUFFER_DIR=str(tmp_path),
+        # flushed by the tests, not the thread
+        VOTE_BUFFER_FLUSH_INTERVAL=3600,
+        VOTE_BUFFER_MAX_PENDING=10 ** 6,
+        VOTE_BUFFER_FSYNC=False,
+        **config
+    )
+    with app.app_context():
+        seed_dataset(users=30, posts=300, votes=0, comments=0, seed=3)
+        # SQLite's default bound parameter limit; distribution builds often raise it
+        connection = db.engine.raw_connection()
+        connection.driver_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 32766)
+        connection.close()
+    return app
+
+
+def submit_all(app, value):
+    """One vote of every user on every post: 9000 keys."""
+    with app.app_context():
+        user_ids = range(1, 31)
+        post_ids = db.session.scalars(select(Post.id)).all()
+        for user_id in user_ids:
+            for post_id in post_ids:
+                vote_buffer.submit(user_id, post_id, value)
+        db.session.remove()
+    return len(user_ids) * len(post_ids)
+
+
+def vote_totals(app):
+    with app.app_context():
+        return (
+            db.session.scalar(select(func.count()).select_from(Vote)),
+            db.session.scalar(select(func.sum(Post.upvote_count))),
+        )
+
+
+def test_flush_beyond_the_bound_parameter_limit(make_app, tmp_path):
+    # 9000 keys at 4 parameters per row would not fit one SQLite statement
+    app = buffered_app(make_app, tmp_path, VOTE_BUFFER_MAX_FLUSH_ROWS=20000)
+    keys = submit_all(app, 1)
+    assert keys * 4 > 32766
+
+    assert vote_buffer.flush() == keys
+    assert vote_buffer.pending_count() == 0
+    assert vote_totals(app) == (keys, keys)
+
+    # the same clicks again remove every vote: the chunked delete
+    submit_all(app, 1)
+    assert vote_buffer.flush() == keys
+    assert vote_totals(app) == (0, 0)
+
+
+def test_flush_is_capped_and_the_rest_stays_logged(make_app, tmp_path):
+    app = buffered_app(make_app, tmp_path, VOTE_BUFFER_MAX_FLUSH_ROWS=4000)
+    keys = submit_all(app, 1)
+
+    assert vote_buffer.flush() == 4000
+    assert vote_buffer.pending_count() == keys - 4000
+    # the committed batch's segments are gone; what is left is on disk for a crash
+    logged = {
+        (user_id, post_id)
+        for path in _segments(vote_buffer._prefix())
+        for user_id, post_id, _ in _read_segment(path)
+    }
+    assert len(logged) == keys - 4000
+
+    flushed = 4000
+    while n := vote_buffer.flush():
+        assert n <= 4000
+        flushed += n
+    assert flushed == keys
+    assert vote_totals(app) == (keys, keys)
+    assert all(os.path.getsize(path) == 0 for path in _segments(vote_buffer._prefix()))
+
+
+def test_batch_toggles_against_pending_votes(make_app, tmp_path, login):
+    app = buffered_app(make_app, tmp_path)
+    client = app.test_client()
+    headers = login(client, 2)
+
+    response = client.post("/api/votes", json={"post_id": 1, "vote_type": "up"}, headers=headers)
+    assert response.status_code == 202
+    response = client.post("/api/votes/batch", headers=headers, json={"votes": [
+        {"post_id": 1, "vote_type": "up"},
+        {"post_id": 2, "vote_type": "down"},
+        {"post_id": 2, "vote_type": "up"},
+    ]})
+    assert response.status_code == 202
+    assert [r["msg"] for r in response.get_json()["results"]] == ["Vote removed", "Vote recorded", "Vote updated"]
+
+    vote_buffer.flush()
+    with app.app_context():
+        votes = dict(db.session.execute(select(Vote.post_id, Vote.value).where(Vote.user_id == 2)).all())
+        counts = db.session.execute(
+            select(Post.id, Post.upvote_count, Post.downvote_count).where(Post.id.in_([1, 2])).order_by(Post.id)
+        ).all()
+    assert votes == {2: 1}
+    assert [tuple(row) for row in counts] == [(1, 0, 0), (2, 1, 0)]
+
+
+def write_log(directory, pid, segments, torn=False):
+    """Leaves the lock file and segments of a process `pid` that died without flushing."""
+    prefix = os.path.join(directory, f"votes-{pid}")
+    open(prefix + ".lock", "w").close()
+    for seq, votes in enumerate(segments, start=1):
+        with open(f"{prefix}-{seq}.log", "w") as f:
+            f.write("".join(json.dumps(vote) + "\n" for vote in votes))
+            if torn and seq == len(segments):
+                f.write('[5, 5,')
+    return prefix
+
+
+def test_votes_of_a_dead_process_are_replayed(make_app, tmp_path, login):
+    dead = write_log(tmp_path, os.getpid() + 100000, [
+        [[1, 1, 1], [1, 2, -1], [2, 1, 1]],
+        # later segments hold the newer result of the same key
+        [[1, 2, None], [3, 3, -1]],
+    ], torn=True)
+    app = buffered_app(make_app, tmp_path)
+
+    assert not os.path.exists(dead + ".lock")
+    assert _segments(dead) == []
+    assert vote_buffer.pending_count() == 4
+    # the replayed votes are this process's now, toggles see them
+    client = app.test_client()
+    response = client.post("/api/votes", json={"post_id": 1, "vote_type": "up"}, headers=login(client, 2))
+    assert response.get_json()["msg"] == "Vote removed"
+
+    vote_buffer.flush()
+    with app.app_context():
+        votes = set(db.session.execute(select(Vote.user_id, Vote.post_id, Vote.value)).all())
+    assert votes == {(1, 1, 1), (3, 3, -1)}
+
+
+def test_two_workers_recovering_the_same_log(make_app, tmp_path, monkeypatch):
+    buffered_app(make_app, tmp_path)
+    dead = write_log(tmp_path, os.getpid() + 100000, [[[1, 1, 1], [2, 2, -1]]])
+
+    # another worker with its own log in a directory of its own
+    other = VoteBuffer()
+    other.directory, other.fsync = str(tmp_path), False
+    os.mkdir(tmp_path / "other")
+    other._segment = open(tmp_path / "other" / "votes.log", "a")
+
+    real_flock, live = fcntl.flock, []
+
+    def flock(f, operation):
+        # between our open() of the dead lock and our flock(), the other
+        # worker recovers the log and deletes it, then a new process that
+        # got the same pid starts and takes the lock and a segment
+        if getattr(f, "name", None) == dead + ".lock" and not live:
+            live.append(None)
+            other._recover()
+            live[0] = open(dead + ".lock", "w")
+            real_flock(live[0], fcntl.LOCK_EX | fcntl.LOCK_NB)
+            with open(dead + "-1.log", "w") as segment:
+                segment.write(json.dumps([4, 4, 1]) + "\n")
+        return real_flock(f, operation)
+
+    monkeypatch.setattr(fcntl, "flock", flock)
+    try:
+        vote_buffer._recover()
+    finally:
+        monkeypatch.undo()
+        other._segment.close()
+
+    # recovered once, by the other worker; the new process's log is left alone
+    assert other._pending == {(1, 1): 1, (2, 2): -1}
+    assert vote_buffer.pending_count() == 0
+    assert [list(_read_segment(path)) for path in _segments(dead)] == [[(4, 4, 1)]]
+    live[0].close()
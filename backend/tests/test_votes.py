@@ -0,0 +1,162 @@
+from sqlalchemy import func, select, update
+
+from app.extensions import db
+from app.models import Post, User, Vote
+from app.votes import find_drifted_posts
+
+
+def counters(app, post_id):
+    with app.app_context():
+        return tuple(db.session.execute(
+            select(Post.upvote_count, Post.downvote_count, Post.score).where(Post.id == post_id)
+        ).one())
+
+
+def karma_in_step(app):
+    """Every user's karma equals the score of their posts."""
+    with app.app_context():
+        scores = dict(db.session.execute(select(Post.author_id, func.sum(Post.score)).group_by(Post.author_id)).all())
+        karma = dict(db.session.execute(select(User.id, User.karma)).all())
+    return all(karma[user_id] == scores.get(user_id, 0) for user_id in karma)
+
+
+# ------------------------
+# Vote counters (user-003)
+# ------------------------
+def test_votes_move_the_counters_atomically(make_app, login):
+    app = make_app()
+    client = app.test_client()
+    headers = login(client, 1)
+    with app.app_context():
+        post_id = db.session.scalar(
+            select(Post.id).where(~Post.id.in_(select(Vote.post_id).where(Vote.user_id == 1))).limit(1)
+        )
+    up, down, score = counters(app, post_id)
+
+    steps = [
+        ("up", "Vote recorded", (up + 1, down, score + 1)),
+        ("down", "Vote updated", (up, down + 1, score - 1)),
+        ("down", "Vote removed", (up, down, score)),
+    ]
+    for vote_type, msg, expected in steps:
+        response = client.post("/api/votes", json={"post_id": post_id, "vote_type": vote_type}, headers=headers)
+        assert response.get_json()["msg"] == msg
+        assert counters(app, post_id) == expected
+        with app.app_context():
+            assert find_drifted_posts() == []
+        assert karma_in_step(app)
+
+
+def test_reconcile_repairs_drifted_counters(make_app):
+    app = make_app()
+    with app.app_context():
+        drifted = db.session.scalars(select(Post.id).order_by(Post.id).limit(3)).all()
+        db.session.execute(
+            update(Post).where(Post.id.in_(drifted))
+            .values(upvote_count=Post.upvote_count + 7, score=Post.score - 2)
+        )
+        db.session.commit()
+        assert sorted(find_drifted_posts()) == drifted
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["votes", "reconcile", "--check"])
+    assert "3 post(s) with drifted vote counters" in result.output
+    with app.app_context():
+        assert sorted(find_drifted_posts()) == drifted
+
+    result = runner.invoke(args=["votes", "reconcile"])
+    assert "Reconciled 3 post(s)" in result.output
+    with app.app_context():
+        assert find_drifted_posts() == []
+        for post_id in drifted:
+            up, down = (
+                db.session.scalar(select(func.count()).where(Vote.post_id == post_id, Vote.value == value))
+                for value in (1, -1)
+            )
+            assert counters(app, post_id) == (up, down, up - down)
+    assert karma_in_step(app)
+
+
+# ------------------------
+# Vote batches (user-015)
+# ------------------------
+def unvoted_posts(app, user_id, n):
+    with app.app_context():
+        return db.session.scalars(
+            select(Post.id).where(~Post.id.in_(select(Vote.post_id).where(Vote.user_id == user_id)))
+            .order_by(Post.id).limit(n)
+        ).all()
+
+
+def user_votes(app, user_id):
+    with app.app_context():
+        return dict(db.session.execute(select(Vote.post_id, Vote.value).where(Vote.user_id == user_id)).all())
+
+
+def test_batch_replays_toggles_in_order(make_app, login):
+    app = make_app()
+    client = app.test_client()
+    headers = login(client, 1)
+    a, b = unvoted_posts(app, 1, 2)
+    before = {post_id: counters(app, post_id) for post_id in (a, b)}
+    votes_before = user_votes(app, 1)
+
+    response = client.post("/api/votes/batch", headers=headers, json={"votes": [
+        {"post_id": a, "vote_type": "up"},
+        {"post_id": a, "vote_type": "up"},
+        {"post_id": str(a), "vote_type": "down"},
+        {"post_id": b, "vote_type": "up"},
+        {"post_id": 10**9, "vote_type": "up"},
+        {"post_id": b, "vote_type": "sideways"},
+        "not a vote",
+    ]})
+    assert response.status_code == 200
+    assert [(r["status"], r.get("msg")) for r in response.get_json()["results"]] == [
+        (200, "Vote recorded"),
+        (200, "Vote removed"),
+        (200, "Vote recorded"),
+        (200, "Vote recorded"),
+        (404, "Post not found"),
+        (400, "Invalid post_id or vote_type"),
+        (400, "Invalid post_id or vote_type"),
+    ]
+
+    assert user_votes(app, 1) == {**votes_before, a: -1, b: 1}
+    up, down, score = before[a]
+    assert counters(app, a) == (up, down + 1, score - 1)
+    up, down, score = before[b]
+    assert counters(app, b) == (up + 1, down, score + 1)
+    with app.app_context():
+        assert find_drifted_posts() == []
+    assert karma_in_step(app)
+
+    # the same batch again toggles both off
+    response = client.post("/api/votes/batch", headers=headers, json={"votes": [
+        {"post_id": a, "vote_type": "down"}, {"post_id": b, "vote_type": "up"},
+    ]})
+    assert [r["msg"] for r in response.get_json()["results"]] == ["Vote removed", "Vote removed"]
+    assert user_votes(app, 1) == votes_before
+    assert {post_id: counters(app, post_id) for post_id in (a, b)} == before
+
+
+def test_batch_is_capped_at_500_votes(make_app, login):
+    app = make_app()
+    client = app.test_client()
+    headers = login(client, 1)
+    post_id = unvoted_posts(app, 1, 1)[0]
+    votes_before = user_votes(app, 1)
+
+    too_many = [{"post_id": post_id, "vote_type": "up"}] * 501
+    response = client.post("/api/votes/batch", json={"votes": too_many}, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()["msg"] == "At most 500 votes per batch"
+    assert user_votes(app, 1) == votes_before
+
+    # 500 toggles of the same vote cancel out
+    response = client.post("/api/votes/batch", json={"votes": too_many[:500]}, headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()["results"]) == 500
+    assert user_votes(app, 1) == votes_before
+
+    for body in ({}, {"votes": []}, {"votes": "up"}):
+        assert client.post("/api/votes/batch", json=body, headers=headers).status_code == 400
@@ -0,0 +1,7 @@
+# WSGI entry point of the server workers, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`
+# (see app/serving.py); run.py is the development one
+from app import create_app
+from app.ranking import start_hot_refresher
+
+app = create_app("serving")
+start_hot_refresher(app)
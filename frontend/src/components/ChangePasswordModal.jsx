@@ -24,11 +24,13 @@ export default function ChangePasswordModal({ show, onClose }) {
     const token = localStorage.getItem("token");
 
     try {
-      await axiosInstance.patch(
+      const res = await axiosInstance.patch(
         "/api/auth/change-password",
         { old_password: oldPassword, new_password: newPassword },
         { headers: { Authorization: `Bearer ${token}` } }
       );
+      // tokens issued before the change no longer work
+      localStorage.setItem("token", res.data.access_token);
       setSuccess(true);
       setMsg("Password updated successfully!");
       setTimeout(onClose, 2000);
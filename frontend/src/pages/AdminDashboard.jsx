@@ -11,11 +11,55 @@ export default function AdminDashboard() {
   const [users, setUsers]         = useState([]);
   const [loading, setLoading]     = useState(true);
 
-  const [page, setPage]   = useState(1);
-  const perPage           = 10;
-  const totalPages        = Math.ceil(users.length / perPage);
-  const startIndex        = (page - 1) * perPage;
-  const pagedUsers        = users.slice(startIndex, startIndex + perPage);
+  // cursors[i] is the cursor that loads page i + 1; the server pages by keyset
+  const [cursors, setCursors]     = useState([null]);
+  const [page, setPage]           = useState(1);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [filters, setFilters]     = useState({ email: "", banned: "", admin: "" });
+  const perPage                   = 10;
+
+  const fetchUsers = async (cursor, activeFilters = filters) => {
+    const params = { limit: perPage };
+    if (cursor) params.cursor = cursor;
+    Object.entries(activeFilters).forEach(([key, value]) => {
+      if (value !== "") params[key] = value;
+    });
+    const { data } = await axiosInstance.get("/api/admin/users", {
+      headers: { Authorization: `Bearer ${token}` },
+      params,
+    });
+    setUsers(data.users);
+    setNextCursor(data.next_cursor);
+    return data;
+  };
+
+  const goToPage = async (target) => {
+    try {
+      const data = await fetchUsers(cursors[target - 1]);
+      if (data.next_cursor && cursors.length === target) {
+        setCursors((prev) => [...prev, data.next_cursor]);
+      }
+      setPage(target);
+    } catch {
+      alert("Failed to load users");
+    }
+  };
+
+  const applyFilters = async (changes) => {
+    const next = { ...filters, ...changes };
+    setFilters(next);
+    try {
+      const data = await fetchUsers(null, next);
+      setCursors(data.next_cursor ? [null, data.next_cursor] : [null]);
+      setPage(1);
+    } catch {
+      alert("Failed to load users");
+    }
+  };
+
+  // ban / role toggles return the updated user, so patch the row in place
+  const replaceUser = (updated) =>
+    setUsers((prev) => prev.map((u) => (u.id === updated.id ? updated : u)));
 
   useEffect(() => {
     if (!token) return navigate("/login", { replace: true });
@@ -44,11 +88,14 @@ export default function AdminDashboard() {
       }),
       axiosInstance.get("/api/admin/users", {
         headers: { Authorization: `Bearer ${token}` },
+        params: { limit: perPage },
       }),
     ])
       .then(([ aRes, uRes ]) => {
         setAnalytics(aRes.data);
-        setUsers(uRes.data);
+        setUsers(uRes.data.users);
+        setNextCursor(uRes.data.next_cursor);
+        if (uRes.data.next_cursor) setCursors([null, uRes.data.next_cursor]);
       })
       .catch((err) => console.error("Failed loading admin data", err))
       .finally(() => setLoading(false));
@@ -56,18 +103,12 @@ export default function AdminDashboard() {
 
   const toggleBan = async (userId) => {
     try {
-      await axiosInstance.patch(
+      const { data } = await axiosInstance.patch(
         `/api/admin/users/${userId}/ban`,
         null,
         { headers: { Authorization: `Bearer ${token}` } }
       );
-      const { data } = await axiosInstance.get("/api/admin/users", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setUsers(data);
-      if ((page - 1) * perPage >= data.length && page > 1) {
-        setPage(page - 1);
-      }
+      replaceUser(data.user);
     } catch {
       alert("Failed to toggle ban");
     }
@@ -75,17 +116,46 @@ export default function AdminDashboard() {
 
   const toggleAdmin = async (userId, isCurrentlyAdmin) => {
     try {
-      await axiosInstance.patch(
+      const { data } = await axiosInstance.patch(
         `/api/admin/users/${userId}/set-admin`,
         { is_admin: !isCurrentlyAdmin },
         { headers: { Authorization: `Bearer ${token}` } }
       );
-      const { data } = await axiosInstance.get("/api/admin/users", {
+      replaceUser(data.user);
+    } catch {
+      alert("Failed to toggle admin role");
+    }
+  };
+
+  // big accounts are purged in the background (202): poll until the job ends
+  const waitForPurge = async (userId) => {
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const { data } = await axiosInstance.get(`/api/admin/users/${userId}/purge`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (data.state !== "running") return data;
+    }
+  };
+
+  const deleteUser = async (target) => {
+    if (!window.confirm(`Delete ${target.email} and everything they posted?`)) return;
+    try {
+      const { status } = await axiosInstance.delete(`/api/admin/users/${target.id}`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setUsers(data);
+      if (status === 202) {
+        replaceUser({ ...target, is_banned: true, deleting: true });
+        const job = await waitForPurge(target.id);
+        if (job.state === "failed") {
+          replaceUser({ ...target, is_banned: true });
+          alert(`Deleting ${target.email} failed: ${job.error}`);
+          return;
+        }
+      }
+      setUsers((prev) => prev.filter((u) => u.id !== target.id));
     } catch {
-      alert("Failed to toggle admin role");
+      alert("Failed to delete user");
     }
   };
 
@@ -105,6 +175,7 @@ export default function AdminDashboard() {
           <li>Admins: {analytics.active_admins}</li>
           <li>Total Posts: {analytics.total_posts}</li>
           <li>Total Comments: {analytics.total_comments}</li>
+          <li>Total Votes: {analytics.total_votes}</li>
           {analytics.top_post && (
             <li>
               Top Post: <strong>{analytics.top_post.title}</strong> –{" "}
@@ -112,10 +183,58 @@ export default function AdminDashboard() {
             </li>
           )}
         </ul>
+        {analytics.daily && (
+          <table className="table table-sm table-dark mt-3 mb-0">
+            <thead>
+              <tr>
+                <th>Last 7 days</th>
+                {analytics.daily.posts.slice(-7).map((d) => (
+                  <th key={d.day}>{d.day.slice(5)}</th>
+                ))}
+              </tr>
+            </thead>
+            <tbody>
+              {["signups", "posts", "votes", "comments"].map((metric) => (
+                <tr key={metric}>
+                  <td className="text-capitalize">{metric}</td>
+                  {analytics.daily[metric].slice(-7).map((d) => (
+                    <td key={d.day}>{d.count}</td>
+                  ))}
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        )}
       </div>
 
       <div className="p-4 bg-dark rounded shadow-sm">
         <h5 className="mb-3 text-white">Users</h5>
+        <div className="d-flex gap-2 mb-3">
+          <input
+            className="form-control form-control-sm bg-secondary text-white"
+            placeholder="Email starts with…"
+            value={filters.email}
+            onChange={(e) => applyFilters({ email: e.target.value })}
+          />
+          <select
+            className="form-select form-select-sm bg-secondary text-white"
+            value={filters.banned}
+            onChange={(e) => applyFilters({ banned: e.target.value })}
+          >
+            <option value="">Any status</option>
+            <option value="true">Banned</option>
+            <option value="false">Not banned</option>
+          </select>
+          <select
+            className="form-select form-select-sm bg-secondary text-white"
+            value={filters.admin}
+            onChange={(e) => applyFilters({ admin: e.target.value })}
+          >
+            <option value="">Any role</option>
+            <option value="true">Admins</option>
+            <option value="false">Members</option>
+          </select>
+        </div>
         <table className="table table-dark table-striped table-hover mb-0">
           <thead>
             <tr>
@@ -129,7 +248,7 @@ export default function AdminDashboard() {
             </tr>
           </thead>
           <tbody>
-            {pagedUsers.map((u) => (
+            {users.map((u) => (
               <tr key={u.id}>
                 <td>{u.id}</td>
                 <td>{u.name}</td>
@@ -154,6 +273,15 @@ export default function AdminDashboard() {
                       {u.is_admin ? "Revoke Admin" : "Make Admin"}
                     </button>
                   )}
+                  {user.id !== u.id && (
+                    <button
+                      className="btn btn-sm btn-outline-danger ms-2"
+                      disabled={u.deleting}
+                      onClick={() => deleteUser(u)}
+                    >
+                      {u.deleting ? "Deleting…" : "Delete"}
+                    </button>
+                  )}
                 </td>
               </tr>
             ))}
@@ -165,28 +293,18 @@ export default function AdminDashboard() {
             <li className={`page-item ${page === 1 ? "disabled" : ""}`}>
               <button
                 className="page-link"
-                onClick={() => setPage((p) => Math.max(1, p - 1))}
+                onClick={() => goToPage(Math.max(1, page - 1))}
               >
                 Previous
               </button>
             </li>
-            {Array.from({ length: totalPages }, (_, i) => (
-              <li
-                key={i + 1}
-                className={`page-item ${page === i + 1 ? "active" : ""}`}
-              >
-                <button
-                  className="page-link"
-                  onClick={() => setPage(i + 1)}
-                >
-                  {i + 1}
-                </button>
-              </li>
-            ))}
-            <li className={`page-item ${page === totalPages ? "disabled" : ""}`}>
+            <li className="page-item active">
+              <span className="page-link">{page}</span>
+            </li>
+            <li className={`page-item ${nextCursor ? "" : "disabled"}`}>
               <button
                 className="page-link"
-                onClick={() => setPage((p) => Math.min(totalPages, p + 1))}
+                onClick={() => goToPage(page + 1)}
               >
                 Next
               </button>
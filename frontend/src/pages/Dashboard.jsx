@@ -8,6 +8,8 @@ import ChangePasswordModal from "../components/ChangePasswordModal";
 
 export default function Dashboard() {
   const [user, setUser]                   = useState(null);
+  const [posts, setPosts]                 = useState([]);
+  const [nextCursor, setNextCursor]       = useState(null);
   const [error, setError]                 = useState("");
   const [showNewPost, setShowNewPost]     = useState(false);
   const [showEditProfile, setShowEditProfile] = useState(false);
@@ -31,8 +33,23 @@ export default function Dashboard() {
     }
   };
 
+  const fetchPosts = async (cursor = null) => {
+    const token = localStorage.getItem("token");
+    try {
+      const { data } = await axiosInstance.get("/api/auth/me/posts", {
+        headers: { Authorization: `Bearer ${token}` },
+        params: cursor ? { cursor } : {},
+      });
+      setPosts((prev) => (cursor ? [...prev, ...data.posts] : data.posts));
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      console.error("Failed to load your posts", err);
+    }
+  };
+
   useEffect(() => {
     fetchUser();
+    fetchPosts();
   }, []);
 
   if (error) {
@@ -52,10 +69,8 @@ export default function Dashboard() {
   }
 
   const handleDelete = (deletedId) => {
-    setUser((u) => ({
-      ...u,
-      posts: u.posts.filter((p) => p.id !== deletedId),
-    }));
+    setPosts((prev) => prev.filter((p) => p.id !== deletedId));
+    setUser((u) => ({ ...u, post_count: Math.max((u.post_count || 0) - 1, 0) }));
   };
 
   return (
@@ -74,12 +89,15 @@ export default function Dashboard() {
           </div>
 
           <div className="row mb-4">
-            <div className="col-md-6">
-              <p><strong>Total Posts:</strong> {user.posts?.length || 0}</p>
+            <div className="col-md-4">
+              <p><strong>Total Posts:</strong> {user.post_count || 0}</p>
             </div>
-            <div className="col-md-6">
+            <div className="col-md-4">
               <p><strong>Total Comments:</strong> {user.comment_count || 0}</p>
             </div>
+            <div className="col-md-4">
+              <p><strong>Karma:</strong> {user.karma || 0}</p>
+            </div>
           </div>
 
           <div className="d-flex flex-wrap gap-2">
@@ -107,9 +125,9 @@ export default function Dashboard() {
 
       <div className="mb-4">
         <h4 className="text-light mb-3">Your Posts</h4>
-        {user.posts?.length > 0 ? (
+        {posts.length > 0 ? (
           <div className="row gy-3">
-            {user.posts.map((post) => (
+            {posts.map((post) => (
               <div key={post.id} className="col-12">
                 <PostCard
                   post={post}
@@ -122,6 +140,16 @@ export default function Dashboard() {
         ) : (
           <p className="text-light">You haven’t posted anything yet.</p>
         )}
+        {nextCursor && (
+          <div className="text-center mt-3">
+            <button
+              className="btn btn-outline-light btn-sm"
+              onClick={() => fetchPosts(nextCursor)}
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
 
       <NewPostModal
@@ -129,7 +157,7 @@ export default function Dashboard() {
         onClose={() => setShowNewPost(false)}
         onCreated={async () => {
           setShowNewPost(false);
-          await fetchUser();
+          await Promise.all([fetchUser(), fetchPosts()]);
         }}
       />
 
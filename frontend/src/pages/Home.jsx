@@ -5,6 +5,7 @@ import NewPostModal from "../components/NewPostModal";
 
 export default function Home() {
   const [posts, setPosts]             = useState([]);
+  const [nextCursor, setNextCursor]   = useState(null);
   const [user, setUser]               = useState(null);
   const [showNewPost, setShowNewPost] = useState(false);
   const [search, setSearch]           = useState("");
@@ -23,10 +24,13 @@ export default function Home() {
     }
   }, [token]);
 
-  const fetchPosts = async () => {
+  const fetchPosts = async (cursor = null) => {
     try {
-      const res = await axiosInstance.get("/api/posts?sort=top");
-      setPosts(res.data);
+      const res = await axiosInstance.get("/api/posts?sort=top&view=summary", {
+        params: cursor ? { cursor } : {},
+      });
+      setPosts((prev) => (cursor ? [...prev, ...res.data.posts] : res.data.posts));
+      setNextCursor(res.data.next_cursor);
     } catch (err) {
       console.error("Failed to load posts", err);
     }
@@ -48,7 +52,7 @@ export default function Home() {
     } else if (sortBy === "upvotes") {
       return b.upvotes - a.upvotes;
     } else if (sortBy === "comments") {
-      return (b.comments?.length || 0) - (a.comments?.length || 0);
+      return (b.comment_count || 0) - (a.comment_count || 0);
     }
     return 0;
   });
@@ -109,6 +113,16 @@ export default function Home() {
             </div>
           ))
         )}
+        {nextCursor && (
+          <div className="text-center mt-3">
+            <button
+              className="btn btn-outline-light btn-sm"
+              onClick={() => fetchPosts(nextCursor)}
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
 
 
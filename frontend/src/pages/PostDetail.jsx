@@ -3,6 +3,33 @@ import { useParams, useNavigate } from "react-router-dom";
 import axiosInstance from "../axiosInstance";
 import EditPostModal from "../components/EditPostModal";
 
+// levels of replies loaded with the thread; deeper ones load per subtree
+const THREAD_DEPTH = 4;
+// wait before reopening a live event stream the server refused (its Retry-After)
+const STREAM_RETRY_MS = 30000;
+
+// comments are kept flat in thread order (depth-first): a comment's loaded
+// replies are the entries right after it with a greater depth
+const subtreeEnd = (list, index) => {
+  let end = index + 1;
+  while (end < list.length && list[end].depth > list[index].depth) end++;
+  return end;
+};
+
+const insertReplies = (list, parentId, replies) => {
+  const fresh = replies.filter((r) => !list.some((c) => c.id === r.id));
+  const index = list.findIndex((c) => c.id === parentId);
+  if (index === -1) return parentId === null ? [...list, ...fresh] : list;
+  const end = subtreeEnd(list, index);
+  return [...list.slice(0, end), ...fresh, ...list.slice(end)];
+};
+
+const removeSubtree = (list, id) => {
+  const index = list.findIndex((c) => c.id === id);
+  if (index === -1) return list;
+  return [...list.slice(0, index), ...list.slice(subtreeEnd(list, index))];
+};
+
 export default function PostDetail() {
   const { postId } = useParams();
   const navigate = useNavigate();
@@ -10,7 +37,12 @@ export default function PostDetail() {
 
   const [post, setPost] = useState(null);
   const [comments, setComments] = useState([]);
+  const [commentsCursor, setCommentsCursor] = useState(null);
   const [newComment, setNewComment] = useState("");
+  const [replyTo, setReplyTo] = useState(null);
+  const [replyText, setReplyText] = useState("");
+  // "load more replies" cursor per comment, for subtrees below THREAD_DEPTH
+  const [replyCursors, setReplyCursors] = useState({});
   const [user, setUser] = useState(null);
   const [upvotes, setUpvotes] = useState(0);
   const [downvotes, setDownvotes] = useState(0);
@@ -44,18 +76,44 @@ export default function PostDetail() {
     }
   };
 
-  const fetchComments = async () => {
+  const fetchComments = async (cursor = null) => {
     try {
       const { data } = await axiosInstance.get(
         `/api/comments?post_id=${postId}`,
-        { headers: { Authorization: `Bearer ${token}` } }
+        {
+          headers: { Authorization: `Bearer ${token}` },
+          params: cursor ? { depth: THREAD_DEPTH, cursor } : { depth: THREAD_DEPTH },
+        }
       );
-      setComments(data);
+      setComments((prev) =>
+        cursor
+          ? [...prev, ...data.comments.filter((c) => !prev.some((p) => p.id === c.id))]
+          : data.comments
+      );
+      setCommentsCursor(data.next_cursor);
+      if (!cursor) setReplyCursors({});
     } catch {
       console.error("Error loading comments");
     }
   };
 
+  const fetchReplies = async (parentId) => {
+    const cursor = replyCursors[parentId];
+    try {
+      const { data } = await axiosInstance.get(
+        `/api/comments?post_id=${postId}`,
+        {
+          headers: { Authorization: `Bearer ${token}` },
+          params: cursor ? { parent_id: parentId, cursor } : { parent_id: parentId },
+        }
+      );
+      setComments((prev) => insertReplies(prev, parentId, data.comments));
+      setReplyCursors((prev) => ({ ...prev, [parentId]: data.next_cursor || "done" }));
+    } catch {
+      console.error("Error loading replies");
+    }
+  };
+
   const fetchUser = async () => {
     if (!token) return;
     try {
@@ -80,6 +138,64 @@ export default function PostDetail() {
     fetchUser();
   }, [postId, token, navigate]);
 
+  useEffect(() => {
+    let source = null;
+    let retry = null;
+
+    // Each open stream costs the server a thread (or a slot), so it is only
+    // held while the tab is visible. A refused stream (503 once the server
+    // is at its limit) closes for good: try again later.
+    const open = () => {
+      source = new EventSource(
+        `${import.meta.env.VITE_API_BASE_URL || ""}/api/posts/${postId}/events`
+      );
+      source.addEventListener("vote", (e) => {
+        const data = JSON.parse(e.data);
+        setUpvotes(data.upvotes);
+        setDownvotes(data.downvotes);
+      });
+      source.addEventListener("comment_added", (e) => {
+        const comment = JSON.parse(e.data);
+        setComments((prev) => insertReplies(prev, comment.parent_id, [comment]));
+      });
+      source.addEventListener("comment_deleted", (e) => {
+        const { id } = JSON.parse(e.data);
+        setComments((prev) => removeSubtree(prev, id));
+      });
+      source.addEventListener("resync", () => {
+        fetchVotes();
+        fetchComments();
+      });
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          source = null;
+          retry = setTimeout(open, STREAM_RETRY_MS);
+        }
+      };
+    };
+    const close = () => {
+      clearTimeout(retry);
+      if (source) source.close();
+      source = null;
+    };
+    const onVisibilityChange = () => {
+      close();
+      if (!document.hidden) {
+        // whatever happened while hidden was missed
+        fetchVotes();
+        fetchComments();
+        open();
+      }
+    };
+
+    if (!document.hidden) open();
+    document.addEventListener("visibilitychange", onVisibilityChange);
+    return () => {
+      document.removeEventListener("visibilitychange", onVisibilityChange);
+      close();
+    };
+  }, [postId]);
+
   const handleVote = async (direction) => {
     if (!user) return;
     try {
@@ -111,8 +227,25 @@ export default function PostDetail() {
     }
   };
 
+  const handleReplySubmit = async (e) => {
+    e.preventDefault();
+    if (!replyText.trim()) return;
+    try {
+      await axiosInstance.post(
+        "/api/comments",
+        { post_id: postId, content: replyText, parent_id: replyTo },
+        { headers: { Authorization: `Bearer ${token}` } }
+      );
+      setReplyTo(null);
+      setReplyText("");
+      fetchComments();
+    } catch {
+      console.error("Failed to submit reply");
+    }
+  };
+
   const handleDeleteComment = async (commentId) => {
-    if (!window.confirm("Delete this comment?")) return;
+    if (!window.confirm("Delete this comment and its replies?")) return;
     try {
       await axiosInstance.delete(
         `/api/comments/${commentId}`,
@@ -199,26 +332,64 @@ export default function PostDetail() {
         <div className="card-body">
           <h5 className="mb-3">Comments ({comments.length})</h5>
 
-          {comments.map((c) => (
-            <div
-              key={c.id}
-              className="mb-3 p-3 border rounded d-flex justify-content-between align-items-start"
-            >
-              <div>
-                <strong>{c.author_name}</strong>
-                <p className="mb-1">{c.content}</p>
-                <small className="text-muted">
-                  {new Date(c.created_at).toLocaleString()}
-                </small>
+          {comments.map((c, i) => {
+            const repliesLoaded = i + 1 < comments.length && comments[i + 1].depth > c.depth;
+            const moreReplies = replyCursors[c.id]
+              ? replyCursors[c.id] !== "done"
+              : c.reply_count > 0 && !repliesLoaded;
+            return (
+              <div key={c.id} style={{ marginLeft: `${Math.min(c.depth, 8) * 1.5}rem` }}>
+                <div className="mb-2 p-3 border rounded d-flex justify-content-between align-items-start">
+                  <div>
+                    <strong>{c.author_name}</strong>
+                    <p className="mb-1">{c.content}</p>
+                    <small className="text-muted">
+                      {new Date(c.created_at).toLocaleString()}
+                    </small>
+                    {user && (
+                      <button
+                        className="btn btn-sm btn-link"
+                        onClick={() => setReplyTo(replyTo === c.id ? null : c.id)}
+                      >Reply</button>
+                    )}
+                  </div>
+                  {(user?.id === c.author_id || user?.is_admin) && (
+                    <button
+                      className="btn btn-sm btn-outline-danger"
+                      onClick={() => handleDeleteComment(c.id)}
+                    >Delete</button>
+                  )}
+                </div>
+
+                {replyTo === c.id && (
+                  <form className="mb-2" onSubmit={handleReplySubmit}>
+                    <textarea
+                      className="form-control mb-2 bg-secondary text-white"
+                      rows={2}
+                      placeholder={`Reply to ${c.author_name}…`}
+                      value={replyText}
+                      onChange={e => setReplyText(e.target.value)}
+                    />
+                    <button type="submit" className="btn btn-sm btn-maroon">Reply</button>
+                  </form>
+                )}
+
+                {moreReplies && (
+                  <button
+                    className="btn btn-sm btn-link mb-2"
+                    onClick={() => fetchReplies(c.id)}
+                  >Load more replies ({c.descendant_count})</button>
+                )}
               </div>
-              {(user?.id === c.author_id || user?.is_admin) && (
-                <button
-                  className="btn btn-sm btn-outline-danger"
-                  onClick={() => handleDeleteComment(c.id)}
-                >Delete</button>
-              )}
-            </div>
-          ))}
+            );
+          })}
+
+          {commentsCursor && (
+            <button
+              className="btn btn-sm btn-outline-secondary"
+              onClick={() => fetchComments(commentsCursor)}
+            >Load more comments</button>
+          )}
 
           <hr />
 